@@ -1,8 +1,18 @@
+"""
+Standalone embedding service. It shares the inference backends
+(embedding_backends.py) with predicta_backend_dj42/sbert_server.py, so
+that directory must be importable:
+
+    cd backend && PYTHONPATH=../predicta_backend_dj42 uvicorn main:app --port 8001
+"""
 from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List
-from sentence_transformers import SentenceTransformer
-import numpy as np
+
+try:
+    from embedding_backends import MODEL_NAME, load_backend
+except ImportError as e:
+    raise ImportError("embedding_backends not found; put predicta_backend_dj42 on PYTHONPATH") from e
 
 app = FastAPI(title="Predicta Embedding Service")
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,10 +26,8 @@ app.add_middleware(
 )
 
 
-# Choose a fast, high-quality model
-# all-MiniLM-L6-v2 (384-dim) is a solid default for speed+quality
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-model = SentenceTransformer(MODEL_NAME)
+# EMBED_BACKEND = torch | onnx | onnx-int8
+backend = load_backend()
 
 class EmbedRequest(BaseModel):
     texts: List[str]
@@ -32,7 +40,7 @@ class EmbedResponse(BaseModel):
 @app.post("/embed", response_model=EmbedResponse)
 def embed(req: EmbedRequest):
     # Inference
-    vecs = model.encode(req.texts, normalize_embeddings=True)  # cosine ready
+    vecs = backend.encode(req.texts)  # L2-normalized, cosine ready
     return EmbedResponse(
         embeddings=[v.tolist() for v in vecs],
         dim=int(vecs.shape[1]),
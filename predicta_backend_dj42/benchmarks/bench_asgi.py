@@ -0,0 +1,182 @@
+# benchmarks/bench_asgi.py
+"""
+WSGI (sync DRF views) vs ASGI (core/async_views.py) on the I/O-bound endpoints.
+
+    python benchmarks/bench_asgi.py --concurrency 64 256 --duration 15 \
+        --provider-latency 50 --endpoint linkedin
+
+Starts a stub job-search provider that answers after `--provider-latency`
+ms, then for each stack launches the Django app against it (gunicorn
+gthread for WSGI, uvicorn for ASGI, both with `--workers` processes) and
+drives GET /api/external/linkedin-search/ from `--concurrency` concurrent
+asyncio clients. `--endpoint analytics` hits /api/analytics/overview/
+instead, which needs a Mongo at MONGO_URI (run manage.py
+bootstrap_analytics first). Reports requests/s and p50/p99 latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+ENDPOINTS = {
+    "linkedin": "/api/external/linkedin-search/?q=python&limit=5",
+    "analytics": "/api/analytics/overview/",
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_provider(latency_ms):
+    """Stub of the external jobs API: fixed latency, small JSON body."""
+    body = json.dumps({"results": [
+        {"id": f"job-{i}", "title": "Python Engineer", "company": "Example",
+         "location": "Remote", "description": "Django, REST APIs", "url": "https://example.com"}
+        for i in range(5)
+    ]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def server_cmd(stack, port, workers, threads):
+    if stack == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "predicta_backend.wsgi:application",
+                "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+                "--worker-class", "gthread", "--threads", str(threads),
+                "--backlog", "2048", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "predicta_backend.asgi:application",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+            "--backlog", "2048", "--log-level", "warning", "--no-access-log"]
+
+
+def wait_ready(url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise TimeoutError("server never became ready")
+
+
+async def load(url, concurrency, duration):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < stop_at:
+                t0 = time.perf_counter()
+                try:
+                    ok = (await client.get(url)).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "rps": n / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if n else float("nan"),
+        "p99_ms": latencies[int(0.99 * (n - 1))] * 1000 if n else float("nan"),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stacks", nargs="+", choices=["wsgi", "asgi"], default=["wsgi", "asgi"])
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="linkedin")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[16, 64, 256])
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=2, help="server processes per stack")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker (WSGI)")
+    parser.add_argument("--provider-latency", type=float, default=50.0, help="ms per provider call")
+    args = parser.parse_args()
+
+    provider, provider_url = start_provider(args.provider_latency)
+    env = {
+        **os.environ,
+        "LINKEDIN_API_BASE": provider_url,
+        "LINKEDIN_API_KEY": "bench",
+        "DEBUG": "False",
+        "ALLOWED_HOSTS": "127.0.0.1,localhost",
+    }
+    print(f"endpoint {ENDPOINTS[args.endpoint]}, provider latency {args.provider_latency:.0f} ms, "
+          f"{args.workers} worker(s), WSGI threads {args.threads}")
+    print(f"{'stack':>5} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>6}")
+
+    try:
+        for stack in args.stacks:
+            port = free_port()
+            proc = subprocess.Popen(
+                server_cmd(stack, port, args.workers, args.threads), cwd=ROOT,
+                env={**env, "ASYNC_VIEWS": "1" if stack == "asgi" else "0"},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            url = f"http://127.0.0.1:{port}{ENDPOINTS[args.endpoint]}"
+            try:
+                wait_ready(url, proc)
+                for c in args.concurrency:
+                    r = asyncio.run(load(url, c, args.duration))
+                    print(f"{stack:>5} {c:>5} {r['rps']:>8.1f} {r['p50_ms']:>9.1f} "
+                          f"{r['p99_ms']:>9.1f} {r['errors']:>6}", flush=True)
+            except Exception as e:
+                print(f"{stack:>5} failed: {e}")
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+    finally:
+        provider.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_cascade.py
+"""
+Latency and top-K agreement of cascade ranking vs the full pipeline.
+
+    python benchmarks/bench_cascade.py --pool 2000 --m 50 100 200 500
+    python benchmarks/bench_cascade.py --embed-url http://127.0.0.1:8001
+
+"Full" is the same cascade with M = pool size (every candidate embedded and
+scored by the model). By default embeddings come from an in-process hashing
+stub that sleeps --stub-ms-per-text to mimic SBERT CPU cost; pass
+--embed-url to use the real embedding service instead.
+"""
+import argparse
+import hashlib
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "predicta_backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from core.cascade import rank_cascade  # noqa: E402
+from core.embedding_client import EmbeddingClient  # noqa: E402
+from core.ml_model import ranking_model  # noqa: E402
+
+SKILLS = ("python django flask fastapi rest api aws docker react javascript java spring "
+          "nlp bert sbert xgboost pandas numpy sql postgres kubernetes").split()
+FILLER = ("managed delivered team project customer stakeholders built designed improved "
+          "process reports office sales logistics retail kitchen warehouse").split()
+JD = ("Senior Python developer: Django REST API services on AWS with Docker; "
+      "NLP ranking using sentence-bert and xgboost; pandas and numpy. 5 years experience.")
+
+
+def make_pool(n, seed=7):
+    rnd = random.Random(seed)
+    pool = []
+    for i in range(n):
+        relevance = rnd.random() ** 3  # most candidates are weak matches
+        words = []
+        for _ in range(rnd.randint(80, 400)):
+            words.append(rnd.choice(SKILLS) if rnd.random() < relevance else rnd.choice(FILLER))
+        words.append(f"{rnd.randint(0, 12)} years of experience")
+        pool.append({"id": i, "name": f"cand{i}", "email": "", "resume_text": " ".join(words)})
+    return pool
+
+
+def stub_embed(ms_per_text):
+    def embed(texts):
+        time.sleep(ms_per_text * len(texts) / 1000.0)
+        out = []
+        for t in texts:
+            v = [0.0] * 64
+            for tok in t.split():
+                v[int(hashlib.md5(tok.encode()).hexdigest(), 16) % 64] += 1.0
+            n = math.sqrt(sum(x * x for x in v)) or 1.0
+            out.append([x / n for x in v])
+        return out
+    return embed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool", type=int, default=2000)
+    parser.add_argument("--m", nargs="+", type=int, default=[25, 50, 100, 200, 500])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--embed-url", default=None)
+    parser.add_argument("--stub-ms-per-text", type=float, default=4.0)
+    args = parser.parse_args()
+
+    embed = (EmbeddingClient(base_url=args.embed_url).embed
+             if args.embed_url else stub_embed(args.stub_ms_per_text))
+    predict = ranking_model.predict_scores if ranking_model.model is not None else None
+    weights = settings.RANK_CASCADE_WEIGHTS
+    pool = make_pool(args.pool)
+
+    def run(m):
+        t0 = time.perf_counter()
+        rows = rank_cascade(JD, pool, embed, predict, top_m=m, weights=weights)
+        return rows, (time.perf_counter() - t0) * 1000
+
+    full, full_ms = run(len(pool))
+    full_top = {r["id"] for r in full[:args.k]}
+
+    print(f"pool={len(pool)} k={args.k} model={'on' if predict else 'off'} "
+          f"embed={'service' if args.embed_url else 'stub'}")
+    print(f"{'M':>6} {'latency ms':>11} {'speedup':>8} {'top-K overlap':>14}")
+    print(f"{'full':>6} {full_ms:>11.1f} {1.0:>8.2f} {1.0:>14.3f}")
+    for m in args.m:
+        if m >= len(pool):
+            continue
+        rows, ms = run(m)
+        overlap = len(full_top & {r["id"] for r in rows[:args.k]}) / max(1, len(full_top))
+        print(f"{m:>6} {ms:>11.1f} {full_ms / ms:>8.2f} {overlap:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
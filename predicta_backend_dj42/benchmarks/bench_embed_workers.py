@@ -0,0 +1,140 @@
+# benchmarks/bench_embed_workers.py
+"""
+Concurrency sweep of serve_embeddings.py over a workers x threads grid.
+
+    python benchmarks/bench_embed_workers.py --workers 1 2 4 8 --threads 1 2 4 \
+        --concurrency 32 --duration 20
+
+Each grid point starts the pre-fork server on a free port, waits for
+/readyz, then hammers /embed from `--concurrency` client threads with
+resume-sized batches. Reports requests/s, texts/s and p50/p99 latency.
+Grid points needing more cores than the host has are skipped.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+TEXT = (
+    "Backend engineer, 6 years of Python, Django and FastAPI. Built NLP "
+    "ranking with sentence-bert and xgboost; pandas, numpy, Docker, AWS. "
+) * 4
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url, proc, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if requests.get(url + "/readyz", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError("server never became ready")
+
+
+def load(url, concurrency, duration, batch):
+    payload = {"texts": [TEXT] * batch}
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client():
+        session = requests.Session()
+        local = []
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                r = session.post(url + "/embed", json=payload, timeout=60)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - t0)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    t0 = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - t0
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "rps": n / elapsed,
+        "texts_per_s": n * batch / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if n else float("nan"),
+        "p99_ms": latencies[int(0.99 * (n - 1))] * 1000 if n else float("nan"),
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--batch", type=int, default=8, help="texts per request")
+    parser.add_argument("--pin-cpus", action="store_true")
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"host cores: {cores}, backend: {os.getenv('EMBED_BACKEND', 'torch')}")
+    print(f"{'workers':>7} {'threads':>7} {'req/s':>8} {'texts/s':>9} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'errors':>6}")
+
+    for w in args.workers:
+        for t in args.threads:
+            if w * t > cores:
+                continue
+            port = free_port()
+            cmd = [sys.executable, str(ROOT / "serve_embeddings.py"),
+                   "--workers", str(w), "--threads", str(t), "--port", str(port)]
+            if args.pin_cpus:
+                cmd.append("--pin-cpus")
+            env = {**os.environ, "EMBED_LOG_LEVEL": "warning"}
+            proc = subprocess.Popen(cmd, cwd=ROOT, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            url = f"http://127.0.0.1:{port}"
+            try:
+                wait_ready(url, proc)
+                r = load(url, args.concurrency, args.duration, args.batch)
+                print(f"{w:>7} {t:>7} {r['rps']:>8.1f} {r['texts_per_s']:>9.1f} "
+                      f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['errors']:>6}",
+                      flush=True)
+            except Exception as e:
+                print(f"{w:>7} {t:>7} failed: {e}")
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+if __name__ == "__main__":
+    main()
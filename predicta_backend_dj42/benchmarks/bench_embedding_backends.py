@@ -0,0 +1,97 @@
+# benchmarks/bench_embedding_backends.py
+"""
+CPU latency / throughput comparison of the embedding backends.
+
+    python benchmarks/bench_embedding_backends.py
+    python benchmarks/bench_embedding_backends.py --backends torch onnx-int8 --threads 4
+
+For each backend and batch size it reports median / p95 latency per batch
+and texts per second, plus the worst cosine similarity against torch.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import embedding_backends as eb  # noqa: E402
+
+RESUME_SNIPPET = (
+    "Experienced software engineer with {n} years building Python and Django "
+    "services, REST APIs, data pipelines with pandas and numpy, and NLP models "
+    "using sentence-bert and xgboost. Deployed on AWS with Docker. "
+)
+
+
+def make_corpus(size):
+    # Mix of short and resume-length texts so padding cost shows up.
+    out = []
+    for i in range(size):
+        reps = 1 + (i % 6)
+        out.append((RESUME_SNIPPET.format(n=i % 15)) * reps)
+    return out
+
+
+def bench(backend, texts, batch_size, repeats):
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    lat = []
+    for _ in range(repeats):
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            t0 = time.perf_counter()
+            backend.encode(batch, batch_size=batch_size)
+            lat.append(time.perf_counter() - t0)
+    total = sum(lat)
+    lat.sort()
+    return {
+        "p50_ms": statistics.median(lat) * 1000,
+        "p95_ms": lat[int(0.95 * (len(lat) - 1))] * 1000,
+        "texts_per_s": (len(texts) * repeats) / total if total else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--corpus", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="intra-op threads for every backend")
+    args = parser.parse_args()
+
+    if args.threads:
+        os.environ["EMBED_INTRA_OP_THREADS"] = str(args.threads)
+
+    texts = make_corpus(args.corpus)
+    reference = None
+    print(f"{'backend':<10} {'batch':>5} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'texts/s':>9} {'min cos':>8}")
+
+    for name in args.backends:
+        try:
+            backend = eb.load_backend(name)
+        except Exception as e:
+            print(f"{name:<10} unavailable: {e}")
+            continue
+
+        vecs = backend.encode(texts)
+        if reference is None and name == "torch":
+            reference = vecs
+        min_cos = (
+            float((vecs * reference).sum(axis=1).min())
+            if reference is not None and reference.shape == vecs.shape
+            else float("nan")
+        )
+
+        for bs in args.batch_sizes:
+            r = bench(backend, texts, bs, args.repeats)
+            print(f"{name:<10} {bs:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['texts_per_s']:>9.1f} {min_cos:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
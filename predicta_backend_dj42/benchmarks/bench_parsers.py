@@ -0,0 +1,138 @@
+# benchmarks/bench_parsers.py
+"""
+Resume parsing throughput: legacy temp-file path vs in-memory parsers,
+cold vs warm parsed-text cache.
+
+    python benchmarks/bench_parsers.py --files 200 --pages 4
+
+The corpus is generated: half multi-page PDFs, half DOCX files with a
+skills table. "legacy" is the pre-parsers.py implementation (PDF written to
+a NamedTemporaryFile and read back by pdfminer.high_level).
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "predicta_backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+
+from core import parsers  # noqa: E402
+
+WORDS = ("python django rest api aws docker react sql pandas numpy team project "
+         "delivered designed improved customer stakeholders kubernetes").split()
+
+
+def make_pdf(pages):
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = [b"BT /F1 10 Tf 14 TL 72 740 Td"]
+        ops += [b"(%s) '" % line.encode() for line in lines]
+        ops.append(b"ET")
+        stream = b"\n".join(ops)
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objs))
+        kids.append(b"%d 0 R" % len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+    out, offsets = io.BytesIO(), []
+    out.write(b"%PDF-1.4\n")
+    for n, body in enumerate(objs, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (n, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objs) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(rnd, paragraphs):
+    from docx import Document
+    doc = Document()
+    for _ in range(paragraphs):
+        doc.add_paragraph(" ".join(rnd.choice(WORDS) for _ in range(25)))
+    table = doc.add_table(rows=4, cols=2)
+    for r in range(4):
+        table.cell(r, 0).text = f"Skill {r}"
+        table.cell(r, 1).text = ", ".join(rnd.sample(WORDS, 4))
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def make_corpus(n, pages, seed=3):
+    rnd = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        if i % 2:
+            corpus.append((f"cv{i}.docx", make_docx(rnd, pages * 10)))
+        else:
+            body = [[" ".join(rnd.choice(WORDS) for _ in range(12)) for _ in range(40)]
+                    for _ in range(pages)]
+            corpus.append((f"cv{i}.pdf", make_pdf(body)))
+    return corpus
+
+
+def legacy_extract(data, filename):
+    from docx import Document
+    from pdfminer.high_level import extract_text as pdf_text
+    if filename.endswith(".pdf"):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(data)
+            tmp.flush()
+            return pdf_text(tmp.name)
+    return "\n".join(p.text for p in Document(io.BytesIO(data)).paragraphs)
+
+
+def timed(fn, corpus):
+    t0 = time.perf_counter()
+    for name, data in corpus:
+        fn(data, name)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.files, args.pages)
+    mb = sum(len(d) for _, d in corpus) / 1e6
+    cache = caches[settings.PARSER_CACHE_ALIAS]
+    cache.clear()
+
+    runs = [
+        ("legacy (tempfile)", legacy_extract),
+        ("in-memory", parsers.extract_text),
+        ("cached, cold", parsers.extract_text_cached),
+        ("cached, warm", parsers.extract_text_cached),
+    ]
+    print(f"files={len(corpus)} pages/file={args.pages} corpus={mb:.1f} MB "
+          f"cache={cache.__class__.__name__}")
+    print(f"{'path':<20} {'seconds':>9} {'files/s':>9}")
+    for label, fn in runs:
+        secs = timed(fn, corpus)
+        print(f"{label:<20} {secs:>9.2f} {len(corpus) / secs:>9.1f}")
+    cache.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_rank_payload.py
+"""
+Serialization time and response bytes of a rank response.
+
+    python benchmarks/bench_rank_payload.py --pool 200 1000 5000
+
+Rows come from scoring.rank() over a synthetic pool (as in
+bench_cascade.py). Each variant renders them with DRF's JSONRenderer or
+core.renderers.ORJSONRenderer, optionally projected to ?fields=id,name,score,
+and compresses the result the way CompressionMiddleware would (gzip and
+brotli).
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "predicta_backend.settings")
+
+import brotli  # noqa: E402
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from bench_cascade import JD, make_pool  # noqa: E402
+from core.ranking import parse_fields, project  # noqa: E402
+from core.renderers import ORJSONRenderer  # noqa: E402
+from core.scoring import rank  # noqa: E402
+
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool", nargs="+", type=int, default=[200, 1000, 5000])
+    parser.add_argument("--fields", default="id,name,score")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    codecs = [("gzip", lambda b: gzip.compress(b, compresslevel=settings.COMPRESS_GZIP_LEVEL)),
+              ("br", lambda b: brotli.compress(b, quality=settings.COMPRESS_BROTLI_QUALITY))]
+
+    fields = parse_fields({"fields": args.fields})
+    print(f"{'pool':>6} {'renderer':>9} {'fields':>7} {'render ms':>10} {'bytes':>11}"
+          + "".join(f" {name + ' ms':>9} {name + ' bytes':>11}" for name, _ in codecs))
+    for n in args.pool:
+        rows = rank(JD, make_pool(n))
+        for label, data in (("all", rows), ("subset", project(rows, fields))):
+            for name, renderer in (("drf", JSONRenderer()), ("orjson", ORJSONRenderer())):
+                body, ms = best_ms(lambda: renderer.render(data), args.repeat)
+                line = f"{n:>6} {name:>9} {label:>7} {ms:>10.1f} {len(body):>11,}"
+                for _, compress in codecs:
+                    packed, cms = best_ms(lambda: compress(body), args.repeat)
+                    line += f" {cms:>9.1f} {len(packed):>11,}"
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+# benchmarks/loadtest.py
+"""
+End-to-end load test of the recruiter flow, against local stand-ins.
+
+    python benchmarks/loadtest.py --users 20 --duration 60 --out run.json
+    python benchmarks/loadtest.py --users 20 --duration 60 --compare run.json --max-regression 20
+    python benchmarks/loadtest.py --target http://127.0.0.1:8000 ...   # an already running server
+
+Unless --target is given it starts, in a temporary directory:
+- a deterministic embedding stub (POST /embed, hashing vectors, optional
+  --embed-ms-per-text of simulated encode time),
+- the Django app (benchmarks/loadtest_app.py) on a fresh SQLite database,
+  under gunicorn (--stack wsgi) or uvicorn (--stack asgi), with Mongo
+  replaced by mongomock unless --mongo-uri points at a real mongod,
+- a `run_tasks` worker for the background precompute queue (--task-workers).
+
+Every virtual user (asyncio + httpx) signs up, logs in, creates a job and
+bulk-uploads --candidates resumes (one zip), then until the run ends picks
+weighted actions: rank (tfidf / sbert / cascade / incremental), list and
+export, analytics overview and events, or another job with a new upload.
+Users start --spawn-rate per second. Resumes and choices come from --seed.
+
+Reports requests, rps, error rate and p50/p95/p99 latency per endpoint on
+stdout and as JSON (--out). --compare prints the change against an earlier
+JSON; --max-regression N exits 1 if any endpoint's p95 grew by more than
+N% or its error rate by more than N percentage points.
+
+Starting the stand-ins needs gunicorn or uvicorn and, without --mongo-uri,
+mongomock: `pip install -r benchmarks/requirements.txt`.
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SKILLS = ("python django flask fastapi rest api aws docker react javascript java spring "
+          "nlp bert sbert xgboost pandas numpy sql postgres kubernetes").split()
+SOFT = "communication teamwork leadership mentoring presentations adaptable".split()
+FILLER = ("managed delivered team project customer stakeholders built designed improved "
+          "process reports office sales logistics retail kitchen warehouse").split()
+
+# name -> weight of the steady-state actions
+ACTIONS = {
+    "rank_tfidf": 6,
+    "rank_incremental": 2,
+    "rank_sbert": 2,
+    "rank_cascade": 1,
+    "list_jobs": 3,
+    "list_candidates": 2,
+    "export_csv": 2,
+    "analytics_overview": 2,
+    "log_event": 3,
+    "new_job": 1,
+}
+
+
+# ---------- Stand-ins ----------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stub_vector(text, dim=64):
+    v = [0.0] * dim
+    for tok in text.split():
+        v[int(hashlib.md5(tok.encode()).hexdigest(), 16) % dim] += 1.0
+    n = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / n for x in v]
+
+
+def start_embedding_stub(ms_per_text):
+    """Deterministic stand-in for sbert_server.py's POST /embed."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["texts"]
+            time.sleep(ms_per_text * len(texts) / 1000)
+            body = json.dumps({"embeddings": [stub_vector(t) for t in texts], "dim": 64,
+                               "model": "stub", "backend": "stub"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def server_cmd(stack, port, workers, threads):
+    if stack == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "--pythonpath", "benchmarks",
+                "loadtest_app:application", "--bind", f"127.0.0.1:{port}",
+                "--workers", str(workers), "--worker-class", "gthread", "--threads", str(threads),
+                "--backlog", "2048", "--timeout", "120", "--keep-alive", "75", "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "--app-dir", "benchmarks", "loadtest_app:asgi_application",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+            "--backlog", "2048", "--log-level", "warning", "--no-access-log"]
+
+
+def wait_ready(url, procs, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if any(p.poll() is not None for p in procs):
+            raise RuntimeError("a service exited during startup")
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise TimeoutError("server never became ready")
+
+
+class Services:
+    """Embedding stub, Django server and task workers for one run."""
+
+    def __init__(self, args):
+        self.args = args
+        self.procs = []
+        self.tmp = tempfile.TemporaryDirectory(prefix="predicta-loadtest-")
+
+    def __enter__(self):
+        args = self.args
+        self.embed_server, embed_url = start_embedding_stub(args.embed_ms_per_text)
+        env = {
+            **os.environ,
+            "SQLITE_PATH": os.path.join(self.tmp.name, "db.sqlite3"),
+            "EMBEDDING_API_BASE": embed_url,
+            "MEDIA_ROOT": os.path.join(self.tmp.name, "media"),
+            "PARSER_CACHE_DIR": os.path.join(self.tmp.name, "parsed_text"),
+            "ANALYTICS_SPOOL_DIR": os.path.join(self.tmp.name, "spool"),
+            "DEBUG": "False",
+            "ALLOWED_HOSTS": "127.0.0.1,localhost",
+            "INGEST_WORKERS": "0",
+        }
+        if args.mongo_uri:
+            env["MONGO_URI"] = args.mongo_uri
+            env["MONGO_DB"] = f"predicta_loadtest_{int(time.time())}"
+        else:
+            env["LOADTEST_MONGOMOCK"] = "1"
+            if args.workers > 1:
+                print("note: mongomock is per process; analytics differ between workers")
+
+        app = [sys.executable, "benchmarks/loadtest_app.py"]
+        subprocess.run([*app, "migrate", "-v", "0"], cwd=ROOT, env=env, check=True)
+        port = free_port()
+        quiet = {"stdout": subprocess.DEVNULL, "stderr": None if args.verbose else subprocess.DEVNULL}
+        self.procs.append(subprocess.Popen(
+            server_cmd(args.stack, port, args.workers, args.threads), cwd=ROOT, env=env, **quiet))
+        for _ in range(args.task_workers):
+            self.procs.append(subprocess.Popen([*app, "run_tasks", "--poll", "0.2"],
+                                               cwd=ROOT, env=env, **quiet))
+        self.url = f"http://127.0.0.1:{port}"
+        wait_ready(self.url + "/metrics", self.procs)
+        return self
+
+    def __exit__(self, *exc):
+        for p in self.procs:
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        self.embed_server.shutdown()
+        self.tmp.cleanup()
+
+
+# ---------- Driver ----------
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}   # endpoint -> [seconds]
+        self.errors = {}      # endpoint -> {reason: count}
+
+    def add(self, name, seconds, error=None):
+        self.latencies.setdefault(name, []).append(seconds)
+        if error:
+            reasons = self.errors.setdefault(name, {})
+            reasons[error] = reasons.get(error, 0) + 1
+
+    def report(self, elapsed):
+        out = {}
+        for name in sorted(self.latencies):
+            out[name] = summarize(self.latencies[name], self.errors.get(name, {}), elapsed)
+        everything = [x for v in self.latencies.values() for x in v]
+        errors = {}
+        for reasons in self.errors.values():
+            for k, v in reasons.items():
+                errors[k] = errors.get(k, 0) + v
+        return out, summarize(everything, errors, elapsed)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def summarize(latencies, errors, elapsed):
+    lat = sorted(latencies)
+    n, n_err = len(lat), sum(errors.values())
+    return {
+        "requests": n,
+        "errors": n_err,
+        "error_rate": n_err / n if n else 0.0,
+        "error_reasons": errors,
+        "rps": n / elapsed if elapsed else 0.0,
+        "mean_ms": 1000 * sum(lat) / n if n else float("nan"),
+        "p50_ms": 1000 * percentile(lat, 0.50),
+        "p95_ms": 1000 * percentile(lat, 0.95),
+        "p99_ms": 1000 * percentile(lat, 0.99),
+        "max_ms": 1000 * lat[-1] if lat else float("nan"),
+    }
+
+
+def resume(rng, i):
+    skills = rng.sample(SKILLS, rng.randint(3, 9))
+    words = skills * 3 + rng.sample(SOFT, 2) + rng.choices(FILLER, k=rng.randint(80, 250))
+    rng.shuffle(words)
+    return (f"Candidate {i}\ncandidate{i}@example.com\n{rng.randint(1, 15)} years of experience\n"
+            + " ".join(words))
+
+
+def resume_zip(rng, n, offset=0):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(offset, offset + n):
+            zf.writestr(f"candidate_{i}.txt", resume(rng, i))
+    return buf.getvalue()
+
+
+def job_description(rng):
+    return ("We are hiring an engineer with " + ", ".join(rng.sample(SKILLS, 6))
+            + ". " + " ".join(rng.choices(FILLER, k=60)))
+
+
+class VirtualUser:
+    def __init__(self, index, client, stats, args, stop_at):
+        self.i = index
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.stop_at = stop_at
+        self.rng = random.Random(args.seed * 100_003 + index)
+        self.email = f"lt{index}-{args.seed}-{int(time.time())}@example.com"
+        self.headers = {}
+        self.jobs = []
+        self.uploaded = 0
+
+    async def call(self, name, method, url, expect=(200,), **kw):
+        t0 = time.perf_counter()
+        error = None
+        try:
+            resp = await self.client.request(method, url, headers=self.headers, **kw)
+            if resp.status_code not in expect:
+                error = f"HTTP {resp.status_code}"
+        except httpx.HTTPError as e:
+            resp, error = None, type(e).__name__
+        self.stats.add(name, time.perf_counter() - t0, error)
+        return resp if error is None else None
+
+    async def onboard(self):
+        r = await self.call("POST /api/auth/signup", "POST", "/api/auth/signup", expect=(201,),
+                            json={"name": f"LT {self.i}", "email": self.email, "password": "loadtest-pw-1"})
+        if r is None:
+            return False
+        r = await self.call("POST /api/auth/login", "POST", "/api/auth/login",
+                            json={"username": self.email, "password": "loadtest-pw-1"})
+        token = (r.json() if r is not None else {}).get("access") or ""
+        if not token:
+            return False
+        self.headers = {"Authorization": f"Bearer {token}"}
+        await self.call("GET /api/me", "GET", "/api/me")
+        return await self.new_job()
+
+    async def new_job(self):
+        r = await self.call("POST /api/jobs/", "POST", "/api/jobs/", expect=(201,),
+                            json={"title": f"Job {len(self.jobs)}", "jd_text": job_description(self.rng)})
+        if r is None:
+            return False
+        job = r.json()["id"]
+        await self.call(
+            "POST /api/candidates/bulk/", "POST", "/api/candidates/bulk/", expect=(201,),
+            data={"job": str(job)},
+            files={"archive": ("resumes.zip", resume_zip(self.rng, self.args.candidates, self.uploaded),
+                               "application/zip")},
+        )
+        self.uploaded += self.args.candidates
+        self.jobs.append(job)
+        await self.call("POST /api/analytics/log-event/", "POST", "/api/analytics/log-event/",
+                        json={"event": "job", "email": self.email})
+        return True
+
+    async def step(self, action):
+        job = self.rng.choice(self.jobs)
+        if action.startswith("rank_"):
+            mode = action[5:]
+            body = {"incremental": True} if mode == "incremental" else {"mode": mode}
+            r = await self.call(f"POST /api/jobs/{{id}}/rank/ [{mode}]", "POST",
+                                f"/api/jobs/{job}/rank/", json=body)
+            if r is not None:
+                await self.call("POST /api/analytics/log-event/", "POST", "/api/analytics/log-event/",
+                                json={"event": "ranking", "email": self.email})
+        elif action == "list_jobs":
+            await self.call("GET /api/jobs/", "GET", "/api/jobs/")
+        elif action == "list_candidates":
+            await self.call("GET /api/candidates/", "GET", "/api/candidates/", params={"job": job})
+        elif action == "export_csv":
+            await self.call("GET /api/jobs/{id}/export.csv/", "GET", f"/api/jobs/{job}/export.csv/",
+                            expect=(200, 404))
+        elif action == "analytics_overview":
+            await self.call("GET /api/analytics/overview/", "GET", "/api/analytics/overview/",
+                            params={"email": self.email})
+        elif action == "log_event":
+            await self.call("POST /api/analytics/log-event/", "POST", "/api/analytics/log-event/",
+                            json={"event": self.rng.choice(["export", "ranking", "job"]), "email": self.email})
+        elif action == "new_job":
+            await self.new_job()
+
+    async def run(self):
+        if not await self.onboard():
+            return
+        names, weights = zip(*ACTIONS.items())
+        while time.perf_counter() < self.stop_at:
+            await self.step(self.rng.choices(names, weights)[0])
+            if self.args.think_ms:
+                await asyncio.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+
+async def drive(url, args):
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        t0 = time.perf_counter()
+        stop_at = t0 + args.duration
+        tasks = []
+        for i in range(args.users):
+            tasks.append(asyncio.create_task(VirtualUser(i, client, stats, args, stop_at).run()))
+            if args.spawn_rate:
+                await asyncio.sleep(1 / args.spawn_rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t0
+    return stats, elapsed
+
+
+# ---------- Output ----------
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def print_table(endpoints, total):
+    print(f"{'endpoint':<42} {'reqs':>6} {'rps':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, s in [*endpoints.items(), ("TOTAL", total)]:
+        print(f"{name:<42} {s['requests']:>6} {s['rps']:>7.1f} {100 * s['error_rate']:>6.1f} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+
+
+def compare(result, baseline_path, max_regression):
+    with open(baseline_path) as f:
+        base = json.load(f)
+    print(f"\nvs {baseline_path} ({base['meta'].get('git') or '?'}): change in rps / p95 / error rate")
+    regressions = []
+    for name, s in result["endpoints"].items():
+        b = base["endpoints"].get(name)
+        if b is None:
+            print(f"{name:<42} (new)")
+            continue
+        d_rps = 100 * (s["rps"] / b["rps"] - 1) if b["rps"] else float("nan")
+        d_p95 = 100 * (s["p95_ms"] / b["p95_ms"] - 1) if b["p95_ms"] else float("nan")
+        d_err = 100 * (s["error_rate"] - b["error_rate"])
+        print(f"{name:<42} {d_rps:>+7.1f}% {d_p95:>+8.1f}% {d_err:>+7.1f}pp")
+        if max_regression is not None and (d_p95 > max_regression or d_err > max_regression):
+            regressions.append(name)
+    return regressions
+
+
+def missing_modules(args):
+    """Packages the local stand-ins need (benchmarks/requirements.txt) that are not installed."""
+    needed = ["gunicorn" if args.stack == "wsgi" else "uvicorn"]
+    if not args.mongo_uri:
+        needed.append("mongomock")
+    return [m for m in needed if importlib.util.find_spec(m) is None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--spawn-rate", type=float, default=5.0, help="users started per second (0 = all at once)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds, from the first user's start")
+    parser.add_argument("--candidates", type=int, default=50, help="resumes per uploaded job")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's actions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout, seconds")
+    parser.add_argument("--target", help="drive this running server instead of starting one")
+    parser.add_argument("--stack", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--workers", type=int, default=1, help="server processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument("--task-workers", type=int, default=1, help="run_tasks processes (precompute)")
+    parser.add_argument("--embed-ms-per-text", type=float, default=0.0, help="simulated encode cost")
+    parser.add_argument("--mongo-uri", help="real mongod instead of mongomock")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to diff against")
+    parser.add_argument("--max-regression", type=float, help="with --compare: exit 1 past this %% / pp")
+    parser.add_argument("--verbose", action="store_true", help="show server stderr")
+    args = parser.parse_args()
+
+    missing = [] if args.target else missing_modules(args)
+    if missing:
+        sys.exit(f"loadtest: {', '.join(missing)} not installed; pip install -r benchmarks/requirements.txt")
+
+    started = datetime.now(timezone.utc).isoformat()
+    if args.target:
+        stats, elapsed = asyncio.run(drive(args.target.rstrip("/"), args))
+    else:
+        with Services(args) as services:
+            stats, elapsed = asyncio.run(drive(services.url, args))
+
+    endpoints, total = stats.report(elapsed)
+    result = {
+        "meta": {"started": started, "elapsed_s": elapsed, "git": git_rev(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}},
+        "endpoints": endpoints,
+        "total": total,
+    }
+    print_table(endpoints, total)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        regressions = compare(result, args.compare, args.max_regression)
+        if regressions:
+            print(f"\nregressed beyond {args.max_regression:g}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
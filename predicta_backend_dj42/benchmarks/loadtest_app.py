@@ -0,0 +1,46 @@
+# benchmarks/loadtest_app.py
+"""
+The Predicta app with local stand-ins, started by benchmarks/loadtest.py.
+
+    gunicorn --pythonpath benchmarks loadtest_app:application          # WSGI
+    uvicorn --app-dir benchmarks loadtest_app:asgi_application         # ASGI
+    python benchmarks/loadtest_app.py migrate | run_tasks --poll 0.2   # manage.py
+
+With LOADTEST_MONGOMOCK=1 pymongo's MongoClient is swapped for mongomock's
+in-memory client before Django loads, so analytics need no mongod. Each
+process then has its own store: run one server process (threads are fine),
+and note that mongomock has no async client, so the async views stay off
+(ASYNC_VIEWS=0) even under ASGI. Point MONGO_URI at a real mongod instead
+for multi-process or ASGI runs.
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "predicta_backend.settings")
+
+if os.getenv("LOADTEST_MONGOMOCK") == "1":
+    import mongomock
+    import pymongo
+
+    pymongo.MongoClient = mongomock.MongoClient
+    os.environ["ASYNC_VIEWS"] = "0"
+
+
+def __getattr__(name):
+    # Build only the application the server asks for.
+    if name == "application":
+        from predicta_backend.wsgi import application
+        return application
+    if name == "asgi_application":
+        from predicta_backend.asgi import application
+        return application
+    raise AttributeError(name)
+
+
+if __name__ == "__main__":
+    from django.core.management import execute_from_command_line
+
+    execute_from_command_line(["manage.py", *sys.argv[1:]])
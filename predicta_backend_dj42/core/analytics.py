@@ -1,12 +1,144 @@
 # core/analytics.py
 from datetime import datetime, timedelta
-from .mongo_client import get_mongo_db
+
+from django.conf import settings
+from pymongo import ASCENDING
+
+from stage_timing import timed
+
+from .analytics_writer import get_writer
+from .mongo_client import get_mongo_db, get_async_mongo_db
+
+# Raw event collection -> (rollup counter, timestamp field)
+ROLLUP_FIELDS = {
+    "recruiter_logins": ("logins", "logged_in_at"),
+    "recruiter_jobs": ("jobs", "created_at"),
+    "matching_runs": ("matching_runs", "run_at"),
+    "exports": ("exports", "exported_at"),
+}
+ROLLUP_COUNTERS = [counter for counter, _ in ROLLUP_FIELDS.values()]
+ALL_SCOPE = "*"  # rollups across every recruiter
+
+INDEXES = {
+    "analytics_daily": [[("scope", ASCENDING), ("day", ASCENDING)]],
+    "recruiter_logins": [[("user_email", ASCENDING), ("logged_in_at", ASCENDING)],
+                         [("user_id", ASCENDING), ("logged_in_at", ASCENDING)]],
+    "recruiter_jobs": [[("user_email", ASCENDING), ("created_at", ASCENDING)],
+                       [("user_id", ASCENDING), ("created_at", ASCENDING)]],
+    "matching_runs": [[("user_email", ASCENDING), ("run_at", ASCENDING)],
+                      [("job_id", ASCENDING), ("run_at", ASCENDING)]],
+    "exports": [[("user_email", ASCENDING), ("exported_at", ASCENDING)],
+                [("job_id", ASCENDING), ("exported_at", ASCENDING)]],
+    "resume_uploads": [[("job_id", ASCENDING), ("uploaded_at", ASCENDING)]],
+    "ranking_results": [[("job_id", ASCENDING), ("created_at", ASCENDING)]],
+}
+
+
+def _write(collection, doc):
+    """
+    Queue an analytics event for the background writer (ANALYTICS_ASYNC),
+    or insert it right away.
+    """
+    if settings.ANALYTICS_ASYNC:
+        get_writer().submit(collection, doc)
+    else:
+        db = get_mongo_db()
+        db[collection].insert_one(doc)
+        apply_rollups(db, collection, [doc])
+
+
+async def _awrite(collection, doc):
+    """
+    _write() for async views. The queue hand-off does not block the loop
+    as long as ANALYTICS_ENQUEUE_TIMEOUT is 0 (drop when full).
+    """
+    if settings.ANALYTICS_ASYNC:
+        get_writer().submit(collection, doc)
+    else:
+        db = get_async_mongo_db()
+        await db[collection].insert_one(doc)
+        await aapply_rollups(db, collection, [doc])
+
+
+# ---------- Rollups ----------
+
+def rollup_increments(collection, docs):
+    """{(scope, day): {counter: n}} for a batch of raw events."""
+    if collection not in ROLLUP_FIELDS:
+        return {}
+    counter, ts_field = ROLLUP_FIELDS[collection]
+    incs = {}
+    for doc in docs:
+        ts = doc.get(ts_field)
+        if ts is None:
+            continue
+        day = ts.strftime("%Y-%m-%d")
+        scopes = [ALL_SCOPE] + ([doc["user_email"]] if doc.get("user_email") else [])
+        for scope in scopes:
+            for key in ((scope, day), (scope, "total")):
+                bucket = incs.setdefault(key, {})
+                bucket[counter] = bucket.get(counter, 0) + 1
+    return incs
+
+
+def _upsert_rollup(db, scope, day, update):
+    db.analytics_daily.update_one(
+        {"_id": f"{scope}|{day}"},
+        {**update, "$setOnInsert": {"scope": scope, "day": day}},
+        upsert=True,
+    )
+
+
+def apply_rollups(db, collection, docs):
+    """
+    $inc the daily and all-time rollup documents for newly stored events:
+    one upsert per (recruiter, day) per batch, whatever the batch size.
+    """
+    for (scope, day), counts in rollup_increments(collection, docs).items():
+        _upsert_rollup(db, scope, day, {"$inc": counts})
+
+
+async def aapply_rollups(db, collection, docs):
+    for (scope, day), counts in rollup_increments(collection, docs).items():
+        await db.analytics_daily.update_one(
+            {"_id": f"{scope}|{day}"},
+            {"$inc": counts, "$setOnInsert": {"scope": scope, "day": day}},
+            upsert=True,
+        )
+
+
+def ensure_indexes(db=None):
+    db = db if db is not None else get_mongo_db()
+    created = []
+    for collection, specs in INDEXES.items():
+        for keys in specs:
+            created.append(db[collection].create_index(keys))
+    return created
+
+
+def backfill_rollups(db=None):
+    """
+    Rebuild analytics_daily from the raw event collections. Idempotent:
+    counts are $set, so it can be re-run; events logged while it runs may
+    be missed, so run it before traffic or re-run it afterwards.
+    """
+    db = db if db is not None else get_mongo_db()
+    totals = {}
+    for collection, (counter, ts_field) in ROLLUP_FIELDS.items():
+        cursor = db[collection].find({}, {ts_field: 1, "user_email": 1, "_id": 0})
+        for (scope, day), counts in rollup_increments(collection, cursor).items():
+            bucket = totals.setdefault((scope, day), dict.fromkeys(ROLLUP_COUNTERS, 0))
+            bucket[counter] += counts[counter]
+
+    db.analytics_daily.delete_many({"_id": {"$nin": [f"{s}|{d}" for s, d in totals]}})
+    for (scope, day), counts in totals.items():
+        _upsert_rollup(db, scope, day, {"$set": counts})
+    return len(totals)
 
 
 def log_recruiter_login(user, ip=None, user_agent=None):
     print("⚡ Logging recruiter login to MongoDB...")
-    db = get_mongo_db()
-    db.recruiter_logins.insert_one({
+    _write("recruiter_logins", {
         "user_id": user.id,
         "email": user.email,
         "name": user.first_name or "",
@@ -17,71 +149,27 @@ def log_recruiter_login(user, ip=None, user_agent=None):
 
 
 def log_job_created(user, job):
-    db = get_mongo_db()
-    db.recruiter_jobs.insert_one({
+    _write("recruiter_jobs", {
         "user_id": user.id,
         "job_id": job.id,
         "title": job.title,
         "created_at": datetime.utcnow(),
     })
 
+@timed("analytics.ranking_run")
 def log_ranking_run(user, job, results_count):
-    db = get_mongo_db()
-    db.matching_runs.insert_one({
+    _write("matching_runs", {
         "user_id": user.id,
         "job_id": job.id,
         "results_count": results_count,
         "run_at": datetime.utcnow(),
     })
 
-def save_job_description(job):
-    """
-    Store the job description text in MongoDB.
-    Satisfies FR7.1 for job descriptions.
-    """
-    db = get_mongo_db()
-    doc = {
-        "job_id": job.id,
-        "owner_id": getattr(job, "owner_id", None),
-        "title": getattr(job, "title", ""),
-        "jd_text": getattr(job, "jd_text", ""),
-        "remove_stopwords": getattr(job, "remove_stopwords", None),
-        "anonymize_pii": getattr(job, "anonymize_pii", None),
-        "created_at_django": getattr(job, "created_at", None),
-        "stored_at": datetime.utcnow(),
-    }
-    db.job_descriptions.insert_one(doc)
-
-
-def save_parsed_resume(candidate):
-    """
-    Store parsed resume text in MongoDB.
-    Satisfies FR7.1 for parsed resumes.
-    """
-    db = get_mongo_db()
-    doc = {
-        "candidate_id": candidate.id,
-        "job_id": getattr(candidate, "job_id", None),
-        "name": getattr(candidate, "name", ""),
-        "email": getattr(candidate, "email", ""),
-        "resume_text": getattr(candidate, "resume_text", ""),
-        "uploaded_file": (
-            candidate.uploaded_file.url
-            if getattr(candidate, "uploaded_file", None)
-            else None
-        ),
-        "created_at_django": getattr(candidate, "created_at", None),
-        "stored_at": datetime.utcnow(),
-    }
-    db.parsed_resumes.insert_one(doc)
-
-
 def log_resume_uploaded(user, job, candidate, source="file_upload", parsed_ok=True):
     """
     Log each candidate resume the recruiter uploads or creates.
     """
-    db = get_mongo_db()
-    db.resume_uploads.insert_one({
+    _write("resume_uploads", {
         "user_id": user.id,
         "job_id": job.id,
         "job_title": job.title,
@@ -92,13 +180,39 @@ def log_resume_uploaded(user, job, candidate, source="file_upload", parsed_ok=Tr
         "parsed_ok": parsed_ok,
         "uploaded_at": datetime.utcnow(),
     })
+
+def log_resumes_uploaded(user, job, candidates, source="bulk_upload", parsed_ok=True):
+    """
+    Bulk variant of log_resume_uploaded: one insert_many for a whole batch.
+    """
+    if not candidates:
+        return
+    now = datetime.utcnow()
+    docs = [
+        {
+            "user_id": user.id,
+            "job_id": job.id,
+            "job_title": job.title,
+            "candidate_id": c.id,
+            "candidate_name": c.name,
+            "candidate_email": c.email,
+            "source": source,
+            "parsed_ok": parsed_ok,
+            "uploaded_at": now,
+        }
+        for c in candidates
+    ]
+    if settings.ANALYTICS_ASYNC:
+        get_writer().submit_many("resume_uploads", docs)
+    else:
+        get_mongo_db().resume_uploads.insert_many(docs, ordered=False)
+
+@timed("analytics.ranking_results")
 def log_ranking_results(user, job, rows, top_n=10):
     """
     Store analytics-friendly snapshot of a ranking run:
     top N candidates with scores and basic info.
     """
-    db = get_mongo_db()
-
     # Take only the top N entries for analytics
     top_rows = []
     for r in rows[:top_n]:
@@ -111,7 +225,7 @@ def log_ranking_results(user, job, rows, top_n=10):
             "overlap_skills": r.get("skillOverlap", []),
         })
 
-    db.ranking_results.insert_one({
+    _write("ranking_results", {
         "user_id": user.id,
         "job_id": job.id,
         "job_title": job.title,
@@ -125,8 +239,7 @@ def log_export_csv(user, job, results_count):
     """
     Log each time a recruiter exports ranked candidates to CSV.
     """
-    db = get_mongo_db()
-    db.exports.insert_one({
+    _write("exports", {
         "user_id": user.id,
         "job_id": job.id,
         "job_title": job.title,
@@ -140,6 +253,50 @@ def get_recruiter_summary(user_email=None):
 
     If user_email is provided → filter by that email.
     If not → return global totals.
+
+    Reads the analytics_daily rollups: one all-time document plus one per
+    day of the 30-day window, independent of how many events were logged.
+    """
+    db = get_mongo_db()
+    scope, since = _summary_window(user_email)
+    total = db.analytics_daily.find_one({"_id": f"{scope}|total"})
+    days = list(db.analytics_daily.find(_days_filter(scope, since)).sort("day", ASCENDING))
+    return _summary(total, days)
+
+
+async def aget_recruiter_summary(user_email=None):
+    """get_recruiter_summary() on the async Mongo client."""
+    db = get_async_mongo_db()
+    scope, since = _summary_window(user_email)
+    total = await db.analytics_daily.find_one({"_id": f"{scope}|total"})
+    days = await db.analytics_daily.find(_days_filter(scope, since)).sort("day", ASCENDING).to_list(None)
+    return _summary(total, days)
+
+
+def _summary_window(user_email):
+    return user_email or ALL_SCOPE, (datetime.utcnow() - timedelta(days=30)).strftime("%Y-%m-%d")
+
+
+def _days_filter(scope, since):
+    # "$lt": "a" keeps the "YYYY-MM-DD" documents and skips "total".
+    return {"scope": scope, "day": {"$gte": since, "$lt": "a"}}
+
+
+def _summary(total, days):
+    total = total or {}
+    return {
+        "totals": {counter: total.get(counter, 0) for counter in ROLLUP_COUNTERS},
+        "jobs_by_day": [{"date": d["day"], "count": d["jobs"]} for d in days if d.get("jobs")],
+        "runs_by_day": [
+            {"date": d["day"], "count": d["matching_runs"]} for d in days if d.get("matching_runs")
+        ],
+    }
+
+
+def summary_from_events(user_email=None):
+    """
+    The pre-rollup implementation: count and group the raw events.
+    Slow on large histories; kept to verify rollups against.
     """
     db = get_mongo_db()
     filter_base = {}
@@ -212,12 +369,8 @@ from .mongo_client import get_mongo_db
 # ... existing log_* functions + get_recruiter_summary stay as they are ...
 
 
-def log_analytics_event(event_type, user_email=None):
-    """
-    Lightweight logger used by the frontend.
-    We tag each event with 'user_email' so analytics can be per login.
-    """
-    db = get_mongo_db()
+def frontend_event(event_type, user_email=None):
+    """(collection, doc) for a frontend-reported event, or None if unknown."""
     now = datetime.utcnow()
 
     base = {
@@ -225,37 +378,52 @@ def log_analytics_event(event_type, user_email=None):
     }
 
     if event_type == "job":
-        db.recruiter_jobs.insert_one({
+        return "recruiter_jobs", {
             **base,
             "job_id": None,
             "title": "(frontend only)",
             "created_at": now,
-        })
+        }
 
     elif event_type == "ranking":
-        db.matching_runs.insert_one({
+        return "matching_runs", {
             **base,
             "job_id": None,
             "results_count": 0,
             "run_at": now,
-        })
+        }
 
     elif event_type == "export":
-        db.exports.insert_one({
+        return "exports", {
             **base,
             "job_id": None,
             "job_title": "(frontend only)",
             "results_count": 0,
             "exported_at": now,
-        })
+        }
 
     elif event_type == "login":
-        db.recruiter_logins.insert_one({
+        return "recruiter_logins", {
             **base,
             "email": user_email or "",
             "ip": None,
             "user_agent": None,
             "logged_in_at": now,
-        })
-    else:
-        return
+        }
+    return None
+
+
+def log_analytics_event(event_type, user_email=None):
+    """
+    Lightweight logger used by the frontend.
+    We tag each event with 'user_email' so analytics can be per login.
+    """
+    event = frontend_event(event_type, user_email)
+    if event is not None:
+        _write(*event)
+
+
+async def alog_analytics_event(event_type, user_email=None):
+    event = frontend_event(event_type, user_email)
+    if event is not None:
+        await _awrite(*event)
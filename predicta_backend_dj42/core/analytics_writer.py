@@ -0,0 +1,315 @@
+# core/analytics_writer.py
+"""
+Buffered, non-blocking writer for Mongo analytics events.
+
+Request handlers call submit(collection, doc), which only enqueues. A
+daemon thread drains the bounded queue and writes with one insert_many per
+collection every `batch_size` events or `flush_interval` seconds.
+
+- Queue full: block up to `enqueue_timeout` seconds (backpressure), then
+  drop the event and count it.
+- Mongo unreachable: the batch is appended to a JSON-lines spool file
+  under `spool_dir` and Mongo is not retried for `retry_interval` seconds.
+  Spool files are replayed once writes succeed again; documents keep the
+  _id assigned on the first attempt, so replays never double-insert.
+- Shutdown: close() (registered with atexit) drains what is left.
+
+`after_insert(db, collection, docs)` runs for the documents that were
+newly written (not replayed duplicates); analytics uses it to keep the
+daily rollups in step with the raw events.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class AnalyticsWriter:
+    def __init__(self, get_db, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 enqueue_timeout=0.0, spool_dir=None, retry_interval=30.0,
+                 after_insert=None):
+        self.get_db = get_db
+        self.after_insert = after_insert
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self.retry_interval = retry_interval
+
+        self.counters = {
+            "queued": 0, "flushed": 0, "dropped": 0,
+            "spooled": 0, "replayed": 0, "flush_errors": 0, "hook_errors": 0,
+        }
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._down_until = 0.0
+        self._atexit = False
+
+    # ----------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------
+    def submit(self, collection, doc):
+        """Enqueue one document; False if it was dropped."""
+        self._ensure_started()
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put((collection, doc), timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait((collection, doc))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    def submit_many(self, collection, docs):
+        return sum(1 for doc in docs if self.submit(collection, doc))
+
+    def flush(self, timeout=10.0):
+        """Block until everything submitted so far is written or spooled."""
+        if self._queue is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def close(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)  # wake the thread
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def snapshot(self):
+        with self._lock:
+            out = dict(self.counters)
+        out["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        out["mongo_down"] = time.monotonic() < self._down_until
+        return out
+
+    # ----------------------------------------------------------
+    # Background thread
+    # ----------------------------------------------------------
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First use, or first use after fork: threads do not survive fork.
+            self._queue = queue.Queue(self.max_queue)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+
+    def _run(self):
+        while True:
+            batch, stop = self._take_batch()
+            if batch:
+                self._flush(batch)
+            elif not stop:
+                self._replay_spool()
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop or (self._stop.is_set() and self._queue.empty()):
+                break
+        # Anything submitted after the sentinel.
+        rest = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not None:
+                rest.append(item)
+        if rest:
+            self._flush(rest)
+
+    def _take_batch(self):
+        """Up to batch_size items, waiting at most flush_interval after the first."""
+        batch = []
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, False
+        if item is None:
+            return batch, True
+        batch.append(item)
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _flush(self, batch):
+        groups = {}
+        for collection, doc in batch:
+            groups.setdefault(collection, []).append(doc)
+
+        if time.monotonic() < self._down_until:
+            self._spool(groups)
+            return
+        try:
+            db = self.get_db()
+            for collection in list(groups):
+                docs = groups[collection]
+                self._insert(db, collection, docs)
+                del groups[collection]
+                self._count("flushed", len(docs))
+        except Exception as e:
+            self._count("flush_errors")
+            self._down_until = time.monotonic() + self.retry_interval
+            logger.warning("analytics flush failed, spooling %d events: %s",
+                           sum(map(len, groups.values())), e)
+            self._spool(groups)
+        else:
+            self._replay_spool()
+
+    # ----------------------------------------------------------
+    # Disk spool
+    # ----------------------------------------------------------
+    def _spool(self, groups):
+        n = sum(map(len, groups.values()))
+        if not n:
+            return
+        if self.spool_dir is None:
+            self._count("dropped", n)
+            return
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spool_dir / f"analytics-{os.getpid()}.jsonl"
+            with open(path, "a", encoding="utf-8") as f:
+                for collection, docs in groups.items():
+                    for doc in docs:
+                        f.write(json_util.dumps({"c": collection, "d": doc}) + "\n")
+        except OSError as e:
+            logger.error("analytics spool write failed, dropping %d events: %s", n, e)
+            self._count("dropped", n)
+        else:
+            self._count("spooled", n)
+
+    def _replay_spool(self):
+        if self.spool_dir is None or time.monotonic() < self._down_until:
+            return
+        try:
+            files = sorted(self.spool_dir.glob("analytics-*.jsonl"))
+        except OSError:
+            return
+        for path in files:
+            # Claim the file by renaming it so concurrent workers skip it.
+            claimed = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.replay")
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                groups = {}
+                with open(claimed, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            rec = json_util.loads(line)
+                            groups.setdefault(rec["c"], []).append(rec["d"])
+                db = self.get_db()
+                for collection, docs in groups.items():
+                    for start in range(0, len(docs), self.batch_size):
+                        self._insert(db, collection, docs[start:start + self.batch_size])
+            except Exception as e:
+                self._down_until = time.monotonic() + self.retry_interval
+                logger.warning("analytics spool replay failed: %s", e)
+                os.rename(claimed, path.with_name(f"analytics-{uuid.uuid4().hex}.jsonl"))
+                return
+            os.remove(claimed)
+            self._count("replayed", sum(map(len, groups.values())))
+
+    def _insert(self, db, collection, docs):
+        inserted = insert_new(db, collection, docs)
+        if self.after_insert is not None and inserted:
+            try:
+                self.after_insert(db, collection, inserted)
+            except Exception as e:
+                # The events are stored; retrying would double count.
+                self._count("hook_errors")
+                logger.error("analytics after_insert hook failed: %s", e)
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+
+def insert_new(db, collection, docs):
+    """
+    insert_many that treats already-present _ids (from a replay) as written.
+    Returns the documents that were actually inserted.
+    """
+    try:
+        db[collection].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        details = e.details or {}
+        errors = details.get("writeErrors", [])
+        if details.get("writeConcernErrors") or any(
+            err.get("code") != DUPLICATE_KEY for err in errors
+        ):
+            raise
+        skipped = {err["index"] for err in errors}
+        return [d for i, d in enumerate(docs) if i not in skipped]
+    return docs
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Process-wide writer configured from settings.ANALYTICS_*."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from django.conf import settings
+
+                from .analytics import apply_rollups
+                from .mongo_client import get_mongo_db
+                _writer = AnalyticsWriter(
+                    get_mongo_db,
+                    max_queue=settings.ANALYTICS_QUEUE_SIZE,
+                    batch_size=settings.ANALYTICS_BATCH_SIZE,
+                    flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+                    enqueue_timeout=settings.ANALYTICS_ENQUEUE_TIMEOUT,
+                    spool_dir=settings.ANALYTICS_SPOOL_DIR,
+                    retry_interval=settings.ANALYTICS_RETRY_INTERVAL,
+                    after_insert=apply_rollups,
+                )
+    return _writer
@@ -2,3 +2,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.conf import settings
+
+        import stage_timing
+        from . import signals  # noqa: F401
+
+        stage_timing.configure(settings.STAGE_TIMING)
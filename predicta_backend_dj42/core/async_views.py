@@ -0,0 +1,83 @@
+# core/async_views.py
+"""
+Native async versions of the I/O-bound endpoints, routed instead of the
+DRF views in core/views.py when ASYNC_VIEWS is on (the default under
+predicta_backend/asgi.py). They await the pymongo async client and httpx,
+so one ASGI worker serves many concurrent requests without a thread each.
+
+DRF views cannot be async, so these are plain Django views with the same
+URLs, parameters and response bodies. All three are public (AllowAny)
+like their sync counterparts. Django 4.2's view decorators
+(require_GET, csrf_exempt) wrap async views in sync functions, so methods
+and CSRF exemption are handled here directly.
+"""
+
+import json
+
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from .analytics import aget_recruiter_summary, alog_analytics_event
+from .linkedin_client import JobProviderError, linkedin_client
+
+
+async def linkedin_job_search(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    query = request.GET.get("q") or ""
+    if not query.strip():
+        return JsonResponse({"error": "Missing 'q' query parameter"}, status=400)
+
+    locations = request.GET.getlist("location") or [""]
+    location = locations[0]
+    try:
+        limit = int(request.GET.get("limit", 10))
+    except ValueError:
+        limit = 10
+
+    try:
+        if len(locations) > 1:
+            jobs = await linkedin_client.asearch_jobs_multi(query=query, locations=locations, limit=limit)
+        else:
+            jobs = await linkedin_client.asearch_jobs(query=query, location=location, limit=limit)
+    except JobProviderError as e:
+        return JsonResponse({"error": str(e)}, status=502)
+    return JsonResponse({
+        "query": query,
+        "location": location,
+        "locations": locations,
+        "count": len(jobs),
+        "provider_configured": linkedin_client.is_configured(),
+        "results": jobs,
+    })
+
+
+async def recruiter_analytics(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    data = await aget_recruiter_summary(request.GET.get("email") or None)
+    return JsonResponse(data)
+
+
+async def analytics_log_event(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Invalid JSON"}, status=400)
+    else:
+        data = request.POST
+
+    event = (data.get("event") or "").strip()
+    user_email = (data.get("email") or "").strip() or None
+    if not event:
+        return JsonResponse({"error": "Missing 'event' field"}, status=400)
+
+    await alog_analytics_event(event, user_email=user_email)
+    return JsonResponse({"ok": True})
+
+
+analytics_log_event.csrf_exempt = True  # public beacon, like the DRF view
@@ -0,0 +1,105 @@
+# core/batch_ranking.py
+"""
+Rank one candidate pool against several jobs at once
+(POST /api/jobs/batch-rank/).
+
+    results = rank_jobs(jobs, cands, top_k)     # {job_id: rows}
+    save_all(jobs, results)
+
+Every resume is tokenized once per tokenization setting (the jobs'
+remove_stopwords / anonymize_pii; usually one group), anonymized per
+distinct term (core/term_matrix.py). The JDs and resumes of a group share
+one interned term space and one IDF over all of them, so a job's scores
+differ slightly from a single-job rank() (its IDF counts only that JD);
+with one job they are the same. The L2-normalized TF-IDF rows form a
+candidates x terms and a jobs x terms sparse matrix, and every cosine
+comes from one product of the two. Full rows (term weights, skills) are
+built only for each job's top_k, once per candidate since its TF-IDF
+vector does not depend on the job, from the same term matrix (token
+count and terms included), so no resume is tokenized twice.
+"""
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+
+from stage_timing import stage, timed
+
+from . import ranking
+from .scoring import counted_row, normalize, term_weights
+from .term_matrix import anonymized, idf, term_matrix
+
+
+def _tfidf(doc, term, count, weights, shape):
+    """(raw TF-IDF, L2-normalized TF-IDF) as CSR matrices."""
+    w = count * weights[term]
+    norms = np.sqrt(np.bincount(doc, weights=w * w, minlength=shape[0]))
+    unit = np.divide(w, norms[doc], out=np.zeros_like(w), where=norms[doc] > 0)
+    return (sparse.csr_matrix((w, (doc, term)), shape=shape),
+            sparse.csr_matrix((unit, (doc, term)), shape=shape))
+
+
+def _vector(m, i, vocab):
+    """Row i of CSR matrix `m` as {term: weight}, like scoring.tfidf_vector()."""
+    a, b = m.indptr[i], m.indptr[i + 1]
+    return {vocab[t]: float(w) for t, w in zip(m.indices[a:b], m.data[a:b])}
+
+
+def _rank_group(jobs, cands, top_k, remove_stop, pii):
+    n_jobs = len(jobs)
+    with stage("batch.tokenize"):
+        docs = [normalize(j.jd_text, remove_stop) for j in jobs]
+        docs.extend(normalize(c["resume_text"], remove_stop) for c in cands)
+        index, doc, term, count = term_matrix(docs)
+        vocab = list(index)
+        # rank() breaks term-weight ties by first appearance (its IDF dict order).
+        order = index
+        if pii:
+            vocab, doc, term, count, mapping = anonymized(vocab, doc, term, count)
+            order = {}
+            for i, t in enumerate(mapping):
+                order.setdefault(vocab[t], i)
+
+    with stage("batch.score"):
+        shape = (len(docs), len(vocab))
+        raw, unit = _tfidf(doc, term, count, idf([term], len(docs), len(vocab)), shape)
+        token_counts = np.bincount(doc, weights=count, minlength=len(docs))
+        scores = (unit[n_jobs:] @ unit[:n_jobs].T).toarray()   # candidates x jobs
+        # Ties keep pool order, as rank()'s stable sort does.
+        tops = [np.argsort(-scores[:, k], kind="stable")[:top_k] for k in range(n_jobs)]
+
+    with stage("batch.rows"):
+        rows_of = {}
+        for i in sorted({int(i) for top in tops for i in top}):
+            vec = _vector(raw, n_jobs + i, vocab)
+            rows_of[i] = counted_row(cands[i], int(token_counts[n_jobs + i]), set(vec), vec, 0.0, [], order)
+        out = {}
+        for k, job in enumerate(jobs):
+            jd_top = [x["term"] for x in term_weights(_vector(raw, k, vocab), order)[:30]]
+            out[job.id] = [
+                {**rows_of[i], "score": float(scores[i, k]), "jdTopTerms": jd_top}
+                for i in map(int, tops[k])
+            ]
+    return out
+
+
+@timed("rank.batch")
+def rank_jobs(jobs, cands, top_k):
+    """
+    TF-IDF rank `cands` (dicts with id, name, email, resume_text) against
+    every job in `jobs`. Returns {job_id: top_k rows}, rows as in rank().
+    """
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job.remove_stopwords, job.anonymize_pii), []).append(job)
+    out = {}
+    for (remove_stop, pii), group in groups.items():
+        out.update(_rank_group(group, cands, top_k, remove_stop, pii))
+    return out
+
+
+def save_all(jobs, results):
+    """Store each job's rows as its Ranking (no IDF snapshot: rank(incremental) rebuilds)."""
+    with transaction.atomic():
+        for job in jobs:
+            ranking.save(job, results[job.id], None)
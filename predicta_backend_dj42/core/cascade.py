@@ -0,0 +1,98 @@
+# core/cascade.py
+"""
+Cascade ranking: cheap lexical prefilter, then semantic and model rerank.
+
+Stage 1  sparse TF-IDF cosine over the whole pool, keep the top M
+Stage 2  SBERT similarity for those M only (one embedding call)
+Stage 3  XGBoost ranking model on the survivors (one batched predict)
+
+The final score blends the three stage scores with configurable weights.
+Only the M survivors are returned; with M >= pool size this is the full
+pipeline.
+"""
+
+from stage_timing import stage
+
+from .scoring import (
+    tokens, candidate_tokens, tfidf_scores, tfidf_row, term_weights, semantic_scores,
+    extract_soft_skills, years_of_experience,
+)
+
+DEFAULT_WEIGHTS = {"lexical": 0.2, "semantic": 0.4, "model": 0.4}
+
+
+def blend_weights(weights, has_model):
+    """Merge overrides into the defaults and renormalize to sum to 1."""
+    w = {**DEFAULT_WEIGHTS, **(weights or {})}
+    w = {k: max(0.0, float(w[k])) for k in DEFAULT_WEIGHTS}
+    if not has_model:
+        w["model"] = 0.0
+    total = sum(w.values())
+    if total <= 0:
+        return {"lexical": 1.0, "semantic": 0.0, "model": 0.0}
+    return {k: v / total for k, v in w.items()}
+
+
+def rank_cascade(jd_text, candidates, embed, predict=None, top_m=100,
+                 weights=None, remove_stop=True, pii=True):
+    """
+    `embed(texts)` returns L2-normalized vectors (see embedding_client);
+    `predict(feature_rows)` is RankingModel.predict_scores or None to skip
+    stage 3.
+    """
+    w = blend_weights(weights, predict is not None)
+
+    # ---- Stage 1: lexical prefilter over everything ----
+    with stage("tokenize"):
+        jd_toks  = tokens(jd_text, remove_stop, pii)
+        res_toks = [candidate_tokens(c, remove_stop, pii) for c in candidates]
+    lex = tfidf_scores(jd_toks, res_toks)
+
+    keep = sorted(range(len(candidates)), key=lambda i: lex["scores"][i], reverse=True)
+    keep = keep[:max(1, int(top_m))] if candidates else []
+
+    # ---- Stage 2: semantic similarity for survivors only ----
+    sem = (
+        semantic_scores(jd_toks, [res_toks[i] for i in keep], embed)
+        if keep and w["semantic"] > 0 else [0.0] * len(keep)
+    )
+
+    with stage("rows"):
+        order  = {t: i for i, t in enumerate(lex["idf"])}
+        jd_top = [x["term"] for x in term_weights(lex["v_jd"], order)[:30]]
+
+        rows, features = [], []
+        for i, s in zip(keep, sem):
+            c = candidates[i]
+            row = tfidf_row(c, res_toks[i], lex["vecs"][i], lex["scores"][i], jd_top, order)
+            row["lexicalScore"] = lex["scores"][i]
+            row["semanticScore"] = s
+            rows.append(row)
+            features.append({
+                "cosine_similarity": row["lexicalScore"],
+                "sbert_similarity": s,
+                "hard_skill_matches": len(row["skillOverlap"]),
+                "soft_skill_matches": len(
+                    c["softSkills"] if c.get("softSkills") is not None
+                    else extract_soft_skills(c["resume_text"])
+                ),
+                "years_experience": (
+                    c["years"] if c.get("years") is not None
+                    else years_of_experience(c["resume_text"])
+                ),
+            })
+
+    # ---- Stage 3: ranking model on survivors ----
+    model_scores = predict(features) if (predict and rows and w["model"] > 0) else None
+
+    for k, row in enumerate(rows):
+        m = model_scores[k] if model_scores is not None else None
+        row["modelScore"] = m
+        row["score"] = (
+            w["lexical"] * row["lexicalScore"]
+            + w["semantic"] * row["semanticScore"]
+            + w["model"] * (m or 0.0)
+        )
+
+    rows.sort(key=lambda x: x["score"], reverse=True)
+    return rows
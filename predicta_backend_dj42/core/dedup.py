@@ -0,0 +1,179 @@
+# core/dedup.py
+"""
+Near-duplicate resume detection with MinHash + LSH banding.
+
+Each candidate gets a MinHash signature over word shingles of its
+normalized tokens (the same normalization ranking uses, so a PDF and a DOCX
+of one CV look alike). The signature is split into bands; every band is
+hashed into a bucket and stored in CandidateBand. Two resumes are candidate
+duplicates when they share a bucket in any band, which is an indexed lookup
+instead of a pairwise scan, and are confirmed by the estimated Jaccard
+similarity of their full signatures.
+"""
+
+import hashlib
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+from .scoring import tokens
+
+PRIME = (1 << 31) - 1
+SEED = 20240601
+
+
+def _params():
+    num_perm = settings.DEDUP_NUM_PERM
+    bands = settings.DEDUP_BANDS
+    if num_perm % bands:
+        raise ValueError("DEDUP_NUM_PERM must be a multiple of DEDUP_BANDS")
+    return num_perm, bands
+
+
+_perm_cache = {}
+
+
+def _permutations(num_perm):
+    if num_perm not in _perm_cache:
+        rnd = np.random.RandomState(SEED)
+        a = rnd.randint(1, PRIME, size=num_perm, dtype=np.uint64)
+        b = rnd.randint(0, PRIME, size=num_perm, dtype=np.uint64)
+        _perm_cache[num_perm] = (a, b)
+    return _perm_cache[num_perm]
+
+
+def shingles(text, k=None):
+    k = k or settings.DEDUP_SHINGLE_SIZE
+    toks = tokens(text, remove_stop=True, pii=True)
+    if len(toks) <= k:
+        return {" ".join(toks)} if toks else set()
+    return {" ".join(toks[i:i + k]) for i in range(len(toks) - k + 1)}
+
+
+def signature(text):
+    """MinHash signature (list of ints, length DEDUP_NUM_PERM) of `text`; [] if empty."""
+    num_perm, _ = _params()
+    sh = shingles(text)
+    if not sh:
+        return []
+    a, b = _permutations(num_perm)
+    x = np.fromiter((zlib.crc32(s.encode()) for s in sh), dtype=np.uint64, count=len(sh))
+    # (a*x + b) mod p for every (permutation, shingle); a, x < 2**32 keeps it in uint64.
+    hashed = (np.outer(a, x) + b[:, None]) % PRIME
+    return hashed.min(axis=1).astype(np.int64).tolist()
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    if not sig_a or not sig_b or len(sig_a) != len(sig_b):
+        return 0.0
+    return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+
+
+def band_buckets(sig):
+    """[(band, bucket)] for a signature; buckets are signed 63-bit ints."""
+    _, bands = _params()
+    if not sig:
+        return []
+    rows = len(sig) // bands
+    out = []
+    for band in range(bands):
+        chunk = ",".join(map(str, sig[band * rows:(band + 1) * rows])).encode()
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        out.append((band, int.from_bytes(digest, "big") >> 1))
+    return out
+
+
+def index_candidates(cands, replace=False):
+    """
+    Compute missing signatures and write band rows for saved candidates.
+    With replace=True the signature is recomputed and old bands dropped
+    (use after resume_text changes).
+    """
+    from .models import Candidate, CandidateBand
+
+    cands = [c for c in cands if c.pk]
+    if not cands:
+        return
+    stale = [c for c in cands if replace or c.minhash is None]
+    for c in stale:
+        c.minhash = signature(c.resume_text)
+    if stale:
+        Candidate.objects.bulk_update(stale, ["minhash"], batch_size=500)
+    if replace:
+        CandidateBand.objects.filter(candidate__in=cands).delete()
+
+    CandidateBand.objects.bulk_create([
+        CandidateBand(job_id=c.job_id, candidate_id=c.pk, band=band, bucket=bucket)
+        for c in cands for band, bucket in band_buckets(c.minhash)
+    ], batch_size=1000, ignore_conflicts=True)
+
+
+def _clusters_from_pairs(ids, pairs):
+    parent = {i: i for i in ids}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    groups = {}
+    for i in ids:
+        groups.setdefault(find(i), []).append(i)
+    return [sorted(g) for g in groups.values() if len(g) > 1]
+
+
+def duplicate_clusters(job, threshold=None):
+    """
+    Clusters of near-duplicate candidates for `job`, each a sorted list of
+    candidate ids (oldest first). Only buckets shared by 2+ candidates are
+    read, and each colliding pair is confirmed against `threshold`.
+    Candidates saved before signatures existed are indexed on first use.
+    """
+    from django.db.models import Count
+
+    from .models import Candidate, CandidateBand
+
+    index_candidates(Candidate.objects.filter(job=job, minhash__isnull=True))
+    threshold = settings.DEDUP_THRESHOLD if threshold is None else threshold
+    collided = (
+        CandidateBand.objects.filter(job=job)
+        .values("band", "bucket").annotate(n=Count("id")).filter(n__gt=1)
+    )
+    members = {}
+    for band, bucket, cid in (
+        CandidateBand.objects.filter(job=job, bucket__in=collided.values("bucket"))
+        .values_list("band", "bucket", "candidate_id")
+    ):
+        members.setdefault((band, bucket), set()).add(cid)
+
+    pairs = set()
+    for ids in members.values():
+        ids = sorted(ids)
+        pairs.update((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    if not pairs:
+        return []
+
+    ids = {i for p in pairs for i in p}
+    sigs = dict(Candidate.objects.filter(pk__in=ids).values_list("id", "minhash"))
+    confirmed = [(a, b) for a, b in pairs if similarity(sigs.get(a), sigs.get(b)) >= threshold]
+    return sorted(_clusters_from_pairs(ids, confirmed))
+
+
+def collapse(cands, clusters):
+    """
+    Keep one representative per cluster: the most recent upload (highest
+    id). Returns (kept candidates, {representative id: [other ids]}).
+    """
+    dropped, members = set(), {}
+    for cluster in clusters:
+        rep, others = cluster[-1], cluster[:-1]
+        members[rep] = others
+        dropped.update(others)
+    return [c for c in cands if c["id"] not in dropped], members
@@ -0,0 +1,130 @@
+# core/embedding_client.py
+"""
+Django-side client for the SBERT embedding service (sbert_server.py).
+
+One pooled keep-alive session per process; large inputs are sent in chunks
+and each chunk is retried with exponential backoff on connection errors,
+timeouts and the service's load-shedding responses (429 / 503).
+"""
+
+import os
+import random
+import time
+from typing import List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from stage_timing import timed
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class EmbeddingServiceError(Exception):
+    """The embedding service could not produce vectors for a request."""
+
+
+class EmbeddingClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        pool_size: Optional[int] = None,
+    ):
+        self.base_url = (
+            base_url or os.getenv("EMBEDDING_API_BASE", "http://127.0.0.1:8001")
+        ).rstrip("/")
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.timeout = timeout or float(os.getenv("EMBEDDING_TIMEOUT", "30"))
+        self.connect_timeout = connect_timeout or float(
+            os.getenv("EMBEDDING_CONNECT_TIMEOUT", "2")
+        )
+        self.max_retries = (
+            max_retries if max_retries is not None
+            else int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+        )
+        self.backoff = backoff if backoff is not None else float(
+            os.getenv("EMBEDDING_BACKOFF", "0.25")
+        )
+
+        pool_size = pool_size or int(os.getenv("EMBEDDING_POOL_SIZE", "10"))
+        self.session = requests.Session()
+        # Retries are handled in _post so they can honour Retry-After.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+    # ----------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------
+    @timed("embed")
+    def embed(self, texts: Sequence[str], client_id: Optional[str] = None) -> List[List[float]]:
+        """
+        Return one L2-normalized vector per text, in input order.
+
+        `client_id` is forwarded as X-Client-Id so the service schedules
+        this caller fairly against other recruiters.
+        """
+        texts = [str(t) for t in texts]
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start:start + self.batch_size]
+            vectors.extend(self._post(chunk, client_id))
+        return vectors
+
+    # ----------------------------------------------------------
+    # Helpers
+    # ----------------------------------------------------------
+    def _post(self, chunk: List[str], client_id: Optional[str]) -> List[List[float]]:
+        headers = {"X-Request-Timeout": str(self.timeout)}
+        if client_id:
+            headers["X-Client-Id"] = str(client_id)
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                resp = self.session.post(
+                    f"{self.base_url}/embed",
+                    json={"texts": chunk},
+                    headers=headers,
+                    timeout=(self.connect_timeout, self.timeout),
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+            else:
+                if resp.status_code == 200:
+                    embs = resp.json().get("embeddings") or []
+                    if len(embs) != len(chunk):
+                        raise EmbeddingServiceError(
+                            f"Expected {len(chunk)} embeddings, got {len(embs)}"
+                        )
+                    return embs
+                last_error = EmbeddingServiceError(
+                    f"Embedding service returned {resp.status_code}: {resp.text[:200]}"
+                )
+                if resp.status_code not in RETRY_STATUSES:
+                    raise last_error
+                retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+
+            if attempt < self.max_retries:
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                time.sleep(max(delay, retry_after or 0))
+
+        raise EmbeddingServiceError(f"Embedding service unavailable: {last_error}")
+
+
+def _parse_retry_after(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+# Singleton instance used by views
+embedding_client = EmbeddingClient()
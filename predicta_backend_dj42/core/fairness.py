@@ -0,0 +1,107 @@
+# core/fairness.py
+"""
+Anonymization fairness: how much a TF-IDF ranking moves when PII
+(emails, long numbers) is anonymized, i.e. scoring.rank() with pii=True
+against pii=False. Server-side counterpart of the fairness box in
+frontend/app.js, returned by POST /api/jobs/{id}/rank/ with fairness=true.
+
+Both rankings come from one tokenization pass. Raw tokens are counted per
+document and interned into one term-count matrix (core/term_matrix.py;
+the JD is doc 0). The anonymized matrix is derived from it with
+term_matrix.anonymized(), so every entry PII does not touch is shared by
+both sides. Scoring each side is a few numpy passes over the matrix
+(bincount), the same TF-IDF cosine as scoring.tfidf_scores().
+"""
+
+import numpy as np
+
+from stage_timing import stage, timed
+
+from .scoring import normalize
+from .term_matrix import anonymized, idf, term_matrix
+
+# Same thresholds as the frontend's fairness note (score points, 0..1).
+MAX_SHIFT_WARN = 0.10
+AVG_SHIFT_WARN = 0.03
+
+
+def _raw_tokens(c, remove_stop, pii):
+    # Precomputed tokens (core/precompute.py) are raw only for jobs without anonymization.
+    toks = c.get("tokens")
+    return toks if toks is not None and not pii else normalize(c["resume_text"], remove_stop)
+
+
+def cosine_scores(doc, term, count, n_docs, width):
+    """TF-IDF cosine of docs 1..n_docs-1 against doc 0, as in scoring.tfidf_scores()."""
+    w = count * idf([term], n_docs, width)[term]
+    jd = np.zeros(width)
+    jd[term[doc == 0]] = w[doc == 0]
+    dot = np.bincount(doc, weights=w * jd[term], minlength=n_docs)
+    norms = np.sqrt(np.bincount(doc, weights=w * w, minlength=n_docs))
+    denom = norms[1:] * norms[0]
+    out = np.zeros(n_docs - 1)
+    np.divide(dot[1:], denom, out=out, where=denom > 0)
+    return out
+
+
+def ranks(scores):
+    """1-based positions, best score first; ties keep input order like rows.sort()."""
+    out = np.empty(len(scores), dtype=np.int64)
+    out[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return out
+
+
+@timed("fairness")
+def analyze(jd_text, candidates, remove_stop=True, pii=True, top=10):
+    """
+    Compare the raw and anonymized TF-IDF rankings of `candidates`
+    (dicts with id, name, resume_text). Rank shift is anonymized rank
+    minus raw rank, so a positive shift means the candidate drops when
+    PII is hidden. `pii` is the job's own setting, used only to tell
+    whether precomputed tokens are raw.
+    """
+    n = len(candidates)
+    with stage("fairness.tokenize"):
+        docs = [normalize(jd_text, remove_stop)]
+        docs.extend(_raw_tokens(c, remove_stop, pii) for c in candidates)
+        index, doc, term, count = term_matrix(docs)
+        vocab = list(index)
+
+    with stage("fairness.score"):
+        raw = cosine_scores(doc, term, count, n + 1, len(vocab))
+        a_vocab, a_doc, a_term, a_count, mapping = anonymized(vocab, doc, term, count)
+        rewritten = int((mapping != np.arange(len(vocab))).sum())
+        anon = raw if not rewritten else cosine_scores(a_doc, a_term, a_count, n + 1, len(a_vocab))
+        raw_rank, anon_rank = ranks(raw), ranks(anon)
+        score_shift = anon - raw
+        rank_shift = anon_rank - raw_rank
+
+    abs_score, abs_rank = np.abs(score_shift), np.abs(rank_shift)
+    avg_shift = float(abs_score.mean()) if n else 0.0
+    max_shift = float(abs_score.max()) if n else 0.0
+    affected = [
+        i for i in np.lexsort((-abs_score, -abs_rank))[:top]
+        if abs_rank[i] or abs_score[i] > 1e-12
+    ]
+    note = "No strong evidence of PII-sensitive ranking shifts."
+    if max_shift > MAX_SHIFT_WARN or avg_shift > AVG_SHIFT_WARN:
+        note = "Potential PII-driven sensitivity detected. Consider keeping anonymization ON."
+    return {
+        "candidates": n,
+        "pii_terms": rewritten,
+        "changed": int((abs_rank > 0).sum()),
+        "avg_rank_shift": float(abs_rank.mean()) if n else 0.0,
+        "max_rank_shift": int(abs_rank.max()) if n else 0,
+        "avg_score_shift": avg_shift,
+        "max_score_shift": max_shift,
+        "most_affected": [{
+            "id": candidates[i]["id"],
+            "name": candidates[i].get("name") or "Unnamed",
+            "raw_rank": int(raw_rank[i]),
+            "anonymized_rank": int(anon_rank[i]),
+            "rank_shift": int(rank_shift[i]),
+            "raw_score": float(raw[i]),
+            "anonymized_score": float(anon[i]),
+        } for i in affected],
+        "note": note,
+    }
@@ -0,0 +1,117 @@
+# core/incremental.py
+"""
+Incremental TF-IDF re-ranking against a frozen IDF.
+
+A full tfidf ranking stores a snapshot next to its rows: the document
+frequencies it used (frozen IDF), the JD fingerprint and one fingerprint per
+candidate. Re-ranking with incremental=true then scores only new or changed
+candidates against the frozen IDF, drops removed ones and merges the rest
+into the stored order. Document frequencies of the JD terms are kept
+current as the pool changes; once the JD vector under the current IDF has
+drifted more than RANK_IDF_DRIFT_THRESHOLD (relative L1) from the frozen
+one, the caller rebuilds the whole ranking.
+
+Frozen snapshot:  {"jd": fp, "n0": docs, "df": {term: docs}}
+Current counts:   {"n": docs, "jd_df": {jd term: docs}}
+"fps": {candidate id: fingerprint}; ids are strings (JSON keys).
+"""
+
+import math
+
+from .precompute import fingerprint
+from .scoring import (
+    tokens, candidate_tokens, tf, tfidf_vector, sparse_cosine, tfidf_row, term_weights,
+)
+
+
+def _idf(n, df):
+    return math.log((n + 1) / (df + 1)) + 1
+
+
+def build_snapshot(job, cands, rows):
+    """Snapshot for a full tfidf ranking; document terms come from rows["resumeTerms"]."""
+    rs, pii = job.remove_stopwords, job.anonymize_pii
+    jd_terms = set(tokens(job.jd_text, rs, pii))
+    df = dict.fromkeys(jd_terms, 1)
+    for row in rows:
+        for t in row["resumeTerms"]:
+            df[t] = df.get(t, 0) + 1
+    return {
+        "jd": fingerprint(job.jd_text, rs, pii),
+        "n0": len(rows) + 1,
+        "df": df,
+        "n": len(rows) + 1,
+        "jd_df": {t: df[t] for t in jd_terms},
+        "fps": {str(c["id"]): fingerprint(c["resume_text"], rs, pii) for c in cands},
+    }
+
+
+def drift(snap, jd_tf):
+    """Relative L1 change of the JD TF-IDF vector, current vs frozen IDF."""
+    frozen = {t: _idf(snap["n0"], snap["df"].get(t, 0)) for t in jd_tf}
+    current = {t: _idf(snap["n"], snap["jd_df"].get(t, 0)) for t in jd_tf}
+    base = sum(c * frozen[t] for t, c in jd_tf.items())
+    if not base:
+        return 0.0
+    return sum(c * abs(current[t] - frozen[t]) for t, c in jd_tf.items()) / base
+
+
+def rerank(job, snap, rows, cands, threshold, prepare=None):
+    """
+    Update a stored tfidf ranking for the current candidate list.
+
+    Returns (rows, snapshot, scored) where scored is the number of
+    candidates scored, or None when the snapshot cannot be used (JD or its
+    options changed, or IDF drift is over threshold) and a full rebuild is
+    needed. `prepare(cands)` may attach precomputed tokens/skills to the
+    candidates that are about to be scored (core/precompute.attach).
+    """
+    rs, pii = job.remove_stopwords, job.anonymize_pii
+    if snap.get("jd") != fingerprint(job.jd_text, rs, pii):
+        return None
+
+    fps = {str(c["id"]): fingerprint(c["resume_text"], rs, pii) for c in cands}
+    old = snap["fps"]
+    stale = {cid for cid in old if fps.get(cid) != old[cid]}        # removed or changed
+    fresh = [c for c in cands if old.get(str(c["id"])) != fps[str(c["id"])]]  # new or changed
+
+    jd_toks = tokens(job.jd_text, rs, pii)
+    jd_tf = tf(jd_toks)
+    jd_df = dict(snap["jd_df"])
+    kept = []
+    for row in rows:
+        if str(row["id"]) in stale:
+            for t in row["resumeTerms"]:
+                if t in jd_df:
+                    jd_df[t] -= 1
+        else:
+            kept.append(row)
+
+    if prepare and fresh:
+        prepare(fresh)
+    fresh_toks = [candidate_tokens(c, rs, pii) for c in fresh]
+    for toks in fresh_toks:
+        for t in set(toks):
+            if t in jd_df:
+                jd_df[t] += 1
+
+    snap = {**snap, "n": len(cands) + 1, "jd_df": jd_df, "fps": fps}
+    if drift(snap, jd_tf) > threshold:
+        return None
+
+    n0, df = snap["n0"], snap["df"]
+    idf = {t: _idf(n0, c) for t, c in df.items()}
+    v_jd = tfidf_vector(jd_tf, idf)
+    order = {t: i for i, t in enumerate(df)}
+    jd_top = [x["term"] for x in term_weights(v_jd, order)[:30]]
+    for c, toks in zip(fresh, fresh_toks):
+        tfmap = tf(toks)
+        for t in tfmap:
+            if t not in idf:
+                idf[t] = _idf(n0, 1)  # unseen when frozen: as if only this resume had it
+                order[t] = len(order)
+        vec = tfidf_vector(tfmap, idf)
+        kept.append(tfidf_row(c, toks, vec, sparse_cosine(v_jd, vec), jd_top, order))
+
+    kept.sort(key=lambda x: x["score"], reverse=True)
+    return kept, snap, len(fresh)
@@ -0,0 +1,224 @@
+# core/ingest.py
+"""
+Bulk resume ingestion (POST /api/candidates/bulk/).
+
+Files arrive as a zip archive or a multipart batch, are parsed in a shared
+process pool with a per-file time limit, and everything that parsed is
+persisted with one bulk_create (plus outbox events for the Mongo copy) and
+one analytics insert_many.
+"""
+
+import atexit
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import zipfile
+from pathlib import PurePosixPath
+
+from django.conf import settings
+
+from .parsers import (
+    ParseLimits, content_key, default_limits, extract_text, parsed_text_cache,
+)
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+_pool = None
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise ParseTimeout()
+
+
+def parse_one(item):
+    """
+    Worker entry point: (filename, bytes, limits) -> (filename, text, error).
+
+    The time limit is enforced inside the worker with SIGALRM so a slow file
+    fails on its own without taking the worker down.
+    """
+    filename, data, limits = item
+    timeout = limits.max_seconds
+    use_alarm = (
+        timeout and hasattr(signal, "SIGALRM")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        text = extract_text(data, filename, limits)
+        if not (text or "").strip():
+            return filename, None, "No text could be extracted"
+        return filename, text, None
+    except ParseTimeout:
+        return filename, None, f"Parsing exceeded {timeout:g}s"
+    except Exception as e:
+        return filename, None, str(e) or e.__class__.__name__
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: the request thread may hold locks that fork() would copy.
+        ctx = multiprocessing.get_context("spawn")
+        _pool = ctx.Pool(processes=settings.INGEST_WORKERS, maxtasksperchild=200)
+        atexit.register(_reset_pool)
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool = None
+
+
+def parse_files(files):
+    """
+    Parse [(filename, bytes)] -> [(filename, text | None, error | None)],
+    preserving input order. Files already in the parsed-text cache are not
+    sent to the pool at all.
+    """
+    timeout = settings.INGEST_FILE_TIMEOUT
+    limits = default_limits()
+    limits = ParseLimits(max_pages=limits.max_pages,
+                         max_seconds=min(limits.max_seconds, timeout))
+    cache = parsed_text_cache()
+    keys = [content_key(data, name, limits) for name, data in files]
+    hits = cache.get_many(keys)
+
+    results = [None] * len(files)
+    todo = []
+    for i, ((name, data), key) in enumerate(zip(files, keys)):
+        if key in hits:
+            results[i] = (name, hits[key], None)
+        else:
+            todo.append((i, (name, data, limits)))
+
+    if settings.INGEST_WORKERS <= 0:
+        parsed = [(i, parse_one(item)) for i, item in todo]
+    else:
+        pending = [(i, item[0], _get_pool().apply_async(parse_one, (item,)))
+                   for i, item in todo]
+        parsed, hung = [], False
+        for i, name, res in pending:
+            try:
+                # The in-worker alarm normally fires first; this is the backstop
+                # for parsers stuck in native code that ignore signals.
+                parsed.append((i, res.get(timeout=timeout * 2 + 5)))
+            except multiprocessing.TimeoutError:
+                hung = True
+                parsed.append((i, (name, None, f"Parsing exceeded {timeout:g}s")))
+        if hung:
+            _reset_pool()
+
+    fresh = {}
+    for i, result in parsed:
+        results[i] = result
+        if result[2] is None:
+            fresh[keys[i]] = result[1]
+    if fresh:
+        cache.set_many(fresh)
+    return results
+
+
+def collect_files(request):
+    """
+    Gather (filename, bytes) from a zip ('archive') and/or multipart 'files'.
+    Returns (files, errors) where errors are per-file report entries.
+    """
+    max_files = settings.INGEST_MAX_FILES
+    max_bytes = settings.INGEST_MAX_FILE_BYTES
+    files, errors = [], []
+
+    def add(name, size, read):
+        if len(files) >= max_files:
+            errors.append({"file": name, "ok": False, "error": f"More than {max_files} files"})
+        elif size > max_bytes:
+            errors.append({"file": name, "ok": False, "error": "File too large"})
+        else:
+            files.append((name, read()))
+
+    archive = request.FILES.get("archive")
+    if archive is not None:
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    path = PurePosixPath(info.filename)
+                    if info.is_dir() or path.name.startswith(".") or "__MACOSX" in path.parts:
+                        continue
+                    add(path.name, info.file_size, lambda info=info: zf.read(info))
+        except zipfile.BadZipFile:
+            errors.append({"file": archive.name, "ok": False, "error": "Not a valid zip archive"})
+
+    for f in request.FILES.getlist("files"):
+        add(f.name, f.size, f.read)
+
+    return files, errors
+
+
+def guess_identity(filename, text):
+    """Candidate name from the file name, email from the first address in the text."""
+    stem = os.path.splitext(filename)[0]
+    name = re.sub(r"[_\-.]+", " ", stem).strip()[:200]
+    m = EMAIL_RE.search(text or "")
+    return name, (m.group(0).rstrip(".")[:254] if m else "")
+
+
+def ingest_files(user, job, files, report=None):
+    """
+    Parse, persist and log a batch for `job`; returns the per-file report.
+    """
+    # Imported here so spawned parse workers (which only need parse_one)
+    # never import models.
+    from django.core.files.base import ContentFile
+    from django.db import transaction
+
+    from .analytics import log_resumes_uploaded
+    from .dedup import index_candidates, signature
+    from .models import Candidate
+    from .outbox import record_many
+    from .rank_runs import mark_stale
+    from .tasks import enqueue_many
+
+    report = list(report or [])
+    parsed = parse_files(files)
+
+    cands, owners = [], []
+    for (_, data), (filename, text, error) in zip(files, parsed):
+        if error:
+            report.append({"file": filename, "ok": False, "error": error})
+            continue
+        name, email = guess_identity(filename, text)
+        cand = Candidate(job=job, name=name, email=email, resume_text=text,
+                         minhash=signature(text))
+        cand.uploaded_file.save(filename, ContentFile(data), save=False)
+        cands.append(cand)
+        owners.append(filename)
+
+    with transaction.atomic():
+        Candidate.objects.bulk_create(cands, batch_size=500)
+        index_candidates(cands)
+        # bulk_create skips post_save: add the outbox events, queue
+        # precompute and supersede running rank runs explicitly.
+        record_many("candidate", cands)
+        enqueue_many("precompute_candidate", [c.pk for c in cands])
+        mark_stale(job.pk)
+
+    if cands:
+        log_resumes_uploaded(user, job, cands, source="bulk_upload")
+
+    for filename, cand in zip(owners, cands):
+        report.append({"file": filename, "ok": True, "candidate_id": cand.id})
+    return report
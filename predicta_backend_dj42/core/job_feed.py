@@ -0,0 +1,99 @@
+# core/job_feed.py
+"""
+Ingest an external provider's job feed into Job rows that can be ranked.
+
+    stats = ingest_feed(owner, linkedin_client.iter_jobs("python"))
+
+`records` is any iterable of normalized jobs (LinkedInClient._normalize_job
+shape); it is consumed in chunks of JOB_FEED_CHUNK_SIZE, so memory stays
+flat whatever the feed size. Each chunk is deduped by external_id (last
+record wins), compared with the stored jobs and only new or changed ones
+are upserted with one bulk_create(update_conflicts=True) keyed on
+(owner, source, external_id). Upserted jobs get the work post_save would
+have done: an outbox event, a precompute_job task that indexes the JD for
+matching (core/precompute.py) and stale active rank runs.
+
+`manage.py ingest_job_feed` runs it once or on a schedule (--every).
+"""
+
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+FIELDS = ("title", "jd_text", "url")
+
+
+def _job_fields(rec):
+    title = (rec.get("title") or "")[:200]
+    return {
+        "title": title,
+        "jd_text": rec.get("description") or title,
+        "url": (rec.get("url") or "")[:500],
+    }
+
+
+def ingest_feed(owner, records, source="linkedin", chunk_size=None):
+    """
+    Upsert `records` as `owner`'s jobs. Returns counts:
+    {"seen", "created", "updated", "unchanged", "skipped"} (skipped =
+    records without an external_id or a JD; duplicates within a chunk
+    count as seen only).
+    """
+    chunk_size = chunk_size or settings.JOB_FEED_CHUNK_SIZE
+    stats = dict.fromkeys(("seen", "created", "updated", "unchanged", "skipped"), 0)
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return stats
+        stats["seen"] += len(chunk)
+        latest = {}
+        for rec in chunk:
+            ext = rec.get("external_id")
+            fields = _job_fields(rec)
+            if ext in (None, "") or not fields["jd_text"]:
+                stats["skipped"] += 1
+                continue
+            latest[str(ext)[:200]] = fields
+        _upsert(owner, source, latest, stats)
+
+
+def _upsert(owner, source, latest, stats):
+    from .models import Job
+    from .outbox import record_many
+    from .rank_runs import mark_stale_many
+    from .tasks import enqueue_many
+
+    existing = {
+        row["external_id"]: row
+        for row in Job.objects.filter(owner=owner, source=source, external_id__in=list(latest))
+        .values("external_id", *FIELDS)
+    }
+    changed = []
+    for ext, fields in latest.items():
+        old = existing.get(ext)
+        if old is None:
+            stats["created"] += 1
+        elif any(old[f] != fields[f] for f in FIELDS):
+            stats["updated"] += 1
+        else:
+            stats["unchanged"] += 1
+            continue
+        changed.append(Job(owner=owner, source=source, external_id=ext, **fields))
+    if not changed:
+        return
+
+    with transaction.atomic():
+        Job.objects.bulk_create(
+            changed, batch_size=500, update_conflicts=True,
+            unique_fields=["owner", "source", "external_id"], update_fields=list(FIELDS),
+        )
+        # Upserted rows may not get their pks back: read them for the events.
+        jobs = list(Job.objects.filter(
+            owner=owner, source=source, external_id__in=[j.external_id for j in changed]
+        ))
+        # bulk_create skips post_save (core/signals.py): do its work here.
+        record_many("job", jobs)
+        enqueue_many("precompute_job", [j.pk for j in jobs])
+        mark_stale_many([j.pk for j in jobs])
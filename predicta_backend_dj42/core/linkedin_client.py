@@ -6,13 +6,98 @@ This module is written so that you can plug in:
 - LinkedIn Talent Solutions APIs (enterprise)
 - or a legal third-party API that surfaces LinkedIn job data.
 
-For now, we implement a "mock" provider so FR7.3 is satisfied:
-the system has a clear integration point for external job APIs.
+Without a provider configured we return a "mock" response so FR7.3 is
+satisfied: the system has a clear integration point for external job APIs.
+
+Against a real provider, every search goes through:
+- a TTL cache keyed by (query, location, limit) (LINKEDIN_CACHE_TTL),
+- single-flight: identical searches already in flight share one request,
+- a token-bucket rate limiter (LINKEDIN_RATE_LIMIT per second, bursts of
+  LINKEDIN_RATE_BURST), shared by the sync and async paths,
+- one pooled keep-alive session (requests for views, httpx for async views),
+  with retries and exponential backoff on connection errors, timeouts and
+  429 / 5xx (honouring Retry-After).
+Multi-location searches fan out one request per location concurrently.
 """
 
+import asyncio
 import os
-from typing import List, Dict, Any
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class JobProviderError(Exception):
+    """The external jobs provider could not answer a search."""
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, holding at most `burst`. reserve() takes a
+    token and returns how long the caller must wait before using it, so
+    the same bucket paces threads (time.sleep) and coroutines (asyncio.sleep).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class TTLCache:
+    """Small thread-safe LRU whose entries expire `ttl` seconds after insertion."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
 
 
 class LinkedInClient:
@@ -25,10 +110,54 @@ class LinkedInClient:
     - map provider fields -> internal Job schema
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        rate_limit: Optional[float] = None,
+        rate_burst: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+    ):
         # Example: endpoint & key from .env (adapt names as needed)
-        self.base_url = os.getenv("LINKEDIN_API_BASE", "").rstrip("/")
-        self.api_key = os.getenv("LINKEDIN_API_KEY", "")
+        self.base_url = (
+            base_url if base_url is not None else os.getenv("LINKEDIN_API_BASE", "")
+        ).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("LINKEDIN_API_KEY", "")
+        self.timeout = timeout or float(os.getenv("LINKEDIN_TIMEOUT", "10"))
+        self.max_connections = int(os.getenv("LINKEDIN_MAX_CONNECTIONS", "100"))
+        self.max_retries = (
+            max_retries if max_retries is not None
+            else int(os.getenv("LINKEDIN_MAX_RETRIES", "3"))
+        )
+        self.backoff = backoff if backoff is not None else float(
+            os.getenv("LINKEDIN_BACKOFF", "0.25")
+        )
+        self.fanout = int(os.getenv("LINKEDIN_FANOUT", "8"))
+
+        self.limiter = TokenBucket(
+            rate_limit if rate_limit is not None else float(os.getenv("LINKEDIN_RATE_LIMIT", "10")),
+            rate_burst or int(os.getenv("LINKEDIN_RATE_BURST", "20")),
+        )
+        self.cache = TTLCache(
+            cache_ttl if cache_ttl is not None else float(os.getenv("LINKEDIN_CACHE_TTL", "300")),
+            int(os.getenv("LINKEDIN_CACHE_MAX_ENTRIES", "1000")),
+        )
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+        self.session = requests.Session()
+        # Retries are handled in _fetch so they can honour Retry-After.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Connection": "keep-alive"})
+
+        # httpx.AsyncClient (keep-alive pool) and in-flight searches per event loop.
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_inflight = weakref.WeakKeyDictionary()
 
     def is_configured(self) -> bool:
         """Return True if we have enough config to call a real API."""
@@ -53,32 +182,175 @@ class LinkedInClient:
         Search jobs on LinkedIn / external provider.
 
         Returns a list of simplified job dicts that your frontend can use.
+        Raises JobProviderError if the provider stays unavailable.
 
-        For now:
-        - if not configured, fall back to a mocked response (good for demo).
+        If not configured, falls back to a mocked response (good for demo).
         """
         if not self.is_configured():
             # --- Mocked data for your project demo ---
             return self._mock_search_jobs(query, location, limit)
 
-        # --- Real integration path (when you have a provider) ---
-        params = {
+        key = (query, location, limit)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return _copy(hit)
+
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = Future()
+        if not leader:
+            return _copy(pending.result())
+
+        try:
+            jobs = self._fetch(key)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            self.cache.set(key, jobs)
+            pending.set_result(jobs)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return _copy(jobs)
+
+    def search_jobs_multi(self, query: str, locations: Sequence[str], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        search_jobs() for several locations at once, one concurrent request
+        per location (at most LINKEDIN_FANOUT). Results are concatenated in
+        `locations` order with jobs listed under more than one dropped.
+        """
+        locations = list(dict.fromkeys(locations)) or [""]
+        if len(locations) == 1:
+            return self.search_jobs(query, locations[0], limit)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.fanout, len(locations)))) as pool:
+            per_location = list(pool.map(lambda loc: self.search_jobs(query, loc, limit), locations))
+        return _merge(per_location)
+
+    async def asearch_jobs(self, query: str, location: str = "", limit: int = 10) -> List[Dict[str, Any]]:
+        """search_jobs() for async views, over a pooled httpx.AsyncClient."""
+        if not self.is_configured():
+            return self._mock_search_jobs(query, location, limit)
+
+        key = (query, location, limit)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return _copy(hit)
+
+        inflight = self._async_inflight.setdefault(asyncio.get_running_loop(), {})
+        pending = inflight.get(key)
+        if pending is None:
+            pending = inflight[key] = asyncio.ensure_future(self._afetch(key))
+            pending.add_done_callback(lambda _: inflight.pop(key, None))
+        jobs = await asyncio.shield(pending)
+        self.cache.set(key, jobs)
+        return _copy(jobs)
+
+    async def asearch_jobs_multi(self, query: str, locations: Sequence[str], limit: int = 10) -> List[Dict[str, Any]]:
+        """search_jobs_multi() for async views."""
+        locations = list(dict.fromkeys(locations)) or [""]
+        per_location = await asyncio.gather(
+            *(self.asearch_jobs(query, loc, limit) for loc in locations)
+        )
+        return _merge(per_location)
+
+    def iter_jobs(self, query: str = "", location: str = "", page_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """
+        Every job in the provider's feed for (query, location), normalized,
+        fetched one page at a time as the caller consumes them (nothing is
+        cached or held beyond the current page). Pages are followed through
+        the provider's `next_cursor` until it stops returning one.
+        """
+        if not self.is_configured():
+            yield from self._mock_search_jobs(query, location, page_size)
+            return
+
+        params = {"q": query, "location": location, "limit": page_size}
+        while True:
+            body = self._request(params)
+            for raw in body.get("results", []):
+                yield self._normalize_job(raw)
+            cursor = body.get("next_cursor")
+            if not cursor or not body.get("results"):
+                return
+            params["cursor"] = cursor
+
+    # ----------------------------------------------------------
+    # Helpers
+    # ----------------------------------------------------------
+    def _params(self, key) -> Dict[str, Any]:
+        query, location, limit = key
+        return {
             "q": query,
             "location": location,
             "limit": limit,
         }
+
+    def _fetch(self, key) -> List[Dict[str, Any]]:
+        return [self._normalize_job(j) for j in self._request(self._params(key)).get("results", [])]
+
+    def _request(self, params) -> Dict[str, Any]:
+        """One rate-limited, retried GET /jobs/search; returns the JSON body."""
         url = f"{self.base_url}/jobs/search"
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.limiter.reserve())
+            retry_after = None
+            try:
+                resp = self.session.get(url, headers=self._headers(), params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+            else:
+                if resp.status_code == 200:
+                    return resp.json()
+                last_error, retry_after = self._check(resp.status_code, resp.text, resp.headers)
+            if attempt < self.max_retries:
+                time.sleep(self._delay(attempt, retry_after))
+        raise JobProviderError(f"Job provider unavailable: {last_error}")
 
-        resp = requests.get(url, headers= self.headers(), params=params, timeout=10)
-        resp.raise_for_status()
-        raw_jobs = resp.json().get("results", [])
+    async def _afetch(self, key) -> List[Dict[str, Any]]:
+        client = self._async_client()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.limiter.reserve())
+            retry_after = None
+            try:
+                resp = await client.get(f"{self.base_url}/jobs/search", params=self._params(key))
+            except httpx.TransportError as e:
+                last_error = e
+            else:
+                if resp.status_code == 200:
+                    return [self._normalize_job(j) for j in resp.json().get("results", [])]
+                last_error, retry_after = self._check(resp.status_code, resp.text, resp.headers)
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._delay(attempt, retry_after))
+        raise JobProviderError(f"Job provider unavailable: {last_error}")
 
-        # Map provider fields -> internal format
-        return [self._normalize_job(j) for j in raw_jobs]
+    def _check(self, status, text, headers):
+        """(error, retry_after) for a non-200 answer; raises if not retryable."""
+        error = JobProviderError(f"Job provider returned {status}: {text[:200]}")
+        if status not in RETRY_STATUSES:
+            raise error
+        return error, _parse_retry_after(headers.get("Retry-After"))
+
+    def _delay(self, attempt, retry_after):
+        delay = self.backoff * (2 ** attempt) * (1 + random.random())
+        return max(delay, retry_after or 0)
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                headers=self._headers(),
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+        return client
 
-    # ----------------------------------------------------------
-    # Helpers
-    # ----------------------------------------------------------
     def _normalize_job(self, raw: Dict[str, Any]) -> Dict[str, Any]:
         """
         Convert API provider job JSON into a common schema.
@@ -122,5 +394,29 @@ class LinkedInClient:
         ][:limit]
 
 
+def _copy(jobs):
+    # Cached lists are shared; callers get their own dicts.
+    return [dict(j) for j in jobs]
+
+
+def _merge(per_location):
+    seen, merged = set(), []
+    for jobs in per_location:
+        for job in jobs:
+            ext = job.get("external_id")
+            if ext is not None and ext in seen:
+                continue
+            seen.add(ext)
+            merged.append(job)
+    return merged
+
+
+def _parse_retry_after(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
 # Singleton instance used by views
-linkedin_client = LinkedInClient()
\ No newline at end of file
+linkedin_client = LinkedInClient()
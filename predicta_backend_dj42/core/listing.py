@@ -0,0 +1,64 @@
+"""
+List endpoints for jobs and candidates: keyset pagination on -id and
+?fields= projection.
+
+Without ?fields the list serializer leaves out the large text columns
+(jd_text, resume_text) and the queryset defers them, so SQLite never reads
+them. ?fields=id,name,resume_text returns exactly those fields and loads
+only their columns.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Opaque ?cursor= on the primary key; stable while rows are inserted."""
+    ordering = "-id"
+    page_size = settings.LIST_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.LIST_MAX_PAGE_SIZE
+
+
+class ProjectedListMixin:
+    """
+    ViewSet mixin. Subclasses set list_serializer_class and heavy_fields
+    (columns deferred unless asked for); other actions are unchanged.
+    """
+    pagination_class = IdCursorPagination
+    list_serializer_class = None
+    heavy_fields = ()
+
+    def requested_fields(self):
+        raw = self.request.query_params.get("fields")
+        if self.action != "list" or not raw:
+            return None
+        wanted = [f.strip() for f in raw.split(",") if f.strip()]
+        allowed = self.serializer_class().fields
+        unknown = [f for f in wanted if f not in allowed]
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(unknown)}"})
+        return wanted
+
+    def get_serializer_class(self):
+        if self.action == "list" and not self.requested_fields():
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        ser = super().get_serializer(*args, **kwargs)
+        wanted = self.requested_fields()
+        if wanted:
+            child = getattr(ser, "child", ser)
+            for name in set(child.fields) - set(wanted):
+                child.fields.pop(name)
+        return ser
+
+    def project(self, qs):
+        """Push the projection down to the SELECT (used by get_queryset)."""
+        if self.action != "list":
+            return qs
+        wanted = self.requested_fields()
+        if wanted:
+            return qs.only("id", *wanted)
+        return qs.defer(*self.heavy_fields)
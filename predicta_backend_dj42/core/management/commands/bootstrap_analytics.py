@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import backfill_rollups, ensure_indexes
+
+
+class Command(BaseCommand):
+    help = "Create the Mongo analytics indexes and rebuild daily rollups from raw events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skip-indexes", action="store_true")
+        parser.add_argument("--skip-backfill", action="store_true")
+
+    def handle(self, *args, skip_indexes=False, skip_backfill=False, **options):
+        if not skip_indexes:
+            names = ensure_indexes()
+            self.stdout.write(f"indexes ready: {', '.join(names)}")
+        if not skip_backfill:
+            n = backfill_rollups()
+            self.stdout.write(f"rollups rebuilt: {n} documents")
@@ -0,0 +1,54 @@
+import signal
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.job_feed import ingest_feed
+from core.linkedin_client import JobProviderError, linkedin_client
+
+
+class Command(BaseCommand):
+    help = "Pull the external provider's job feed into Job rows (upserted by external id)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", required=True,
+                            help="Username or email of the recruiter who owns the ingested jobs.")
+        parser.add_argument("--query", default="", help="Provider search keyword.")
+        parser.add_argument("--location", action="append", default=None,
+                            help="Location to pull; repeat for several (default: any).")
+        parser.add_argument("--page-size", type=int, default=None,
+                            help="Records per provider page (default JOB_FEED_PAGE_SIZE).")
+        parser.add_argument("--every", type=float, default=0,
+                            help="Re-ingest every N seconds until stopped (default: run once).")
+
+    def handle(self, *args, owner, query="", location=None, page_size=None, every=0, **options):
+        user = User.objects.filter(username=owner).first() or User.objects.filter(email=owner).first()
+        if user is None:
+            raise CommandError(f"No user '{owner}'")
+        page_size = page_size or settings.JOB_FEED_PAGE_SIZE
+
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+
+        while not stopping:
+            for loc in location or [""]:
+                try:
+                    stats = ingest_feed(user, linkedin_client.iter_jobs(query, loc, page_size))
+                except JobProviderError as e:
+                    if not every:
+                        raise CommandError(str(e))
+                    self.stderr.write(f"feed {loc or 'any'}: {e}")
+                    continue
+                self.stdout.write(
+                    f"feed {loc or 'any'}: {stats['seen']} seen, {stats['created']} created, "
+                    f"{stats['updated']} updated, {stats['unchanged']} unchanged, "
+                    f"{stats['skipped']} skipped"
+                )
+            if not every:
+                break
+            deadline = time.monotonic() + every
+            while not stopping and time.monotonic() < deadline:
+                time.sleep(min(1.0, every))
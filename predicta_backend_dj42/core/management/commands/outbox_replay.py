@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils import timezone
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = ("Re-send outbox events to Mongo. By default every retained sent event is "
+            "marked unsent; --rebuild queues an upsert for every current row instead.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Only events created at/after this date or datetime.")
+        parser.add_argument("--aggregate", choices=["job", "candidate"])
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Queue all current jobs/candidates (Mongo lost beyond retention).")
+
+    def handle(self, *args, since=None, aggregate=None, rebuild=False, **options):
+        if rebuild:
+            n = outbox.rebuild(aggregate)
+            self.stdout.write(f"queued {n} upsert(s); run run_outbox_relay to apply")
+            return
+
+        when = None
+        if since:
+            when = parse_datetime(since)
+            if when is None:
+                day = parse_date(since)
+                if day is None:
+                    raise CommandError(f"Invalid --since '{since}'")
+                when = timezone.datetime(day.year, day.month, day.day)
+            if timezone.is_naive(when):
+                when = timezone.make_aware(when)
+        n = outbox.replay(when, aggregate)
+        self.stdout.write(f"marked {n} event(s) for replay; run run_outbox_relay to apply")
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import request_profiler
+
+
+class Command(BaseCommand):
+    help = "Print an X-Profile header value that profiles requests to one path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Request path, e.g. /api/jobs/42/rank/")
+        parser.add_argument("--ttl", type=int, default=300, help="Seconds the token stays valid.")
+        parser.add_argument("--secret", default=None,
+                            help="Signing secret (default PROFILE_SECRET; use the embedding "
+                                 "server's for its paths).")
+
+    def handle(self, *args, path, ttl=300, secret=None, **options):
+        secret = secret or settings.PROFILE_SECRET
+        if not secret:
+            raise CommandError("PROFILE_SECRET is not set")
+        self.stdout.write(request_profiler.sign(secret, path, ttl))
@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Replicate outbox events (jobs, candidates) to Mongo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Relay until caught up, then exit.")
+        parser.add_argument("--batch", type=int, default=None,
+                            help="Events per batch (default OUTBOX_BATCH_SIZE).")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="Seconds to sleep when caught up.")
+        parser.add_argument("--retry", type=float, default=5.0,
+                            help="Seconds to wait after a failed batch.")
+
+    def handle(self, *args, once=False, batch=None, poll=1.0, retry=5.0, **options):
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+
+        total = 0
+        while not stopping:
+            try:
+                n = outbox.relay_batch(batch)
+            except Exception as e:
+                self.stderr.write(f"relay failed, retrying in {retry:g}s: {e}")
+                if once:
+                    break
+                time.sleep(retry)
+                continue
+            total += n
+            if n:
+                lag = outbox.lag()
+                self.stdout.write(f"relayed {n} event(s); pending={lag['pending']} "
+                                  f"lag={lag['lag_seconds']:.1f}s")
+                continue
+            outbox.prune()
+            if once:
+                break
+            time.sleep(poll)
+        self.stdout.write(f"stopped: {total} event(s) relayed")
@@ -0,0 +1,36 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = "Run the local background task queue (precompute etc.)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the due tasks and exit instead of polling.")
+        parser.add_argument("--batch", type=int, default=None,
+                            help="Tasks claimed per round (default TASKS_BATCH_SIZE).")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, once=False, batch=None, poll=1.0, **options):
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+
+        total_ok = total_failed = 0
+        while not stopping:
+            ok, failed = tasks.run_pending(batch)
+            total_ok += ok
+            total_failed += failed
+            if ok or failed:
+                self.stdout.write(f"ran {ok + failed} task(s), {failed} failed")
+            elif once:
+                break
+            else:
+                time.sleep(poll)
+        self.stdout.write(f"stopped: {total_ok} ok, {total_failed} failed")
@@ -0,0 +1,271 @@
+# core/middleware.py
+"""
+AsyncWhiteNoiseMiddleware: WhiteNoise's middleware is sync-only, which makes Django run everything
+below it through sync_to_async/async_to_sync under ASGI; the async views
+(core/async_views.py) then queue on one thread per process. This subclass
+serves static files the same way but passes other requests straight to an
+async get_response.
+
+StageTimingMiddleware: per-request stage timing (stage_timing.py), returned
+as a Server-Timing header and fed to the /metrics histograms.
+
+ProfilingMiddleware: profiles the one request that asks for it with a
+signed X-Profile header or, for staff, ?profile=1 (request_profiler.py);
+the id of the stored profile comes back in X-Profile-Id. cProfile and the
+sampler follow one thread, so under ASGI the capture runs on the thread of
+the view: the request's sync_to_async executor thread for sync views
+(everything DRF), the event loop only for native async views.
+
+CompressionMiddleware: brotli or gzip (whichever the client accepts,
+brotli first) for text and JSON responses of COMPRESS_MIN_BYTES or more.
+"""
+
+import gzip
+from time import perf_counter
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+import request_profiler
+import stage_timing
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self._async = iscoroutinefunction(get_response)
+        if self._async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._async:
+            return self._acall(request)
+        return super().__call__(request)
+
+    async def _acall(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class StageTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._async = iscoroutinefunction(get_response)
+        if self._async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._async:
+            return self._acall(request)
+        token = stage_timing.begin()
+        if token is None:
+            return self.get_response(request)
+        t0 = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = stage_timing.finish(token, perf_counter() - t0)
+        response["Server-Timing"] = stage_timing.server_timing(timings)
+        return response
+
+    async def _acall(self, request):
+        token = stage_timing.begin()
+        if token is None:
+            return await self.get_response(request)
+        t0 = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = stage_timing.finish(token, perf_counter() - t0)
+        response["Server-Timing"] = stage_timing.server_timing(timings)
+        return response
+
+
+def profile_store():
+    return request_profiler.ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_STORED)
+
+
+def _is_staff(request):
+    """Session user, else the JWT the API views would authenticate."""
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        try:
+            found = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            found = None
+        user = found[0] if found else None
+    return bool(user and user.is_staff)
+
+
+def _is_async_view(request):
+    try:
+        match = resolve(request.path_info, getattr(request, "urlconf", None))
+    except Resolver404:
+        return False
+    return iscoroutinefunction(match.func)
+
+
+async def _on_view_thread(on_loop, fn, *args):
+    return fn(*args) if on_loop else await sync_to_async(fn)(*args)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._async = iscoroutinefunction(get_response)
+        if self._async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._async:
+            return self._acall(request)
+        mode = self._requested(request)
+        if mode is None:
+            return self.get_response(request)
+        capture = request_profiler.try_start(mode, settings.PROFILE_SAMPLE_INTERVAL)
+        if capture is None:
+            response = self.get_response(request)
+            response["X-Profile-Id"] = "busy"
+            return response
+        try:
+            response = self.get_response(request)
+        finally:
+            request_profiler.finish(capture)
+        response["X-Profile-Id"] = profile_store().save(
+            capture, request.method, request.path, response.status_code
+        )
+        return response
+
+    async def _acall(self, request):
+        mode = self._signed_mode(request)
+        if mode is None and self._flag(request):
+            mode = await sync_to_async(self._staff_mode)(request)
+        if mode is None:
+            return await self.get_response(request)
+        # Sync views run on the request's thread-sensitive executor thread,
+        # not on the loop: start and stop the capture there.
+        on_loop = _is_async_view(request)
+        capture = await _on_view_thread(
+            on_loop, request_profiler.try_start, mode, settings.PROFILE_SAMPLE_INTERVAL
+        )
+        if capture is None:
+            response = await self.get_response(request)
+            response["X-Profile-Id"] = "busy"
+            return response
+        try:
+            response = await self.get_response(request)
+        finally:
+            await _on_view_thread(on_loop, request_profiler.finish, capture)
+        response["X-Profile-Id"] = await sync_to_async(profile_store().save)(
+            capture, request.method, request.path, response.status_code
+        )
+        return response
+
+    def _requested(self, request):
+        mode = self._signed_mode(request)
+        if mode is None and self._flag(request):
+            mode = self._staff_mode(request)
+        return mode
+
+    def _signed_mode(self, request):
+        token = request.META.get("HTTP_X_PROFILE")
+        if token and request_profiler.verify(settings.PROFILE_SECRET, token, request.path):
+            return request_profiler.parse_mode(request.META.get("HTTP_X_PROFILE_MODE"))
+        return None
+
+    def _flag(self, request):
+        return "profile=" in request.META.get("QUERY_STRING", "") and request.GET.get("profile")
+
+    def _staff_mode(self, request):
+        if not _is_staff(request):
+            return None
+        return request_profiler.parse_mode(request.GET.get("profile"))
+
+
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+def _accepted(header):
+    """Codings the client accepts (q > 0) from an Accept-Encoding header."""
+    out = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        out.add(coding.strip())
+    return out
+
+
+def compress(request, response):
+    if (
+        response.streaming
+        or response.has_header("Content-Encoding")
+        or not response.get("Content-Type", "").startswith(COMPRESSIBLE)
+        or len(response.content) < settings.COMPRESS_MIN_BYTES
+    ):
+        return response
+    patch_vary_headers(response, ("Accept-Encoding",))
+    accepted = _accepted(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    with stage_timing.stage("compress"):
+        if "br" in accepted:
+            coding = "br"
+            body = brotli.compress(response.content, quality=settings.COMPRESS_BROTLI_QUALITY)
+        elif "gzip" in accepted or "*" in accepted:
+            coding = "gzip"
+            body = gzip.compress(response.content, compresslevel=settings.COMPRESS_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+    if len(body) >= len(response.content):
+        return response
+    response.content = body
+    response["Content-Length"] = str(len(body))
+    response["Content-Encoding"] = coding
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag  # the body differs per coding
+    return response
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._async = iscoroutinefunction(get_response)
+        if self._async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._async:
+            return self._acall(request)
+        return compress(request, self.get_response(request))
+
+    async def _acall(self, request):
+        return compress(request, await self.get_response(request))
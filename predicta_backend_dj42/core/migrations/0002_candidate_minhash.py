@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidate',
+            name='minhash',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='CandidateBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='core.candidate')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'band', 'bucket'], name='core_candid_job_id_6f60d1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='candidateband',
+            constraint=models.UniqueConstraint(fields=('candidate', 'band'), name='uniq_candidate_band'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ranking',
+            name='idf_snapshot',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
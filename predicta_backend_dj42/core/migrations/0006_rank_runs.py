@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_ranking_idf_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('options', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('running', 'running'), ('done', 'done'), ('failed', 'failed'), ('cancelled', 'cancelled'), ('superseded', 'superseded')], default='queued', max_length=12)),
+                ('stage', models.CharField(blank=True, max_length=20)),
+                ('candidates', models.PositiveIntegerField(default=0)),
+                ('results_count', models.PositiveIntegerField(default=0)),
+                ('stale', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_runs', to='core.job')),
+                ('superseded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.rankrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'status'], name='core_rankru_job_id_67c4dd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_rank_singleflight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='source',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(fields=('owner', 'source', 'external_id'), name='uniq_job_external_id'),
+        ),
+    ]
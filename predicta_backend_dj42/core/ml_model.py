@@ -5,6 +5,8 @@ import xgboost as xgb
 import numpy as np
 from django.conf import settings
 
+from stage_timing import timed
+
 
 MODEL_PATH = os.path.join(settings.BASE_DIR, "xgb_model.json")
 
@@ -30,6 +32,7 @@ class RankingModel:
         else:
             self.model = None
 
+    @timed("model.predict")
     def predict_score(self, features: dict):
         """
         Predict ranking score from frontend-extracted features.
@@ -41,6 +44,19 @@ class RankingModel:
         score = float(self.model.predict(x)[0])
         return score
 
+    @timed("model.predict")
+    def predict_scores(self, feature_rows):
+        """
+        Batched predict_score: one model call for many candidates.
+        """
+        if self.model is None:
+            raise ValueError("XGBoost model not found. Train it first.")
+        if not feature_rows:
+            return []
+
+        x = np.array([[r[f] for f in FEATURE_ORDER] for r in feature_rows], dtype=np.float32)
+        return [float(v) for v in self.model.predict(x)]
+
     def train_model(self, rows):
         """
         Retrain XGBoost model with new feature rows.
@@ -7,8 +7,18 @@ class Job(models.Model):
     jd_text = models.TextField()
     remove_stopwords = models.BooleanField(default=True)
     anonymize_pii = models.BooleanField(default=True)
+    # Set on jobs pulled from an external feed (core/job_feed.py).
+    source = models.CharField(max_length=50, blank=True)
+    external_id = models.CharField(max_length=200, null=True, blank=True)
+    url = models.URLField(max_length=500, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # NULL external ids (jobs created in the app) never conflict.
+            models.UniqueConstraint(fields=["owner", "source", "external_id"], name="uniq_job_external_id"),
+        ]
+
     def __str__(self):
         return self.title or f"Job #{self.id}"
 
@@ -18,12 +28,138 @@ class Candidate(models.Model):
     email = models.EmailField(blank=True)
     resume_text = models.TextField()
     uploaded_file = models.FileField(upload_to="resumes/", blank=True, null=True)
+    minhash = models.JSONField(null=True, blank=True, editable=False)  # see core/dedup.py
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name or f"Candidate #{self.id}"
 
+class CandidateBand(models.Model):
+    """LSH band index: one row per (candidate, band) of its MinHash signature."""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='+')
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='bands')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["candidate", "band"], name="uniq_candidate_band"),
+        ]
+        indexes = [models.Index(fields=["job", "band", "bucket"])]
+
 class Ranking(models.Model):
     job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='ranking')
     results_json = models.JSONField()
+    idf_snapshot = models.JSONField(null=True, blank=True)  # tfidf runs only, see core/incremental.py
+    input_key = models.CharField(max_length=64, blank=True)  # core/singleflight.py, rank_runs.result_key()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class RankLock(models.Model):
+    """Held by the one request computing a given ranking input (core/singleflight.py)."""
+    key = models.CharField(max_length=64, unique=True)
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='+')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class Task(models.Model):
+    """Row in the local task queue (core/tasks.py); run by `manage.py run_tasks`."""
+    PENDING, RUNNING, FAILED = "pending", "running", "failed"
+    STATUS_CHOICES = [(PENDING, PENDING), (RUNNING, RUNNING), (FAILED, FAILED)]
+
+    name = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["name", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name}({self.object_id}) {self.status}"
+
+class CandidateArtifact(models.Model):
+    """Precomputed ranking inputs for a candidate (core/precompute.py)."""
+    PENDING, READY, FAILED = "pending", "ready", "failed"
+    STATUS_CHOICES = [(PENDING, PENDING), (READY, READY), (FAILED, FAILED)]
+
+    candidate = models.OneToOneField(Candidate, on_delete=models.CASCADE, related_name='artifact')
+    fingerprint = models.CharField(max_length=40)  # resume text + job tokenization options
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    tokens = models.JSONField(default=list)
+    skills = models.JSONField(default=list)
+    soft_skills = models.JSONField(default=list)
+    years = models.PositiveIntegerField(default=0)
+    embedding = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class JobArtifact(models.Model):
+    PENDING, READY, FAILED = "pending", "ready", "failed"
+    STATUS_CHOICES = [(PENDING, PENDING), (READY, READY), (FAILED, FAILED)]
+
+    job = models.OneToOneField(Job, on_delete=models.CASCADE, related_name='artifact')
+    fingerprint = models.CharField(max_length=40)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    tokens = models.JSONField(default=list)
+    embedding = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class OutboxEvent(models.Model):
+    """
+    Job/Candidate change waiting to be replicated to Mongo (core/outbox.py).
+    Written in the same transaction as the change; the relay reads the
+    current row, so events only point at what changed.
+    """
+    JOB, CANDIDATE = "job", "candidate"
+    AGGREGATE_CHOICES = [(JOB, JOB), (CANDIDATE, CANDIDATE)]
+    UPSERT, DELETE = "upsert", "delete"
+    OP_CHOICES = [(UPSERT, UPSERT), (DELETE, DELETE)]
+
+    aggregate = models.CharField(max_length=20, choices=AGGREGATE_CHOICES)
+    object_id = models.BigIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES, default=UPSERT)
+    content_hash = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    sent_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["aggregate", "object_id"])]
+
+class RankRun(models.Model):
+    """
+    Background ranking of a job (core/rank_runs.py), started with
+    POST /api/jobs/{id}/rank/ {"async": true} and polled at /api/rank-runs/{id}/.
+    """
+    QUEUED, RUNNING, DONE = "queued", "running", "done"
+    FAILED, CANCELLED, SUPERSEDED = "failed", "cancelled", "superseded"
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, DONE, FAILED, CANCELLED, SUPERSEDED)]
+    ACTIVE = (QUEUED, RUNNING)
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='rank_runs')
+    options = models.JSONField(default=dict)  # core.ranking.parse_options()
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=20, blank=True)
+    candidates = models.PositiveIntegerField(default=0)
+    results_count = models.PositiveIntegerField(default=0)
+    stale = models.BooleanField(default=False)  # JD or candidates changed since the run started
+    superseded_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["job", "status"])]
+
+    def __str__(self):
+        return f"RankRun #{self.id} job={self.job_id} {self.status}"
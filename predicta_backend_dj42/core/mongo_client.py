@@ -1,14 +1,40 @@
 # core/mongo_client.py
+import asyncio
 import os
-from pymongo import MongoClient
+import weakref
+from pymongo import AsyncMongoClient, MongoClient
 from django.conf import settings
 
 _client = None
+# One async client (and connection pool) per event loop, i.e. one per ASGI
+# server process. The async views are only routed under ASGI (ASYNC_VIEWS).
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _settings():
+    uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    # Fail fast instead of pymongo's 30s default when Mongo is down.
+    timeout_ms = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+    return uri, {
+        "serverSelectionTimeoutMS": timeout_ms,
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    }
+
 
 def get_mongo_db():
     global _client
     if _client is None:
-        uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-        _client = MongoClient(uri)
+        uri, options = _settings()
+        _client = MongoClient(uri, **options)
     db_name = os.getenv("MONGO_DB", "predicta")
     return _client[db_name]
+
+
+def get_async_mongo_db():
+    """Database handle of the pymongo async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        uri, options = _settings()
+        client = _async_clients[loop] = AsyncMongoClient(uri, **options)
+    return client[os.getenv("MONGO_DB", "predicta")]
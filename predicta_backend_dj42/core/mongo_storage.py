@@ -1,51 +1,132 @@
 # core/mongo_storage.py
+"""
+Mongo copies of job descriptions and parsed resumes (FR7.1).
+
+Written only by the outbox relay (core/outbox.py), never on the request
+path, one unordered bulk_write of idempotent upserts per collection and
+batch. job_descriptions and parsed_resumes hold one document per job_id /
+candidate_id. Resume text is stored once per distinct content in
+resume_texts (_id = sha256 of the text), zstd-compressed; use
+load_resume_text() to read it back (documents with the "zlib" codec, from
+before zstandard was required, still decode).
+"""
+
+import hashlib
+import zlib
 from datetime import datetime
+
+import zstandard
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+from .analytics_writer import insert_new
 from .mongo_client import get_mongo_db
 
+ZSTD_LEVEL = 3
 
-def save_job_description(job):
-    """
-    Store the full job description in MongoDB (FR7.1).
-    One document per job_id.
-    """
-    db = get_mongo_db()
-    db.job_descriptions.update_one(
-        {"job_id": job.id},  # match by job_id
-        {
-            "$set": {
-                "job_id": job.id,
-                "title": job.title,
-                "jd_text": job.jd_text,
-                "remove_stopwords": job.remove_stopwords,
-                "anonymize_pii": job.anonymize_pii,
-                "owner_id": job.owner_id,
-                "stored_at": datetime.utcnow(),
-            }
-        },
-        upsert=True,
-    )
-
-
-def save_parsed_resume(candidate):
+
+def text_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def compress_text(text):
+    """(codec, bytes) for `text`."""
+    raw = (text or "").encode("utf-8")
+    return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+
+
+def decompress_text(codec, data):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(bytes(data)).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(bytes(data)).decode("utf-8")
+    raise ValueError(f"Unknown codec '{codec}'")
+
+
+def job_document(job):
+    return {
+        "job_id": job.id,
+        "title": job.title,
+        "jd_text": job.jd_text,
+        "remove_stopwords": job.remove_stopwords,
+        "anonymize_pii": job.anonymize_pii,
+        "owner_id": job.owner_id,
+    }
+
+
+def candidate_document(candidate):
+    return {
+        "candidate_id": candidate.id,
+        "job_id": candidate.job_id,
+        "name": candidate.name,
+        "email": candidate.email,
+        "uploaded_file": candidate.uploaded_file.url if candidate.uploaded_file else None,
+        "text_hash": text_hash(candidate.resume_text),
+    }
+
+
+def upsert_jobs(db, jobs):
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne({"job_id": job.id}, {"$set": {**job_document(job), "stored_at": now}}, upsert=True)
+        for job in jobs
+    ]
+    if ops:
+        db.job_descriptions.bulk_write(ops, ordered=False)
+
+
+def upsert_candidates(db, candidates):
     """
-    Store the parsed resume text in MongoDB (FR7.1).
-    One document per candidate_id.
+    Store each distinct resume text once, then upsert the per-candidate
+    documents pointing at it. Texts already in Mongo are not re-sent.
     """
-    db = get_mongo_db()
-    db.parsed_resumes.update_one(
-        {"candidate_id": candidate.id},
-        {
-            "$set": {
-                "candidate_id": candidate.id,
-                "job_id": candidate.job_id,
-                "name": candidate.name,
-                "email": candidate.email,
-                "resume_text": candidate.resume_text,
-                "uploaded_file": (
-                    candidate.uploaded_file.url if candidate.uploaded_file else None
-                ),
-                "stored_at": datetime.utcnow(),
-            }
-        },
-        upsert=True,
-    )
+    texts = {}
+    for c in candidates:
+        texts.setdefault(text_hash(c.resume_text), c.resume_text)
+    if texts:
+        present = {
+            d["_id"] for d in db.resume_texts.find({"_id": {"$in": list(texts)}}, {"_id": 1})
+        }
+        new = []
+        for h, text in texts.items():
+            if h in present:
+                continue
+            codec, data = compress_text(text)
+            new.append({"_id": h, "codec": codec, "data": Binary(data), "length": len(text)})
+        if new:
+            insert_new(db, "resume_texts", new)
+
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {"candidate_id": c.id},
+            # resume_text is dropped from documents written before the outbox.
+            {"$set": {**candidate_document(c), "stored_at": now}, "$unset": {"resume_text": ""}},
+            upsert=True,
+        )
+        for c in candidates
+    ]
+    if ops:
+        db.parsed_resumes.bulk_write(ops, ordered=False)
+
+
+def delete_jobs(db, job_ids):
+    if job_ids:
+        db.job_descriptions.delete_many({"job_id": {"$in": list(job_ids)}})
+
+
+def delete_candidates(db, candidate_ids):
+    if candidate_ids:
+        db.parsed_resumes.delete_many({"candidate_id": {"$in": list(candidate_ids)}})
+
+
+def load_resume_text(candidate_id, db=None):
+    """Decompressed resume text of a replicated candidate, or None."""
+    db = db if db is not None else get_mongo_db()
+    doc = db.parsed_resumes.find_one({"candidate_id": candidate_id}, {"text_hash": 1, "resume_text": 1})
+    if doc is None:
+        return None
+    if "text_hash" not in doc:
+        return doc.get("resume_text")
+    blob = db.resume_texts.find_one({"_id": doc["text_hash"]})
+    return decompress_text(blob["codec"], blob["data"]) if blob else None
@@ -0,0 +1,161 @@
+# core/outbox.py
+"""
+Transactional outbox for replicating jobs and candidates to Mongo.
+
+Saving or deleting a Job/Candidate adds an OutboxEvent in the same
+database transaction (signals in core/signals.py; bulk ingest calls
+record_many). Nothing touches Mongo on the request path. The relay
+(`manage.py run_outbox_relay`) reads unsent events in id order, keeps the
+last event per object, loads the current rows and applies idempotent
+upserts/deletes through core/mongo_storage.py, then marks the batch sent.
+A failed batch stays unsent and is retried on the next pass, so Mongo
+converges to the database state. `manage.py outbox_replay` re-sends.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from . import mongo_storage
+from .mongo_client import get_mongo_db
+
+
+def _content_hash(aggregate, obj):
+    """Hash of the document the relay would write for `obj`."""
+    if aggregate == "job":
+        doc = mongo_storage.job_document(obj)
+    else:
+        doc = mongo_storage.candidate_document(obj)
+    return mongo_storage.text_hash(repr(sorted(doc.items())))
+
+
+def record(aggregate, obj, op="upsert"):
+    """
+    Add an event for `obj`. Upserts whose content matches the last event
+    for the same object are skipped (saves that changed nothing).
+    """
+    from .models import OutboxEvent
+
+    h = _content_hash(aggregate, obj) if op == OutboxEvent.UPSERT else ""
+    if op == OutboxEvent.UPSERT:
+        last = (
+            OutboxEvent.objects.filter(aggregate=aggregate, object_id=obj.pk)
+            .order_by("-id").values_list("op", "content_hash").first()
+        )
+        if last == (OutboxEvent.UPSERT, h):
+            return None
+    return OutboxEvent.objects.create(aggregate=aggregate, object_id=obj.pk, op=op, content_hash=h)
+
+
+def record_many(aggregate, objs):
+    """Upsert events for freshly created rows (bulk_create skips signals)."""
+    from .models import OutboxEvent
+
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(aggregate=aggregate, object_id=o.pk, content_hash=_content_hash(aggregate, o))
+        for o in objs
+    ], batch_size=500)
+
+
+def relay_batch(limit=None, db=None):
+    """
+    Replicate one batch of unsent events. Returns the number of events
+    handled; raises (leaving them unsent) if Mongo rejects the batch.
+    """
+    from .models import Candidate, Job, OutboxEvent
+
+    limit = limit or settings.OUTBOX_BATCH_SIZE
+    events = list(OutboxEvent.objects.filter(sent_at__isnull=True).order_by("id")[:limit])
+    if not events:
+        return 0
+
+    latest = {}
+    for ev in events:
+        latest[(ev.aggregate, ev.object_id)] = ev
+
+    def ids(aggregate, op):
+        return [k[1] for k, ev in latest.items() if k[0] == aggregate and ev.op == op]
+
+    db = db if db is not None else get_mongo_db()
+    try:
+        # Load the current rows; an upsert whose row is gone became a delete.
+        jobs = list(Job.objects.filter(pk__in=ids("job", "upsert")))
+        cands = list(Candidate.objects.filter(pk__in=ids("candidate", "upsert")))
+        gone_jobs = set(ids("job", "upsert")) - {j.pk for j in jobs}
+        gone_cands = set(ids("candidate", "upsert")) - {c.pk for c in cands}
+
+        mongo_storage.upsert_jobs(db, jobs)
+        mongo_storage.upsert_candidates(db, cands)
+        mongo_storage.delete_jobs(db, set(ids("job", "delete")) | gone_jobs)
+        mongo_storage.delete_candidates(db, set(ids("candidate", "delete")) | gone_cands)
+    except Exception as e:
+        OutboxEvent.objects.filter(pk__in=[ev.pk for ev in events]).update(
+            attempts=F("attempts") + 1, last_error=str(e)[:2000]
+        )
+        raise
+
+    OutboxEvent.objects.filter(pk__in=[ev.pk for ev in events]).update(
+        sent_at=timezone.now(), last_error=""
+    )
+    return len(events)
+
+
+def lag():
+    """
+    Replication lag: unsent events and the age of the oldest one (0 when
+    caught up), plus when the last event was sent.
+    """
+    from .models import OutboxEvent
+
+    now = timezone.now()
+    pending = OutboxEvent.objects.filter(sent_at__isnull=True)
+    agg = pending.aggregate(oldest=Min("created_at"))
+    last_sent = OutboxEvent.objects.aggregate(last=Max("sent_at"))["last"]
+    return {
+        "pending": pending.count(),
+        "lag_seconds": (now - agg["oldest"]).total_seconds() if agg["oldest"] else 0.0,
+        "last_sent_at": last_sent.isoformat() if last_sent else None,
+    }
+
+
+def prune(days=None):
+    """Delete sent events older than OUTBOX_RETENTION_DAYS."""
+    from .models import OutboxEvent
+
+    days = settings.OUTBOX_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(sent_at__lt=cutoff).delete()
+    return deleted
+
+
+def replay(since=None, aggregate=None):
+    """Mark retained sent events unsent again so the relay re-applies them."""
+    from .models import OutboxEvent
+
+    qs = OutboxEvent.objects.filter(sent_at__isnull=False)
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+    if aggregate:
+        qs = qs.filter(aggregate=aggregate)
+    return qs.update(sent_at=None, attempts=0, last_error="")
+
+
+def rebuild(aggregate=None):
+    """Queue an upsert for every current row (for a Mongo restored from scratch)."""
+    from .models import Candidate, Job
+
+    n = 0
+    for name, model in (("job", Job), ("candidate", Candidate)):
+        if aggregate and aggregate != name:
+            continue
+        batch = []
+        for obj in model.objects.order_by("pk").iterator(chunk_size=1000):
+            batch.append(obj)
+            if len(batch) >= 1000:
+                record_many(name, batch)
+                n, batch = n + len(batch), []
+        record_many(name, batch)
+        n += len(batch)
+    return n
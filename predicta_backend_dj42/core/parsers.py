@@ -0,0 +1,165 @@
+# core/parsers.py
+"""
+Resume text extraction.
+
+Parsers are registered per file extension and always work on in-memory
+bytes (no temp files). Every parser receives the same ParseLimits so one
+hostile document cannot tie up a worker: PDFs stop at `max_pages` and fail
+once `max_seconds` is spent.
+
+extract_text() is pure and safe to call from spawned worker processes;
+extract_text_cached() adds a content-hash cache in front of it and needs
+Django settings.
+"""
+
+import hashlib
+import io
+import time
+from dataclasses import dataclass
+
+PARSERS = {}
+
+# Bump when parser output changes so stale cache entries are ignored.
+PARSER_VERSION = 2
+
+
+class ParseError(ValueError):
+    """The file could not be turned into text."""
+
+
+@dataclass(frozen=True)
+class ParseLimits:
+    max_pages: int = 30
+    max_seconds: float = 10.0
+
+
+def register(*extensions):
+    """Decorator: register `fn(data: bytes, limits: ParseLimits) -> str`."""
+    def deco(fn):
+        for ext in extensions:
+            PARSERS[ext.lower()] = fn
+        return fn
+    return deco
+
+
+def file_extension(filename):
+    return (filename.rsplit(".", 1)[-1] if "." in filename else "").lower()
+
+
+def extract_text(data, filename, limits=None):
+    ext = file_extension(filename)
+    parser = PARSERS.get(ext)
+    if parser is None:
+        raise ParseError(f"Unsupported file type: .{ext}")
+    return parser(data, limits or ParseLimits())
+
+
+def content_key(data, filename, limits):
+    digest = hashlib.sha256(data).hexdigest()
+    return (f"parsed:v{PARSER_VERSION}:{file_extension(filename)}:"
+            f"{limits.max_pages}:{digest}")
+
+
+def default_limits():
+    from django.conf import settings
+    return ParseLimits(
+        max_pages=settings.PARSER_MAX_PAGES,
+        max_seconds=settings.PARSER_MAX_SECONDS,
+    )
+
+
+def parsed_text_cache():
+    from django.conf import settings
+    from django.core.cache import caches
+    return caches[settings.PARSER_CACHE_ALIAS]
+
+
+def extract_text_cached(data, filename, limits=None):
+    """extract_text() behind the content-hash cache: re-uploads skip parsing."""
+    limits = limits or default_limits()
+    cache = parsed_text_cache()
+    key = content_key(data, filename, limits)
+    text = cache.get(key)
+    if text is None:
+        text = extract_text(data, filename, limits)
+        cache.set(key, text)
+    return text
+
+
+# ---------- Built-in parsers ----------
+
+@register("txt")
+def parse_txt(data, limits):
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("latin-1", errors="ignore")
+
+
+@register("pdf")
+def parse_pdf(data, limits):
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    out = io.StringIO()
+    rsrc = PDFResourceManager(caching=True)
+    device = TextConverter(rsrc, out, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrc, device)
+    deadline = time.monotonic() + limits.max_seconds
+    try:
+        pages = PDFPage.get_pages(io.BytesIO(data), maxpages=limits.max_pages)
+        for page in pages:
+            interpreter.process_page(page)
+            if time.monotonic() > deadline:
+                raise ParseError(f"PDF parsing exceeded {limits.max_seconds:g}s")
+    except ParseError:
+        raise
+    except Exception as e:
+        raise ParseError("Failed to read PDF: %s" % e)
+    finally:
+        device.close()
+    return out.getvalue()
+
+
+@register("docx", "doc")
+def parse_docx(data, limits):
+    # python-docx only reads .docx reliably
+    from docx import Document
+
+    try:
+        doc = Document(io.BytesIO(data))
+    except Exception as e:
+        raise ParseError("Failed to read DOCX: %s" % e)
+
+    lines = []
+    deadline = time.monotonic() + limits.max_seconds
+    _docx_blocks(doc, lines, deadline, limits)
+    return "\n".join(lines)
+
+
+def _docx_blocks(container, lines, deadline, limits):
+    """Paragraphs and tables in document order, recursing into table cells."""
+    from docx.table import Table
+
+    for block in container.iter_inner_content():
+        if time.monotonic() > deadline:
+            raise ParseError(f"DOCX parsing exceeded {limits.max_seconds:g}s")
+        if isinstance(block, Table):
+            for row in block.rows:
+                seen, cells = set(), []
+                for cell in row.cells:
+                    # Merged cells repeat the same underlying element.
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    inner = []
+                    _docx_blocks(cell, inner, deadline, limits)
+                    text = " ".join(t for t in inner if t.strip())
+                    if text:
+                        cells.append(text)
+                if cells:
+                    lines.append(" | ".join(cells))
+        else:
+            lines.append(block.text)
@@ -0,0 +1,156 @@
+# core/precompute.py
+"""
+Background precompute of ranking inputs.
+
+Saving a Candidate or Job queues a task (core/signals.py, core/tasks.py)
+that stores tokens, hard/soft skills, years of experience and the SBERT
+embedding in CandidateArtifact / JobArtifact. rank() attaches artifacts
+whose fingerprint still matches the resume text and the job's tokenization
+options, and computes anything missing inline as before.
+"""
+
+import hashlib
+
+from django.conf import settings
+
+from .embedding_client import embedding_client
+from .scoring import (
+    tokens, extract_skills, extract_soft_skills, years_of_experience,
+)
+from .tasks import task, enqueue_many
+
+
+def fingerprint(text, remove_stop, pii):
+    return hashlib.sha1(f"{int(remove_stop)}{int(pii)}:{text}".encode()).hexdigest()
+
+
+def _embed(texts):
+    return embedding_client.embed(texts, client_id="precompute")
+
+
+def _mark_failed(model, field, ids, error):
+    model.objects.filter(**{f"{field}__in": ids}).update(
+        status=model.FAILED, error=error.strip().splitlines()[-1][:1000]
+    )
+
+
+def _candidates_failed(ids, error):
+    from .models import CandidateArtifact
+    _mark_failed(CandidateArtifact, "candidate_id", ids, error)
+
+
+def _jobs_failed(ids, error):
+    from .models import JobArtifact
+    _mark_failed(JobArtifact, "job_id", ids, error)
+
+
+@task("precompute_candidate", on_failure=_candidates_failed)
+def precompute_candidates(ids):
+    from .models import Candidate, CandidateArtifact
+
+    cands = Candidate.objects.filter(pk__in=ids).select_related("job", "artifact")
+    need_embedding = []
+    for cand in cands:
+        job = cand.job
+        fp = fingerprint(cand.resume_text, job.remove_stopwords, job.anonymize_pii)
+        art = getattr(cand, "artifact", None) or CandidateArtifact(candidate=cand)
+        if art.fingerprint != fp:
+            art.fingerprint = fp
+            art.tokens = tokens(cand.resume_text, job.remove_stopwords, job.anonymize_pii)
+            art.skills = extract_skills(cand.resume_text)
+            art.soft_skills = extract_soft_skills(cand.resume_text)
+            art.years = years_of_experience(cand.resume_text)
+            art.embedding = None
+            art.error = ""
+        art.status = CandidateArtifact.PENDING
+        art.save()
+        if settings.PRECOMPUTE_EMBEDDINGS and art.embedding is None:
+            need_embedding.append(art)
+
+    # Features are saved above, so a failing embedding call only delays
+    # the semantic part; the task is retried.
+    if need_embedding:
+        vectors = _embed([" ".join(a.tokens) for a in need_embedding])
+        for art, vec in zip(need_embedding, vectors):
+            art.embedding = vec
+        CandidateArtifact.objects.bulk_update(need_embedding, ["embedding"])
+
+    CandidateArtifact.objects.filter(candidate_id__in=ids).update(
+        status=CandidateArtifact.READY, error=""
+    )
+
+
+@task("precompute_job", on_failure=_jobs_failed)
+def precompute_jobs(ids):
+    from .models import Candidate, Job, JobArtifact
+
+    for job in Job.objects.filter(pk__in=ids).select_related("artifact"):
+        fp = fingerprint(job.jd_text, job.remove_stopwords, job.anonymize_pii)
+        art = getattr(job, "artifact", None) or JobArtifact(job=job)
+        if art.fingerprint != fp:
+            art.fingerprint = fp
+            art.tokens = tokens(job.jd_text, job.remove_stopwords, job.anonymize_pii)
+            art.embedding = None
+        art.status = JobArtifact.PENDING
+        art.save()
+
+        # Tokenization options may have changed: refresh stale candidates.
+        stale = [
+            cid for cid, text, cur in Candidate.objects.filter(job=job)
+            .values_list("id", "resume_text", "artifact__fingerprint")
+            if cur != fingerprint(text, job.remove_stopwords, job.anonymize_pii)
+        ]
+        enqueue_many("precompute_candidate", stale)
+
+        if settings.PRECOMPUTE_EMBEDDINGS and art.embedding is None:
+            art.embedding = _embed([" ".join(art.tokens)])[0]
+        art.status = JobArtifact.READY
+        art.error = ""
+        art.save()
+
+
+def attach(job, cands, with_embeddings=False):
+    """
+    Add precomputed "tokens", "skills", "softSkills" and "years" to the
+    candidate dicts whose artifacts are current. Returns {text: vector} for
+    the known embeddings (JD included), to be used with cached_embed().
+    """
+    from .models import CandidateArtifact, JobArtifact
+
+    fields = ["candidate_id", "fingerprint", "tokens", "skills", "soft_skills", "years"]
+    if with_embeddings:
+        fields.append("embedding")
+    arts = {
+        a["candidate_id"]: a for a in
+        CandidateArtifact.objects.filter(candidate__job=job).values(*fields)
+    }
+    known = {}
+    for c in cands:
+        a = arts.get(c["id"])
+        if a is None or a["fingerprint"] != fingerprint(
+            c["resume_text"], job.remove_stopwords, job.anonymize_pii
+        ):
+            continue
+        c.update(tokens=a["tokens"], skills=a["skills"],
+                 softSkills=a["soft_skills"], years=a["years"])
+        if with_embeddings and a["embedding"] is not None:
+            known[" ".join(a["tokens"])] = a["embedding"]
+
+    if with_embeddings:
+        ja = JobArtifact.objects.filter(job=job).values("fingerprint", "tokens", "embedding").first()
+        if ja and ja["embedding"] is not None and ja["fingerprint"] == fingerprint(
+            job.jd_text, job.remove_stopwords, job.anonymize_pii
+        ):
+            known[" ".join(ja["tokens"])] = ja["embedding"]
+    return known
+
+
+def cached_embed(embed, known):
+    """Wrap `embed(texts)` so texts with a known vector are not sent again."""
+    def wrapped(texts):
+        missing = [i for i, t in enumerate(texts) if t not in known]
+        if not missing:
+            return [known[t] for t in texts]
+        fresh = dict(zip(missing, embed([texts[i] for i in missing])))
+        return [fresh[i] if i in fresh else known[t] for i, t in enumerate(texts)]
+    return wrapped
@@ -0,0 +1,140 @@
+# core/rank_runs.py
+"""
+Background rank runs for large pools.
+
+POST /api/jobs/{id}/rank/ {"async": true} creates a RankRun and queues the
+"rank_run" task (core/tasks.py); `manage.py run_tasks` workers execute it
+with the same pipeline as the synchronous endpoint (core/ranking.py).
+Clients poll GET /api/rank-runs/{id}/, fetch rows from .../results/ and may
+POST .../cancel/.
+
+Saving or deleting the job or any of its candidates marks its active runs
+stale (core/signals.py). A worker checks the run between stages and again
+in the transaction that writes the Ranking: a cancelled run stops quietly,
+a stale run is marked superseded and a fresh run with the same options is
+queued in its place, so an outdated ranking is never stored.
+
+The Ranking a run writes is tagged with result_key(run id) in its
+input_key column; any later rank of the job (sync, batch or another run)
+replaces the tag, so results/ can tell whether the stored rows are still
+this run's.
+"""
+
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import ranking
+from .analytics import log_ranking_run, log_ranking_results
+from .tasks import task, enqueue
+
+logger = logging.getLogger(__name__)
+
+
+class RunStopped(Exception):
+    """The run was cancelled or went stale while it was executing."""
+
+
+def result_key(run_id):
+    """Ranking.input_key of the ranking stored by run `run_id`."""
+    return f"run:{run_id}"
+
+
+def start(job, options):
+    from .models import RankRun
+
+    with transaction.atomic():
+        run = RankRun.objects.create(job=job, options=options)
+        enqueue("rank_run", run.pk)
+    return run
+
+
+def cancel(run):
+    """Cancel a queued or running run. Returns False if it already finished."""
+    from .models import RankRun
+
+    return bool(RankRun.objects.filter(pk=run.pk, status__in=RankRun.ACTIVE).update(
+        status=RankRun.CANCELLED, finished_at=timezone.now()
+    ))
+
+
+def mark_stale(job_id):
+    mark_stale_many([job_id])
+
+
+def mark_stale_many(job_ids):
+    from .models import RankRun
+
+    RankRun.objects.filter(job_id__in=job_ids, status__in=RankRun.ACTIVE, stale=False).update(stale=True)
+
+
+def _runs_failed(ids, error):
+    from .models import RankRun
+
+    RankRun.objects.filter(pk__in=ids, status__in=RankRun.ACTIVE).update(
+        status=RankRun.FAILED, error=error.strip().splitlines()[-1][:1000],
+        finished_at=timezone.now(),
+    )
+
+
+@task("rank_run", on_failure=_runs_failed)
+def execute_runs(ids):
+    for run_id in ids:
+        execute(run_id)
+
+
+def execute(run_id):
+    from .models import RankRun
+
+    # Queued, or running again after a failed attempt / crashed worker.
+    claimed = RankRun.objects.filter(pk=run_id, status__in=RankRun.ACTIVE).update(
+        status=RankRun.RUNNING, stage="loading", started_at=timezone.now()
+    )
+    if not claimed:
+        return
+    run = RankRun.objects.select_related("job", "job__owner").get(pk=run_id)
+    live = RankRun.objects.filter(pk=run_id, status=RankRun.RUNNING, stale=False)
+
+    def checkpoint(stage, candidates):
+        if not live.update(stage=stage, candidates=candidates):
+            raise RunStopped
+
+    try:
+        rows, snapshot, _ = ranking.compute(
+            run.job, run.options, client_id=run.job.owner_id, on_stage=checkpoint
+        )
+        with transaction.atomic():
+            if not live.update(status=RankRun.DONE, stage="done", results_count=len(rows),
+                               error="", finished_at=timezone.now()):
+                raise RunStopped
+            ranking.save(run.job, rows, snapshot, input_key=result_key(run.pk))
+    except RunStopped:
+        _supersede_if_stale(run_id)
+        return
+    except Exception as e:
+        # Back to the queue; the task retries with backoff and _runs_failed
+        # marks the run failed once attempts run out.
+        RankRun.objects.filter(pk=run_id, status=RankRun.RUNNING).update(
+            status=RankRun.QUEUED, error=str(e)[:1000]
+        )
+        raise
+
+    log_ranking_run(run.job.owner, run.job, len(rows))
+    log_ranking_results(run.job.owner, run.job, rows, top_n=10)
+
+
+def _supersede_if_stale(run_id):
+    from .models import RankRun
+
+    with transaction.atomic():
+        run = RankRun.objects.select_for_update().get(pk=run_id)
+        if run.status != RankRun.RUNNING or not run.stale:
+            return  # cancelled
+        successor = RankRun.objects.create(job_id=run.job_id, options=run.options)
+        run.status = RankRun.SUPERSEDED
+        run.superseded_by = successor
+        run.finished_at = timezone.now()
+        run.save(update_fields=["status", "superseded_by", "finished_at"])
+        enqueue("rank_run", successor.pk)
+    logger.info("rank run %s superseded by %s", run_id, successor.pk)
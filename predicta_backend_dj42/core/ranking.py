@@ -0,0 +1,154 @@
+# core/ranking.py
+"""
+The ranking pipeline behind POST /api/jobs/{id}/rank/, shared by the
+synchronous view and background rank runs (core/rank_runs.py).
+
+    opts = parse_options(request.data, request.query_params)   # ValueError -> 400
+    rows, snapshot, strategy = compute(job, opts, client_id)   # EmbeddingServiceError -> 503
+    save(job, rows, snapshot)
+    return project(rows, parse_fields(request.query_params))   # ?fields=id,name,score
+
+The view runs compute/save through core/singleflight.py so overlapping
+identical requests share one computation.
+"""
+
+from django.conf import settings
+
+from stage_timing import timed
+
+from .cascade import DEFAULT_WEIGHTS, rank_cascade
+from .dedup import duplicate_clusters, collapse
+from .embedding_client import embedding_client
+from .incremental import build_snapshot, rerank as rerank_incremental
+from .ml_model import ranking_model
+from .models import Candidate, Ranking
+from .precompute import attach, cached_embed
+from .scoring import rank as rank_fn, rank_semantic
+
+MODES = ("tfidf", "sbert", "cascade")
+# Keys of ranking rows (cascade adds the *Score parts, collapse_duplicates adds duplicates).
+ROW_FIELDS = (
+    "id", "name", "email", "score", "tokenCount", "termWeights", "jdTopTerms", "resumeTerms",
+    "skillOverlap", "lexicalScore", "semanticScore", "modelScore", "duplicates",
+)
+
+
+def _flag(data, query, name):
+    return str(data.get(name) or query.get(name) or "").lower() in ("1", "true", "yes")
+
+
+def parse_options(data, query):
+    """Validated, JSON-serializable options from the request body/query."""
+    mode = (data.get("mode") or query.get("mode") or "tfidf").lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'")
+    opts = {
+        "mode": mode,
+        "collapse_duplicates": _flag(data, query, "collapse_duplicates"),
+        "incremental": _flag(data, query, "incremental"),
+    }
+    if mode == "cascade":
+        try:
+            opts["top_m"] = int(data.get("top_m") or settings.RANK_CASCADE_TOP_M)
+        except (TypeError, ValueError):
+            raise ValueError("top_m must be an integer")
+        overrides = data.get("weights") or {}
+        if not isinstance(overrides, dict):
+            raise ValueError("weights must be an object")
+        unknown = sorted(set(overrides) - set(DEFAULT_WEIGHTS))
+        if unknown:
+            raise ValueError(f"Unknown weight(s): {', '.join(unknown)}")
+        for name, value in overrides.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < float("inf"):
+                raise ValueError(f"weights.{name} must be a non-negative number")
+        opts["weights"] = {**settings.RANK_CASCADE_WEIGHTS, **overrides}
+    return opts
+
+
+def parse_fields(query):
+    """?fields=id,name,score: the row keys to return, or None for whole rows."""
+    wanted = [f.strip() for f in (query.get("fields") or "").split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in ROW_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return wanted or None
+
+
+def project(rows, fields):
+    """Rows cut down to `fields` (from parse_fields); stored rankings stay whole."""
+    if not fields:
+        return rows
+    return [{f: r[f] for f in fields if f in r} for r in rows]
+
+
+@timed("rank.load")
+def load_candidates(job):
+    return list(
+        Candidate.objects.filter(job=job).values("id", "name", "email", "resume_text")
+    )
+
+
+@timed("rank.compute")
+def compute(job, opts, client_id=None, on_stage=None, cands=None):
+    """
+    Rank the job's candidates (`cands` from load_candidates(), loaded here
+    if omitted). Returns (rows, idf_snapshot, strategy) with strategy
+    "incremental" or "full". `on_stage(stage, candidates)` is called as
+    the pipeline moves on ("scoring") so background runs can report
+    progress and stop early.
+    """
+    mode, collapse_dups = opts["mode"], opts["collapse_duplicates"]
+
+    if cands is None:
+        cands = load_candidates(job)
+    members = {}
+    if collapse_dups:
+        cands, members = collapse(cands, duplicate_clusters(job))
+    if on_stage:
+        on_stage("scoring", len(cands))
+
+    rows, snapshot = None, None
+    if opts["incremental"] and mode == "tfidf" and not collapse_dups:
+        prev = Ranking.objects.filter(job=job).values("results_json", "idf_snapshot").first()
+        if prev and prev["idf_snapshot"]:
+            res = rerank_incremental(
+                job, prev["idf_snapshot"], prev["results_json"], cands,
+                settings.RANK_IDF_DRIFT_THRESHOLD, prepare=lambda fresh: attach(job, fresh),
+            )
+            if res is not None:
+                rows, snapshot, _ = res
+    strategy = "incremental" if rows is not None else "full"
+
+    # Use background-precomputed tokens/skills/embeddings where current.
+    known = attach(job, cands, with_embeddings=mode != "tfidf") if rows is None else {}
+    embed = cached_embed(
+        lambda texts: embedding_client.embed(texts, client_id=client_id), known
+    )
+    if rows is not None:
+        pass  # merged into the stored ranking above
+    elif mode == "sbert":
+        rows = rank_semantic(
+            job.jd_text, cands, embed, job.remove_stopwords, job.anonymize_pii
+        )
+    elif mode == "cascade":
+        predict = ranking_model.predict_scores if ranking_model.model is not None else None
+        rows = rank_cascade(
+            job.jd_text, cands, embed, predict, top_m=opts["top_m"], weights=opts["weights"],
+            remove_stop=job.remove_stopwords, pii=job.anonymize_pii,
+        )
+    else:
+        rows = rank_fn(job.jd_text, cands, job.remove_stopwords, job.anonymize_pii)
+        if not collapse_dups:
+            snapshot = build_snapshot(job, cands, rows)
+
+    if collapse_dups:
+        for row in rows:
+            row["duplicates"] = members.get(row["id"], [])
+    return rows, snapshot, strategy
+
+
+@timed("rank.save")
+def save(job, rows, snapshot, input_key=""):
+    Ranking.objects.update_or_create(
+        job=job, defaults={"results_json": rows, "idf_snapshot": snapshot, "input_key": input_key}
+    )
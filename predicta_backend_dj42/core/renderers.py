@@ -0,0 +1,33 @@
+# core/renderers.py
+"""
+DRF JSON renderer on orjson. Ranking responses are lists of large dicts
+(termWeights, resumeTerms, jdTopTerms per candidate), where the stdlib
+encoder behind DRF's JSONRenderer spends most of the request.
+
+The output is JSONRenderer's compact UTF-8 JSON: datetimes, Decimals, lazy
+strings and the other types orjson does not handle the way DRF does go
+through DRF's JSONEncoder, U+2028/U+2029 are escaped, and non-string dict
+keys become strings. Only float spelling can differ (0.00001 for 1e-05,
+1e16 for 1e+16; same values). Requests for indented output (the browsable
+API, `Accept: application/json; indent=4`) use JSONRenderer itself.
+"""
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        out = orjson.dumps(data, default=_default, option=OPTIONS)
+        if b"\xe2\x80\xa8" in out or b"\xe2\x80\xa9" in out:
+            out = out.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return out
@@ -1,5 +1,7 @@
 import math, re
 
+from stage_timing import stage, timed
+
 STOP = set("""a an and are as at be by for from has have if in into is it its of on or that the to with you your about across
 after against all also among because been before being between both but can did do does doing down during each else few further he her
 here hers herself him himself his how i into itself just me more most my myself nor not now off once only other our ours ourselves out
@@ -15,6 +17,23 @@ SKILL_ALIASES = {
   "docker":["docker"], "rest api":["rest api","restful api","rest apis","rest services"]
 }
 
+SOFT_SKILL_ALIASES = {
+  "communication":["communication","communicator","communicating"],
+  "teamwork":["teamwork","team player","collaboration","collaborative"],
+  "leadership":["leadership","leading teams","team lead"],
+  "problem solving":["problem solving","problem-solver","analytical thinking"],
+  "time management":["time management","managing time","prioritization"],
+  "adaptability":["adaptability","adaptable","flexible","flexibility"],
+  "creativity":["creativity","creative thinking"], "critical thinking":["critical thinking"],
+  "attention to detail":["attention to detail","detail-oriented","detail oriented"],
+  "decision making":["decision making","decision-making"],
+  "presentation":["presentation skills","presentations","public speaking"],
+  "mentoring":["mentoring","coaching"],
+  "customer focus":["customer focus","customer-centric","client focus","client-facing"]
+}
+
+YEARS_RE = re.compile(r"(\d+)\+?\s*(?:years|yrs)\s+(?:of\s+)?experience", re.I)
+
 def normalize(text, remove_stop=True):
     t = re.sub(r"[\u2018\u2019]", "'", text or "")
     t = re.sub(r'[\u201C\u201D]', '"', t).lower()
@@ -49,6 +68,7 @@ def cosine(a,b):
     na  = math.sqrt(sum(x*x for x in a)); nb = math.sqrt(sum(x*x for x in b))
     return (dot/(na*nb)) if na and nb else 0.0
 
+@timed("skills")
 def extract_skills(text):
     n = re.sub(r"[_/]", " ", (text or "").lower())
     n = re.sub(r"-", " ", n)
@@ -58,42 +78,125 @@ def extract_skills(text):
         if re.search(patt, n): hits.add(canon)
     return sorted(hits)
 
-def rank(jd_text, candidates, remove_stop=True, pii=True):
-    jd_toks0 = normalize(jd_text, remove_stop)
-    jd_toks  = anonymize(jd_toks0) if pii else jd_toks0
-    jd_tf    = tf(jd_toks)
-
-    res_data = []
-    res_tfs  = []
-    for c in candidates:
-        toks0 = normalize(c["resume_text"], remove_stop)
-        toks  = anonymize(toks0) if pii else toks0
-        tff   = tf(toks)
-        res_tfs.append(tff)
-        res_data.append({**c, "tokens": toks, "tf": tff})
-
-    idf   = build_idf([jd_tf, *res_tfs])
-    vocab = list(idf.keys())
-    v_jd  = vectorize(jd_tf, vocab, idf)
-    jd_weights = sorted(
-        [{"term":t, "weight":w} for t,w in zip(vocab, v_jd) if w>0],
-        key=lambda x: x["weight"], reverse=True
+def tokens(text, remove_stop=True, pii=True):
+    toks0 = normalize(text, remove_stop)
+    return anonymize(toks0) if pii else toks0
+
+def candidate_tokens(c, remove_stop=True, pii=True):
+    """Precomputed tokens when the candidate dict carries them (core/precompute.py)."""
+    toks = c.get("tokens")
+    return toks if toks is not None else tokens(c["resume_text"], remove_stop, pii)
+
+def candidate_skills(c):
+    skills = c.get("skills")
+    return skills if skills is not None else extract_skills(c["resume_text"])
+
+def tfidf_vector(tfmap, idf):
+    """Sparse counterpart of vectorize(): only the terms present in the doc."""
+    return {t: c*idf.get(t,1) for t,c in tfmap.items()}
+
+def sparse_cosine(a, b):
+    if len(a) > len(b): a, b = b, a
+    dot = sum(w*b.get(t,0.0) for t,w in a.items())
+    na  = math.sqrt(sum(w*w for w in a.values())); nb = math.sqrt(sum(w*w for w in b.values()))
+    return (dot/(na*nb)) if na and nb else 0.0
+
+def term_weights(vec, order):
+    # Ties keep vocabulary order, as the dense version did.
+    return sorted(
+        [{"term":t, "weight":w} for t,w in vec.items() if w>0],
+        key=lambda x: (-x["weight"], order[x["term"]])
     )
-    jd_top = [x["term"] for x in jd_weights[:30]]
-
-    rows = []
-    for r in res_data:
-        v_r = vectorize(r["tf"], vocab, idf)
-        score = cosine(v_jd, v_r)
-        weights = sorted(
-            [{"term":t, "weight":w} for t,w in zip(vocab, v_r) if w>0],
-            key=lambda x: x["weight"], reverse=True
-        )
-        rows.append({
-            "id": r["id"], "name": r.get("name") or "Unnamed", "email": r.get("email",""),
-            "score": score, "tokenCount": len(r["tokens"]),
-            "termWeights": weights, "jdTopTerms": jd_top, "resumeTerms": list(set(r["tokens"])),
-            "skillOverlap": extract_skills(candidates[res_data.index(r)]["resume_text"])
-        })
-    rows.sort(key=lambda x: x["score"], reverse=True)
+
+def tfidf_scores(jd_toks, res_toks):
+    """
+    Sparse TF-IDF cosine of every resume against the JD.
+
+    Same scores as the dense vectorize()/cosine() path, but O(terms in doc)
+    per resume instead of O(vocabulary).
+    """
+    with stage("tfidf.idf"):
+        jd_tf   = tf(jd_toks)
+        res_tfs = [tf(t) for t in res_toks]
+        idf     = build_idf([jd_tf, *res_tfs])
+    with stage("tfidf.score"):
+        v_jd    = tfidf_vector(jd_tf, idf)
+        vecs    = [tfidf_vector(tff, idf) for tff in res_tfs]
+        scores  = [sparse_cosine(v_jd, v) for v in vecs]
+    return {"idf": idf, "v_jd": v_jd, "vecs": vecs, "scores": scores}
+
+def tfidf_row(c, toks, vec, score, jd_top, order):
+    return counted_row(c, len(toks), set(toks), vec, score, jd_top, order)
+
+def counted_row(c, token_count, terms, vec, score, jd_top, order):
+    """tfidf_row() from the token count and distinct terms (core/batch_ranking.py)."""
+    return {
+        "id": c["id"], "name": c.get("name") or "Unnamed", "email": c.get("email",""),
+        "score": score, "tokenCount": token_count,
+        "termWeights": term_weights(vec, order), "jdTopTerms": jd_top, "resumeTerms": list(terms),
+        "skillOverlap": candidate_skills(c)
+    }
+
+@timed("skills")
+def extract_soft_skills(text):
+    """Same matching rules as extract_skills, over SOFT_SKILL_ALIASES (mirrors app.js)."""
+    n = re.sub(r"[_/]", " ", (text or "").lower())
+    n = re.sub(r"-", " ", n)
+    hits=set()
+    for canon, aliases in SOFT_SKILL_ALIASES.items():
+        patt = r"\b(?:%s)\b" % ("|".join(re.escape(a.replace("-"," ")) for a in aliases))
+        if re.search(patt, n): hits.add(canon)
+    return sorted(hits)
+
+def years_of_experience(text):
+    """Largest 'N years of experience' mentioned, or 0."""
+    return max((int(m.group(1)) for m in YEARS_RE.finditer(text or "")), default=0)
+
+def rank(jd_text, candidates, remove_stop=True, pii=True):
+    with stage("tokenize"):
+        jd_toks  = tokens(jd_text, remove_stop, pii)
+        res_toks = [candidate_tokens(c, remove_stop, pii) for c in candidates]
+
+    s      = tfidf_scores(jd_toks, res_toks)
+    with stage("rows"):
+        order  = {t:i for i,t in enumerate(s["idf"])}
+        jd_top = [x["term"] for x in term_weights(s["v_jd"], order)[:30]]
+
+        rows = [
+            tfidf_row(c, toks, vec, score, jd_top, order)
+            for c, toks, vec, score in zip(candidates, res_toks, s["vecs"], s["scores"])
+        ]
+        rows.sort(key=lambda x: x["score"], reverse=True)
+    return rows
+
+
+def semantic_scores(jd_toks, res_toks, embed):
+    """Dot product of the JD embedding with each resume embedding."""
+    embs = embed([" ".join(jd_toks)] + [" ".join(t) for t in res_toks])
+    v_jd = embs[0]
+    return [sum(x*y for x,y in zip(v_jd, v_r)) for v_r in embs[1:]]
+
+def rank_semantic(jd_text, candidates, embed, remove_stop=True, pii=True):
+    """
+    SBERT ranking: cosine similarity between JD and resume embeddings.
+
+    Texts are normalized/anonymized exactly like the TF-IDF path before they
+    are embedded. `embed(texts)` must return L2-normalized vectors, so the
+    dot product is the cosine.
+    """
+    with stage("tokenize"):
+        jd_toks  = tokens(jd_text, remove_stop, pii)
+        res_toks = [candidate_tokens(c, remove_stop, pii) for c in candidates]
+
+    scores = semantic_scores(jd_toks, res_toks, embed)
+    with stage("rows"):
+        rows = []
+        for c, toks, score in zip(candidates, res_toks, scores):
+            rows.append({
+                "id": c["id"], "name": c.get("name") or "Unnamed", "email": c.get("email",""),
+                "score": score, "tokenCount": len(toks),
+                "termWeights": [], "jdTopTerms": [], "resumeTerms": list(set(toks)),
+                "skillOverlap": candidate_skills(c)
+            })
+        rows.sort(key=lambda x: x["score"], reverse=True)
     return rows
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Job, Candidate, Ranking
+from .models import Job, Candidate, Ranking, RankRun
 
 class UserSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source='first_name', required=False, allow_blank=True)
@@ -25,7 +25,16 @@ class SignupSerializer(serializers.Serializer):
 class JobSerializer(serializers.ModelSerializer):
     class Meta:
         model = Job
-        fields = ["id", "title", "jd_text", "remove_stopwords", "anonymize_pii", "created_at"]
+        fields = ["id", "title", "jd_text", "remove_stopwords", "anonymize_pii",
+                  "source", "external_id", "url", "created_at"]
+        read_only_fields = ["source", "external_id", "url"]
+
+class JobListSerializer(serializers.ModelSerializer):
+    """List rows without jd_text; ask for it with ?fields= (core/listing.py)."""
+    class Meta:
+        model = Job
+        fields = ["id", "title", "remove_stopwords", "anonymize_pii",
+                  "source", "external_id", "url", "created_at"]
 
 class CandidateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -33,7 +42,20 @@ class CandidateSerializer(serializers.ModelSerializer):
         fields = ["id", "job", "name", "email", "resume_text", "uploaded_file", "created_at"]
         read_only_fields = ["uploaded_file", "created_at"]
 
+class CandidateListSerializer(serializers.ModelSerializer):
+    """List rows without resume_text; ask for it with ?fields= (core/listing.py)."""
+    class Meta:
+        model = Candidate
+        fields = ["id", "job", "name", "email", "uploaded_file", "created_at"]
+
 class RankingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ranking
         fields = ["id", "job", "results_json", "created_at"]
+
+class RankRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RankRun
+        fields = ["id", "job", "options", "status", "stage", "candidates", "results_count",
+                  "superseded_by", "error", "created_at", "started_at", "finished_at"]
+        read_only_fields = fields
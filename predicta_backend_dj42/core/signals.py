@@ -0,0 +1,67 @@
+# core/signals.py
+"""
+Side effects of Job/Candidate writes:
+- queue background precompute (core/precompute.py)
+- add outbox events for Mongo replication (core/outbox.py), in the same
+  transaction as the write
+- mark the job's active rank runs stale (core/rank_runs.py)
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import outbox, rank_runs
+from .models import Candidate, Job
+from .tasks import enqueue
+
+# Registers the precompute tasks with the queue.
+from . import precompute  # noqa: F401
+
+
+@receiver(post_save, sender=Candidate, dispatch_uid="precompute_candidate")
+def candidate_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and "resume_text" not in update_fields):
+        return
+    enqueue("precompute_candidate", instance.pk)
+
+
+@receiver(post_save, sender=Job, dispatch_uid="precompute_job")
+def job_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        enqueue("precompute_job", instance.pk)
+
+
+@receiver(post_save, sender=Job, dispatch_uid="outbox_job_saved")
+def job_outbox(sender, instance, raw=False, **kwargs):
+    if not raw:
+        outbox.record("job", instance)
+
+
+@receiver(post_save, sender=Candidate, dispatch_uid="outbox_candidate_saved")
+def candidate_outbox(sender, instance, raw=False, **kwargs):
+    if not raw:
+        outbox.record("candidate", instance)
+
+
+@receiver(post_delete, sender=Job, dispatch_uid="outbox_job_deleted")
+def job_deleted(sender, instance, **kwargs):
+    outbox.record("job", instance, op="delete")
+
+
+@receiver(post_delete, sender=Candidate, dispatch_uid="outbox_candidate_deleted")
+def candidate_deleted(sender, instance, **kwargs):
+    outbox.record("candidate", instance, op="delete")
+
+
+@receiver(post_save, sender=Job, dispatch_uid="rank_runs_job_saved")
+@receiver(post_delete, sender=Job, dispatch_uid="rank_runs_job_deleted")
+def job_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rank_runs.mark_stale(instance.pk)
+
+
+@receiver(post_save, sender=Candidate, dispatch_uid="rank_runs_candidate_saved")
+@receiver(post_delete, sender=Candidate, dispatch_uid="rank_runs_candidate_deleted")
+def candidate_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rank_runs.mark_stale(instance.job_id)
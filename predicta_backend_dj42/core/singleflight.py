@@ -0,0 +1,107 @@
+# core/singleflight.py
+"""
+Single-flight for synchronous rank requests, across processes.
+
+Identical requests (same job, options, JD and candidates; see input_key())
+share one computation. A request whose input is already the stored
+Ranking's (tagged with the key) answers with those rows. Otherwise the
+first one inserts a RankLock row for the key, computes and writes the
+Ranking once; the others find the lock, poll until it is released and
+answer with the stored rows. A follower waits at most
+RANK_SINGLEFLIGHT_WAIT seconds, well under a proxy timeout, then raises
+Pending (the view answers 202; a retry finds the stored rows). If the
+leader fails, a waiting request takes over; a lock left by a crashed
+process is taken over once it expires (RANK_SINGLEFLIGHT_LEASE). The
+unique key column is the lock, so this works with any number of WSGI
+workers sharing the database.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .precompute import fingerprint
+
+LEADER, FOLLOWER = "leader", "follower"
+
+
+class Pending(Exception):
+    """The identical computation of another request is still running."""
+
+
+def input_key(job, opts, cands):
+    """Hash of everything a ranking depends on."""
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        "job": job.pk,
+        "jd": fingerprint(job.jd_text, job.remove_stopwords, job.anonymize_pii),
+        "options": opts,
+    }, sort_keys=True).encode())
+    for c in sorted(cands, key=lambda c: c["id"]):
+        h.update(f"\0{c['id']}\0{c['name']}\0{c['email']}\0".encode())
+        h.update(hashlib.sha1(c["resume_text"].encode()).digest())
+    return h.hexdigest()
+
+
+def _acquire(job, key):
+    from .models import RankLock
+
+    now = timezone.now()
+    RankLock.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            RankLock.objects.create(
+                key=key, job=job,
+                expires_at=now + timedelta(seconds=settings.RANK_SINGLEFLIGHT_LEASE),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def _stored(job, key):
+    from .models import Ranking
+
+    return (
+        Ranking.objects.filter(job=job, input_key=key)
+        .values_list("results_json", flat=True).first()
+    )
+
+
+def run(job, key, compute, save):
+    """
+    Returns (rows, strategy, role). The leader calls `compute()` ->
+    (rows, snapshot, strategy) and `save(rows, snapshot)`; followers get
+    the leader's (or the already stored) rows with strategy "shared".
+    Raises Pending when the leader outlasts RANK_SINGLEFLIGHT_WAIT.
+    """
+    from .models import RankLock
+
+    deadline = time.monotonic() + settings.RANK_SINGLEFLIGHT_WAIT
+    while True:
+        rows = _stored(job, key)
+        if rows is not None:
+            return rows, "shared", FOLLOWER
+        if _acquire(job, key):
+            try:
+                # A leader may have saved and released since the check above.
+                rows = _stored(job, key)
+                if rows is not None:
+                    return rows, "shared", FOLLOWER
+                rows, snapshot, strategy = compute()
+                save(rows, snapshot)
+            finally:
+                RankLock.objects.filter(key=key).delete()
+            return rows, strategy, LEADER
+
+        while RankLock.objects.filter(key=key, expires_at__gt=timezone.now()).exists():
+            if time.monotonic() >= deadline:
+                raise Pending
+            time.sleep(settings.RANK_SINGLEFLIGHT_POLL)
+        # Released: the rows are stored, or the leader failed / its lease
+        # ran out and the loop tries to take over.
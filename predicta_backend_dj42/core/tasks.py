@@ -0,0 +1,152 @@
+# core/tasks.py
+"""
+Local task queue backed by the Django database (no external broker).
+
+    enqueue("precompute_candidate", cand.id)     # from signals / views
+    python manage.py run_tasks                    # worker process
+
+Tasks are rows in core.Task. A worker claims a batch of due rows with a
+compare-and-set update, groups them by name and calls the registered
+function once per group with the list of object ids. If a batch raises,
+each id is retried on its own so one bad object cannot sink its
+neighbours. Failures back off exponentially; after TASKS_MAX_ATTEMPTS the
+row is marked failed and the task's on_failure hook runs. Finished rows
+are deleted. Rows stuck in "running" longer than TASKS_LEASE_SECONDS
+(crashed worker) are picked up again.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name, on_failure=None):
+    """
+    Register `fn(object_ids)` under `name`. `on_failure(object_ids, error)`
+    runs once retries are exhausted.
+    """
+    def deco(fn):
+        TASKS[name] = (fn, on_failure)
+        return fn
+    return deco
+
+
+def enqueue(name, object_id, delay=0):
+    enqueue_many(name, [object_id], delay)
+
+
+def enqueue_many(name, object_ids, delay=0):
+    """
+    Schedule `name` for each id once the current transaction commits. Ids
+    that already have a pending row are not queued twice.
+    """
+    ids = list(dict.fromkeys(object_ids))
+    if ids:
+        transaction.on_commit(lambda: _insert(name, ids, delay))
+
+
+def _insert(name, ids, delay):
+    from .models import Task
+
+    queued = set(
+        Task.objects.filter(name=name, object_id__in=ids, status=Task.PENDING)
+        .values_list("object_id", flat=True)
+    )
+    run_after = timezone.now() + timedelta(seconds=delay)
+    Task.objects.bulk_create([
+        Task(name=name, object_id=i, run_after=run_after)
+        for i in ids if i not in queued
+    ], batch_size=500)
+
+
+def claim(limit):
+    """Atomically mark up to `limit` due tasks as running and return them."""
+    from .models import Task
+
+    now = timezone.now()
+    lease = now - timedelta(seconds=settings.TASKS_LEASE_SECONDS)
+    Task.objects.filter(status=Task.RUNNING, updated_at__lt=lease).update(
+        status=Task.PENDING, updated_at=now
+    )
+
+    due = list(
+        Task.objects.filter(status=Task.PENDING, run_after__lte=now)
+        .order_by("run_after", "id").values_list("id", flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in due
+        if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, attempts=F("attempts") + 1, updated_at=now
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def _finish(tasks):
+    from .models import Task
+    Task.objects.filter(pk__in=[t.pk for t in tasks]).delete()
+
+
+def _fail(t, error):
+    from .models import Task
+
+    fn, on_failure = TASKS.get(t.name, (None, None))
+    if t.attempts >= settings.TASKS_MAX_ATTEMPTS or fn is None:
+        t.status = Task.FAILED
+        logger.warning("task %s(%s) failed after %d attempts: %s",
+                       t.name, t.object_id, t.attempts, error.splitlines()[-1])
+        if on_failure is not None:
+            on_failure([t.object_id], error)
+    else:
+        t.status = Task.PENDING
+        delay = settings.TASKS_RETRY_BACKOFF * (2 ** (t.attempts - 1))
+        t.run_after = timezone.now() + timedelta(seconds=delay)
+    t.last_error = error[-4000:]
+    t.save(update_fields=["status", "run_after", "last_error", "updated_at"])
+
+
+def run_pending(limit=None):
+    """Run one batch of due tasks. Returns (succeeded, failed) counts."""
+    tasks = claim(limit or settings.TASKS_BATCH_SIZE)
+    groups = {}
+    for t in tasks:
+        groups.setdefault(t.name, []).append(t)
+
+    ok = failed = 0
+    for name, group in groups.items():
+        fn, _ = TASKS.get(name, (None, None))
+        if fn is None:
+            for t in group:
+                _fail(t, f"Unknown task '{name}'")
+            failed += len(group)
+            continue
+        try:
+            fn([t.object_id for t in group])
+        except Exception:
+            if len(group) == 1:
+                _fail(group[0], traceback.format_exc())
+                failed += 1
+                continue
+            # Isolate the failing ids.
+            for t in group:
+                try:
+                    fn([t.object_id])
+                except Exception:
+                    _fail(t, traceback.format_exc())
+                    failed += 1
+                else:
+                    _finish([t])
+                    ok += 1
+        else:
+            _finish(group)
+            ok += len(group)
+    return ok, failed
@@ -0,0 +1,81 @@
+# core/term_matrix.py
+"""
+Interned term counts for the vectorized TF-IDF paths (core/fairness.py,
+core/batch_ranking.py).
+
+term_matrix() counts each token list once and gives every distinct term
+an integer id, returning the counts as COO arrays (doc, term, count), one
+entry per (doc, term). Passing the same `index` to several calls puts
+their documents in one term space, e.g. JDs and resumes. idf() is
+scoring.build_idf() over such arrays, so scores built on them match
+scoring.tfidf_scores().
+
+anonymize() maps each token on its own, so anonymized() applies it once
+per distinct term of a raw (pii=False) matrix instead of once per token,
+and remaps only the entries it rewrites.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+from .scoring import anonymize
+
+
+def term_matrix(docs, index=None):
+    """
+    Count and intern the terms of token lists `docs`. `index` (term -> id)
+    is extended in place; new terms get the next ids in order of first
+    appearance. Returns (index, doc, term, count).
+    """
+    index = {} if index is None else index
+    doc, term, count = [], [], []
+    for i, toks in enumerate(docs):
+        tfmap = Counter(toks)
+        doc.extend([i] * len(tfmap))
+        term.extend(index.setdefault(t, len(index)) for t in tfmap)
+        count.extend(tfmap.values())
+    return (index, np.array(doc, dtype=np.int64), np.array(term, dtype=np.int64),
+            np.array(count, dtype=np.float64))
+
+
+def idf(terms, n_docs, width):
+    """Smoothed IDF per term id from the `term` arrays of all documents."""
+    df = np.zeros(width, dtype=np.int64)
+    for t in terms:
+        df += np.bincount(t, minlength=width)
+    return np.log((n_docs + 1) / (df + 1)) + 1
+
+
+def anonymized(vocab, doc, term, count):
+    """
+    The matrix of anonymize()d tokens, from the raw one. Returns
+    (vocab, doc, term, count, mapping); mapping[raw term id] is the id of
+    its anonymized term in the new vocab (placeholders are appended).
+    """
+    index = {t: i for i, t in enumerate(vocab)}
+    mapping = np.arange(len(vocab), dtype=np.int64)
+    out_vocab = list(vocab)
+    for i, (old, new) in enumerate(zip(vocab, anonymize(vocab))):
+        if new != old:
+            if new not in index:
+                index[new] = len(out_vocab)
+                out_vocab.append(new)
+            mapping[i] = index[new]
+    vocab = out_vocab
+    changed = mapping[term] != term
+    if not changed.any():
+        return vocab, doc, term, count, mapping
+
+    # Several raw terms of a document may collapse into one placeholder.
+    width = len(vocab)
+    keys, inverse = np.unique(doc[changed] * width + mapping[term[changed]], return_inverse=True)
+    merged = np.bincount(inverse, weights=count[changed])
+    keep = ~changed
+    return (
+        vocab,
+        np.concatenate([doc[keep], keys // width]),
+        np.concatenate([term[keep], keys % width]),
+        np.concatenate([count[keep], merged]),
+        mapping,
+    )
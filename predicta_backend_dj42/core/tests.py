@@ -1,10 +1,70 @@
-from django.test import TestCase
+import asyncio
+import gzip as gzip_mod
+import hashlib
+import io
+import json
+import math
+import os
+import pstats as pstats_mod
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as dt, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import brotli
+import httpx
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from pymongo.errors import ServerSelectionTimeoutError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
-from .models import Job
+from rest_framework_simplejwt.tokens import RefreshToken
+
+try:
+    import mongomock
+except ImportError:  # optional test dependency
+    mongomock = None
+
+import request_profiler
+import stage_timing
+
+from . import (
+    analytics, async_views, batch_ranking, dedup, fairness, mongo_storage, outbox, parsers,
+    rank_runs, ranking, scoring, singleflight, tasks,
+)
+from .analytics_writer import AnalyticsWriter
+from .embedding_client import EmbeddingClient, EmbeddingServiceError
+from .incremental import rerank as rerank_incremental
+from .job_feed import ingest_feed
+from .linkedin_client import JobProviderError, LinkedInClient
+from .models import (
+    Candidate, CandidateArtifact, CandidateBand, Job, JobArtifact, OutboxEvent, RankLock, RankRun,
+    Ranking, Task,
+)
+from .renderers import ORJSONRenderer
+from .scoring import rank as rank_tfidf
+from .term_matrix import anonymized, term_matrix
+
 
 class SmokeTests(TestCase):
     def setUp(self):
+        patcher = mock.patch("core.analytics._write")
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.user = User.objects.create_user(username="u@example.com", email="u@example.com", password="pw")
         self.client = APIClient()
         r = self.client.post("/api/auth/login", {"username":"u@example.com","password":"pw"})
@@ -20,3 +80,1660 @@ class SmokeTests(TestCase):
         job_id = r.json()["id"]
         r = self.client.get(f"/api/jobs/{job_id}")
         self.assertEqual(r.status_code, 200)
+
+
+# ---------- Embedding service stub ----------
+
+def stub_vector(text, dim=32):
+    """Deterministic bag-of-words hashing vector, L2-normalized."""
+    v = [0.0] * dim
+    for tok in text.split():
+        v[int(hashlib.md5(tok.encode()).hexdigest(), 16) % dim] += 1.0
+    n = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / n for x in v]
+
+
+class StubEmbeddingServer:
+    """Local stand-in for sbert_server.py /embed (HTTP/1.1 keep-alive)."""
+
+    def __init__(self, fail_first=0, fail_status=503):
+        self.requests = []        # (client port, number of texts, headers)
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                texts = body["texts"]
+                stub.requests.append((self.client_address[1], len(texts), dict(self.headers)))
+                if stub.fail_first > 0:
+                    stub.fail_first -= 1
+                    self._send(stub.fail_status, {"detail": "busy"}, {"Retry-After": "0"})
+                    return
+                self._send(200, {
+                    "embeddings": [stub_vector(t) for t in texts],
+                    "dim": 32, "model": "stub", "backend": "stub",
+                })
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class EmbeddingClientTests(TestCase):
+    def test_chunks_share_one_keepalive_connection(self):
+        with StubEmbeddingServer() as srv:
+            client = EmbeddingClient(base_url=srv.url, batch_size=4)
+            vecs = client.embed([f"text {i}" for i in range(10)], client_id=7)
+        self.assertEqual(len(vecs), 10)
+        self.assertEqual(vecs[3], stub_vector("text 3"))
+        self.assertEqual([n for _, n, _ in srv.requests], [4, 4, 2])
+        self.assertEqual(len({port for port, _, _ in srv.requests}), 1)
+        self.assertEqual(srv.requests[0][2]["X-Client-Id"], "7")
+
+    def test_retries_load_shedding_then_succeeds(self):
+        with StubEmbeddingServer(fail_first=2) as srv:
+            client = EmbeddingClient(base_url=srv.url, max_retries=3, backoff=0.001)
+            vecs = client.embed(["a b c"])
+        self.assertEqual(len(srv.requests), 3)
+        self.assertEqual(vecs[0], stub_vector("a b c"))
+
+    def test_gives_up_after_max_retries(self):
+        with StubEmbeddingServer(fail_first=10) as srv:
+            client = EmbeddingClient(base_url=srv.url, max_retries=1, backoff=0.001)
+            with self.assertRaises(EmbeddingServiceError):
+                client.embed(["a"])
+        self.assertEqual(len(srv.requests), 2)
+
+    def test_client_errors_are_not_retried(self):
+        with StubEmbeddingServer(fail_first=1, fail_status=400) as srv:
+            client = EmbeddingClient(base_url=srv.url, max_retries=3, backoff=0.001)
+            with self.assertRaises(EmbeddingServiceError):
+                client.embed(["a"])
+        self.assertEqual(len(srv.requests), 1)
+
+
+@mock.patch("core.views.log_ranking_results")
+@mock.patch("core.views.log_ranking_run")
+class RankSbertModeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="r@example.com", email="r@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django rest api developer")
+        Candidate.objects.create(job=self.job, name="Match", resume_text="python django rest api developer")
+        Candidate.objects.create(job=self.job, name="Other", resume_text="java spring cooking gardening")
+
+    def test_sbert_mode_ranks_via_embedding_service(self, *_):
+        with StubEmbeddingServer() as srv:
+            client = EmbeddingClient(base_url=srv.url)
+            with mock.patch("core.ranking.embedding_client", client):
+                r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"mode": "sbert"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        rows = r.json()
+        self.assertEqual([row["name"] for row in rows], ["Match", "Other"])
+        self.assertAlmostEqual(rows[0]["score"], 1.0, places=6)
+        self.assertEqual(srv.requests[0][1], 3)  # JD + 2 resumes in one batch
+        self.assertTrue(Ranking.objects.filter(job=self.job).exists())
+
+    def test_sbert_mode_unavailable_returns_503(self, *_):
+        client = EmbeddingClient(base_url="http://127.0.0.1:9", max_retries=0, connect_timeout=0.2)
+        with mock.patch("core.ranking.embedding_client", client):
+            r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"mode": "sbert"}, format="json")
+        self.assertEqual(r.status_code, 503)
+
+    def test_unknown_mode_is_rejected(self, *_):
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"mode": "magic"}, format="json")
+        self.assertEqual(r.status_code, 400)
+
+
+class CascadeRankingTests(TestCase):
+    def setUp(self):
+        self.cands = [
+            {"id": 1, "name": "A", "email": "", "resume_text": "python django rest api developer aws"},
+            {"id": 2, "name": "B", "email": "", "resume_text": "python developer"},
+            {"id": 3, "name": "C", "email": "", "resume_text": "chef cooking pastry"},
+            {"id": 4, "name": "D", "email": "", "resume_text": "gardening landscaping"},
+        ]
+        self.jd = "python django rest api developer"
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return [stub_vector(t) for t in texts]
+
+    def test_only_top_m_reach_semantic_and_model_stages(self):
+        from .cascade import rank_cascade
+        seen = []
+        predict = lambda feats: seen.extend(feats) or [1.0] * len(feats)
+        rows = rank_cascade(self.jd, self.cands, self.embed, predict, top_m=2)
+        self.assertEqual([r["id"] for r in rows], [1, 2])
+        self.assertEqual(len(self.embedded), 3)  # JD + 2 survivors
+        self.assertEqual(len(seen), 2)
+        self.assertEqual(seen[0]["hard_skill_matches"], len(rows[0]["skillOverlap"]))
+
+    def test_full_pool_matches_lexical_order_when_only_lexical_weight(self):
+        from .cascade import rank_cascade
+        from .scoring import rank
+        rows = rank_cascade(self.jd, self.cands, self.embed, None, top_m=10,
+                            weights={"lexical": 1, "semantic": 0, "model": 0})
+        self.assertEqual([r["id"] for r in rows], [r["id"] for r in rank(self.jd, self.cands)])
+        self.assertEqual(self.embedded, [])  # semantic stage skipped at weight 0
+
+    def test_invalid_weights_are_rejected(self):
+        from .ranking import parse_options
+        for weights in ({"lexical": "abc"}, {"lexical": -1}, {"lexical": True}, {"recency": 1}, [1]):
+            with self.assertRaises(ValueError):
+                parse_options({"mode": "cascade", "weights": weights}, {})
+        self.assertEqual(parse_options({"mode": "cascade", "weights": {"model": 0}}, {})["weights"]["model"], 0)
+
+    def test_weights_renormalize_without_model(self):
+        from .cascade import blend_weights
+        w = blend_weights({"lexical": 1, "semantic": 1, "model": 2}, has_model=False)
+        self.assertEqual(w, {"lexical": 0.5, "semantic": 0.5, "model": 0.0})
+
+
+def make_zip(named_blobs):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, blob in named_blobs.items():
+            zf.writestr(name, blob)
+    return buf.getvalue()
+
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "parsed_text": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "parsed-text-tests",
+    },
+}
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), INGEST_WORKERS=2, INGEST_FILE_TIMEOUT=10,
+                   CACHES=LOCMEM_CACHES)
+@mock.patch("core.analytics.log_resumes_uploaded")
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="b@example.com", email="b@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python")
+
+    def test_zip_batch_is_parsed_and_bulk_persisted(self, log_many):
+        archive = make_zip({
+            "cvs/jane_doe.txt": b"Jane Doe jane@example.com python django",
+            "cvs/john_smith.txt": b"John python",
+            "cvs/broken.docx": b"not really a docx",
+            "cvs/photo.png": b"\x89PNG",
+            "__MACOSX/._jane_doe.txt": b"junk",
+        })
+        r = self.client.post("/api/candidates/bulk/", {
+            "job": self.job.id,
+            "archive": SimpleUploadedFile("batch.zip", archive, content_type="application/zip"),
+        }, format="multipart")
+        self.assertEqual(r.status_code, 201, r.content)
+        body = r.json()
+        self.assertEqual((body["created"], body["failed"]), (2, 2))
+        by_file = {x["file"]: x for x in body["results"]}
+        self.assertFalse(by_file["photo.png"]["ok"])
+        self.assertIn("DOCX", by_file["broken.docx"]["error"])
+
+        jane = Candidate.objects.get(pk=by_file["jane_doe.txt"]["candidate_id"])
+        self.assertEqual((jane.name, jane.email), ("jane doe", "jane@example.com"))
+        self.assertTrue(jane.uploaded_file.name.startswith("resumes/"))
+        self.assertEqual(OutboxEvent.objects.filter(aggregate="candidate").count(), 2)
+        self.assertEqual(len(log_many.call_args[0][2]), 2)
+
+    def test_multipart_files_and_wrong_job(self, *_):
+        files = [SimpleUploadedFile("a.txt", b"alpha python"), SimpleUploadedFile("b.txt", b"beta")]
+        r = self.client.post("/api/candidates/bulk/", {"job": self.job.id, "files": files}, format="multipart")
+        self.assertEqual(r.json()["created"], 2)
+        other = User.objects.create_user(username="o@example.com", password="pw")
+        foreign = Job.objects.create(owner=other, jd_text="x")
+        r = self.client.post("/api/candidates/bulk/", {"job": foreign.id, "files": files}, format="multipart")
+        self.assertEqual(r.status_code, 404)
+
+    def test_slow_file_times_out_individually(self, *_):
+        from .ingest import parse_one
+        from .parsers import ParseLimits
+        slow = lambda data, name, limits: time.sleep(5)
+        with mock.patch("core.ingest.extract_text", slow):
+            name, text, error = parse_one(("slow.pdf", b"", ParseLimits(max_seconds=0.2)))
+        self.assertIsNone(text)
+        self.assertIn("exceeded", error)
+
+
+def make_docx():
+    from docx import Document
+    doc = Document()
+    doc.add_paragraph("Jane Doe")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Skills"
+    table.cell(0, 1).text = "Python, Django"
+    table.cell(1, 0).text = "Years"
+    table.cell(1, 1).text = "5"
+    table.cell(1, 1).add_table(rows=1, cols=1).cell(0, 0).text = "nested AWS"
+    merged = doc.add_table(rows=1, cols=2)
+    merged.cell(0, 0).merge(merged.cell(0, 1)).text = "Merged once"
+    doc.add_paragraph("After table")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def make_pdf(pages):
+    """Minimal uncompressed PDF, one line of Helvetica text per page."""
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = b"BT /F1 12 Tf 72 720 Td (%s) Tj ET" % text.encode()
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objs))
+        kids.append(b"%d 0 R" % len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out, offsets = io.BytesIO(), []
+    out.write(b"%PDF-1.4\n")
+    for n, body in enumerate(objs, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (n, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objs) + 1, xref))
+    return out.getvalue()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PARSER_MAX_PAGES=2, PARSER_MAX_SECONDS=5)
+class ParserTests(TestCase):
+    def setUp(self):
+        caches["parsed_text"].clear()
+
+    def test_docx_includes_tables_in_document_order(self):
+        text = parsers.extract_text(make_docx(), "cv.docx")
+        self.assertEqual(text.splitlines(), [
+            "Jane Doe", "Skills | Python, Django", "Years | 5 nested AWS",
+            "Merged once", "After table",
+        ])
+
+    def test_pdf_is_parsed_in_memory_and_page_capped(self):
+        pdf = make_pdf(["page one python", "page two django", "page three aws"])
+        with mock.patch("tempfile.NamedTemporaryFile") as tmp:
+            text = parsers.extract_text(pdf, "cv.pdf", parsers.default_limits())
+        tmp.assert_not_called()
+        self.assertIn("page two django", text)
+        self.assertNotIn("page three", text)
+
+    def test_cached_extract_skips_reparse(self):
+        data = make_docx()
+        first = parsers.extract_text_cached(data, "a.docx")
+        with mock.patch.dict(parsers.PARSERS, {"docx": mock.Mock(side_effect=AssertionError)}):
+            self.assertEqual(parsers.extract_text_cached(data, "renamed.docx"), first)
+
+    def test_unsupported_and_corrupt_files_raise_parse_error(self):
+        with self.assertRaises(parsers.ParseError):
+            parsers.extract_text(b"\x89PNG", "photo.png")
+        with self.assertRaises(parsers.ParseError):
+            parsers.extract_text(b"%PDF-garbage", "cv.pdf")
+
+
+RESUME = (
+    "Jane Doe jane@example.com Senior Python developer with 6 years of experience building "
+    "Django REST APIs on AWS. Led migration of a monolith to Docker services, mentored four "
+    "engineers, introduced pandas reporting and automated CI pipelines for three product teams."
+)
+
+
+@mock.patch("core.views.log_resume_uploaded")
+class DedupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="d@example.com", email="d@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django aws developer")
+
+    def add(self, text, name=""):
+        r = self.client.post("/api/candidates/", {"job": self.job.id, "name": name, "resume_text": text},
+                             format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        return r.json()["id"]
+
+    def test_signature_similarity_tracks_jaccard(self, *_):
+        near = RESUME.replace("four", "five").replace("Jane", "J.")
+        self.assertGreater(dedup.similarity(dedup.signature(RESUME), dedup.signature(near)), 0.6)
+        other = "Chef with pastry and catering background, managed kitchen staff and suppliers."
+        self.assertLess(dedup.similarity(dedup.signature(RESUME), dedup.signature(other)), 0.1)
+        self.assertEqual(dedup.signature(""), [])
+
+    def test_upload_indexes_bands_and_clusters_copies(self, *_):
+        a = self.add(RESUME, "pdf copy")
+        b = self.add(RESUME.replace("Jane Doe", "Jane  Doe\n"), "docx copy")
+        self.add("Chef with pastry and catering background, managed kitchen staff.", "chef")
+        self.assertEqual(CandidateBand.objects.filter(candidate_id=a).count(), settings.DEDUP_BANDS)
+        self.assertEqual(dedup.duplicate_clusters(self.job), [[a, b]])
+
+        r = self.client.get(f"/api/jobs/{self.job.id}/duplicates/")
+        body = r.json()
+        self.assertEqual(body["count"], 1)
+        self.assertEqual(body["clusters"][0]["representative"], b)
+        self.assertEqual([x["similarity"] for x in body["clusters"][0]["candidates"]], [1.0, 1.0])
+
+        # Editing the resume re-indexes it out of the cluster.
+        r = self.client.patch(f"/api/candidates/{a}/", {"resume_text": "Gardener and landscaper."}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(dedup.duplicate_clusters(self.job), [])
+
+    @mock.patch("core.views.log_ranking_results")
+    @mock.patch("core.views.log_ranking_run")
+    def test_rank_collapses_duplicates(self, *_):
+        a = self.add(RESUME, "old")
+        b = self.add(RESUME, "new")
+        c = self.add("Python developer, Flask and SQL.", "other")
+        # Rows saved before signatures existed are indexed lazily.
+        Candidate.objects.filter(pk=a).update(minhash=None)
+        CandidateBand.objects.filter(candidate_id=a).delete()
+
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"collapse_duplicates": True}, format="json")
+        rows = r.json()
+        self.assertEqual(sorted(row["id"] for row in rows), [b, c])
+        self.assertEqual({row["id"]: row["duplicates"] for row in rows}, {b: [a], c: []})
+
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {}, format="json")
+        self.assertEqual(len(r.json()), 3)
+
+
+class FakeEmbedder:
+    def __init__(self, fail=False):
+        self.fail, self.calls = fail, []
+
+    def embed(self, texts, client_id=None):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise EmbeddingServiceError("down")
+        return [stub_vector(t) for t in texts]
+
+
+@mock.patch("core.views.log_ranking_results")
+@mock.patch("core.views.log_ranking_run")
+class PrecomputeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="p@example.com", email="p@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django rest api developer")
+            self.a = Candidate.objects.create(job=self.job, name="A", resume_text=(
+                "python django rest api developer, great communication, 6 years of experience"))
+            self.b = Candidate.objects.create(job=self.job, name="B", resume_text="java spring cooking")
+
+    def drain(self, embedder):
+        with mock.patch("core.precompute.embedding_client", embedder):
+            while tasks.run_pending() != (0, 0):
+                pass
+
+    def test_saves_queue_tasks_and_worker_builds_artifacts(self, *_):
+        self.assertEqual(Task.objects.filter(name="precompute_candidate").count(), 2)
+        embedder = FakeEmbedder()
+        out = io.StringIO()
+        with mock.patch("core.precompute.embedding_client", embedder):
+            call_command("run_tasks", once=True, stdout=out)
+        self.assertIn("stopped: 3 ok, 0 failed", out.getvalue())
+        self.assertFalse(Task.objects.exists())
+        art = CandidateArtifact.objects.get(candidate=self.a)
+        self.assertEqual(art.status, "ready")
+        self.assertEqual((art.skills, art.soft_skills, art.years),
+                         (["django", "python", "rest api"], ["communication"], 6))
+        self.assertEqual(art.embedding, stub_vector(" ".join(art.tokens)))
+        self.assertEqual(sorted(map(len, embedder.calls)), [1, 2])  # JD, then both candidates in one call
+        self.assertEqual(JobArtifact.objects.get(job=self.job).status, "ready")
+
+    def test_rank_uses_artifacts_and_matches_inline(self, *_):
+        inline = self.client.post(f"/api/jobs/{self.job.id}/rank/", {}, format="json").json()
+        self.drain(FakeEmbedder())
+        with mock.patch("core.scoring.extract_skills") as skills:
+            pre = self.client.post(f"/api/jobs/{self.job.id}/rank/", {}, format="json").json()
+        skills.assert_not_called()
+        self.assertEqual(pre, inline)
+
+        live = FakeEmbedder()
+        with mock.patch("core.ranking.embedding_client", live):
+            r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"mode": "sbert"}, format="json")
+        self.assertEqual([row["name"] for row in r.json()], ["A", "B"])
+        self.assertEqual(live.calls, [])  # JD and resumes all precomputed
+
+    def test_stale_artifact_falls_back_to_inline(self, *_):
+        self.drain(FakeEmbedder())
+        Candidate.objects.filter(pk=self.b.pk).update(resume_text="Python Django REST developer")
+        live = FakeEmbedder()
+        with mock.patch("core.ranking.embedding_client", live):
+            r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"mode": "sbert"}, format="json")
+        self.assertEqual(live.calls, [["python django rest developer"]])  # only the edited resume
+        row = next(x for x in r.json() if x["name"] == "B")
+        self.assertEqual(row["skillOverlap"], ["django", "python"])
+
+    def test_failures_retry_with_backoff_then_mark_failed(self, *_):
+        with self.settings(TASKS_MAX_ATTEMPTS=2):
+            with mock.patch("core.precompute.embedding_client", FakeEmbedder(fail=True)):
+                self.assertEqual(tasks.run_pending(), (0, 3))
+                t = Task.objects.get(name="precompute_candidate", object_id=self.a.pk)
+                self.assertEqual((t.status, t.attempts), ("pending", 1))
+                self.assertGreater(t.run_after, timezone.now())
+                self.assertIn("down", t.last_error)
+
+                Task.objects.update(run_after=timezone.now() - timedelta(seconds=1))
+                tasks.run_pending()
+        art = CandidateArtifact.objects.get(candidate=self.a)
+        self.assertEqual((art.status, art.error), ("failed", "core.embedding_client.EmbeddingServiceError: down"))
+        self.assertIn("django", art.tokens)  # features survive a failed embedding
+        self.assertEqual(Task.objects.filter(status="failed").count(), 3)
+
+
+class FakeMongo:
+    """Just enough of a pymongo Database for the analytics writer."""
+
+    def __init__(self):
+        self.docs, self.calls, self.down = {}, [], False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __getitem__(self, name):
+        db = self
+
+        class Collection:
+            def insert_many(self, docs, ordered=True):
+                db.gate.wait(5)
+                if db.down:
+                    raise ServerSelectionTimeoutError("mongo down")
+                db.calls.append((name, len(docs)))
+                for d in docs:
+                    d.setdefault("_id", id(d))
+                    db.docs.setdefault(name, {})[str(d["_id"])] = d
+        return Collection()
+
+
+class AnalyticsWriterTests(TestCase):
+    def setUp(self):
+        self.mongo = FakeMongo()
+        self.spool = tempfile.mkdtemp()
+
+    def writer(self, **kw):
+        opts = dict(batch_size=10, flush_interval=0.05, spool_dir=self.spool, retry_interval=0)
+        opts.update(kw)
+        w = AnalyticsWriter(lambda: self.mongo, **opts)
+        self.addCleanup(w.close)
+        return w
+
+    def test_batches_by_size_with_insert_many(self):
+        w = self.writer()
+        for i in range(25):
+            w.submit("matching_runs" if i % 5 else "exports", {"i": i})
+        self.assertTrue(w.flush())
+        self.assertEqual(len(self.mongo.docs["matching_runs"]) + len(self.mongo.docs["exports"]), 25)
+        self.assertLessEqual(len(self.mongo.calls), 6)  # <= 2 collections x 3 batches
+        snap = w.snapshot()
+        self.assertEqual((snap["queued"], snap["flushed"], snap["dropped"]), (25, 25, 0))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        self.mongo.gate.clear()  # the writer thread stalls inside insert_many
+        w = self.writer(max_queue=3, batch_size=1)
+        t0 = time.monotonic()
+        accepted = sum(w.submit("exports", {"i": i}) for i in range(20))
+        self.assertLess(time.monotonic() - t0, 1.0)
+        self.assertLessEqual(accepted, 4)
+        self.assertEqual(w.snapshot()["dropped"], 20 - accepted)
+        self.mongo.gate.set()
+        w.flush()
+
+    def test_spools_while_down_and_replays_once_back(self):
+        self.mongo.down = True
+        w = self.writer()
+        w.submit_many("resume_uploads", [{"i": i} for i in range(5)])
+        w.flush()
+        self.assertEqual(w.snapshot()["spooled"], 5)
+        self.assertTrue(os.listdir(self.spool))
+
+        self.mongo.down = False
+        w.submit("resume_uploads", {"i": 5})
+        w.flush()
+        self.assertEqual(len(self.mongo.docs["resume_uploads"]), 6)
+        self.assertEqual(w.snapshot()["replayed"], 5)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_close_flushes_pending_events(self):
+        w = self.writer(flush_interval=30, batch_size=1000)
+        w.submit_many("exports", [{"i": i} for i in range(3)])
+        w.close()
+        self.assertEqual(len(self.mongo.docs["exports"]), 3)
+
+    @override_settings(ANALYTICS_ASYNC=True)
+    def test_log_functions_only_enqueue(self):
+        from . import analytics
+        user = User.objects.create_user(username="w@example.com", email="w@example.com")
+        job = Job.objects.create(owner=user, jd_text="x")
+        fake = mock.Mock()
+        with mock.patch("core.analytics.get_writer", return_value=fake), \
+                mock.patch("core.analytics.get_mongo_db", side_effect=AssertionError):
+            analytics.log_ranking_run(user, job, 3)
+            analytics.log_analytics_event("export", "w@example.com")
+        self.assertEqual([c.args[0] for c in fake.submit.call_args_list], ["matching_runs", "exports"])
+        self.assertEqual(fake.submit.call_args_list[0].args[1]["results_count"], 3)
+
+
+@unittest.skipUnless(mongomock, "mongomock not installed")
+@override_settings(ANALYTICS_ASYNC=False)
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient().predicta
+        patcher = mock.patch("core.analytics.get_mongo_db", return_value=self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="ro@example.com", email="ro@example.com")
+        self.job = Job.objects.create(owner=self.user, jd_text="x")
+
+    def log_some(self):
+        analytics.log_job_created(self.user, self.job)
+        analytics.log_ranking_run(self.user, self.job, 4)
+        for event in ("job", "ranking", "ranking", "export", "login"):
+            analytics.log_analytics_event(event, "ro@example.com")
+        analytics.log_analytics_event("ranking", "other@example.com")
+
+    def test_summary_reads_rollups_and_matches_raw_events(self):
+        self.log_some()
+        for email in (None, "ro@example.com", "other@example.com", "nobody@example.com"):
+            self.assertEqual(analytics.get_recruiter_summary(email), analytics.summary_from_events(email))
+        summary = analytics.get_recruiter_summary("ro@example.com")
+        self.assertEqual(summary["totals"], {"logins": 1, "jobs": 1, "matching_runs": 2, "exports": 1})
+
+        with mock.patch.object(type(self.db.matching_runs), "count_documents",
+                               side_effect=AssertionError("raw scan")):
+            analytics.get_recruiter_summary()
+
+    def test_writer_hook_applies_one_upsert_per_day_and_skips_replayed(self):
+        docs = [{"user_email": "a@example.com", "run_at": dt(2025, 1, 1, h)} for h in range(5)]
+        analytics.apply_rollups(self.db, "matching_runs", docs)
+        day = self.db.analytics_daily.find_one({"_id": "a@example.com|2025-01-01"})
+        self.assertEqual(day["matching_runs"], 5)
+        self.assertEqual(self.db.analytics_daily.find_one({"_id": "*|total"})["matching_runs"], 5)
+
+        from .analytics_writer import insert_new
+        self.assertEqual(len(insert_new(self.db, "matching_runs", docs[:2])), 2)
+        self.assertEqual(insert_new(self.db, "matching_runs", docs[:2]), [])  # replay: nothing new
+
+    def test_bootstrap_command_indexes_and_backfills(self):
+        self.log_some()
+        expected = analytics.get_recruiter_summary("ro@example.com")
+        self.db.analytics_daily.drop()
+        self.db.analytics_daily.insert_one({"_id": "stale|2020-01-01", "scope": "stale", "day": "2020-01-01"})
+        with mock.patch("core.analytics.get_mongo_db", return_value=self.db):
+            call_command("bootstrap_analytics", stdout=io.StringIO())
+        self.assertEqual(analytics.get_recruiter_summary("ro@example.com"), expected)
+        self.assertIsNone(self.db.analytics_daily.find_one({"_id": "stale|2020-01-01"}))
+        self.assertIn("scope_1_day_1", self.db.analytics_daily.index_information())
+        self.assertIn("user_email_1_run_at_1", self.db.matching_runs.index_information())
+
+
+@unittest.skipUnless(mongomock, "mongomock not installed")
+def _mongomock_add_update(add_update):
+    # pymongo >= 4.11 passes sort= to bulk builders; mongomock 4.3 does not accept it.
+    def wrapped(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+    return wrapped
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient().predicta
+        builder = mongomock.collection.BulkOperationBuilder
+        for patcher in (mock.patch("core.outbox.get_mongo_db", return_value=self.db),
+                        mock.patch.object(builder, "add_update", _mongomock_add_update(builder.add_update))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="o@example.com", email="o@example.com", password="pw")
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python developer")
+
+    @mock.patch("core.views.log_job_created")
+    def test_api_write_records_event_without_touching_mongo(self, _):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch("core.mongo_client.MongoClient", side_effect=AssertionError("mongo on request path")):
+            r = client.post("/api/jobs/", {"title": "New", "jd_text": "java"}, format="json")
+        self.assertEqual(r.status_code, 201)
+        self.assertTrue(OutboxEvent.objects.filter(aggregate="job", object_id=r.json()["id"]).exists())
+
+    def test_event_rolls_back_with_the_write(self):
+        before = OutboxEvent.objects.count()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Candidate.objects.create(job=self.job, resume_text="x")
+            raise RuntimeError
+        self.assertEqual(OutboxEvent.objects.count(), before)
+
+    def test_relay_upserts_compresses_and_dedupes_text(self):
+        text = "Senior Python developer. " * 200
+        a = Candidate.objects.create(job=self.job, name="A", resume_text=text)
+        b = Candidate.objects.create(job=self.job, name="B", resume_text=text)
+        a.name = "A2"
+        a.save()
+        b.save()  # unchanged: no new event
+        self.assertEqual(OutboxEvent.objects.filter(aggregate="candidate").count(), 3)
+
+        bulk_write = mongomock.collection.Collection.bulk_write
+        with mock.patch.object(mongomock.collection.Collection, "bulk_write", autospec=True,
+                               side_effect=bulk_write) as spy:
+            self.assertEqual(outbox.relay_batch(), 4)
+        self.assertCountEqual([c.args[0].name for c in spy.call_args_list], ["job_descriptions", "parsed_resumes"])
+        self.assertEqual(outbox.lag()["pending"], 0)
+        self.assertEqual(self.db.job_descriptions.find_one({"job_id": self.job.id})["jd_text"], "python developer")
+        self.assertEqual(self.db.parsed_resumes.count_documents({}), 2)
+        self.assertEqual(self.db.parsed_resumes.find_one({"candidate_id": a.id})["name"], "A2")
+        blobs = list(self.db.resume_texts.find())
+        self.assertEqual(len(blobs), 1)
+        self.assertLess(len(blobs[0]["data"]), len(text) // 10)
+        self.assertEqual(mongo_storage.load_resume_text(b.id, db=self.db), text)
+
+        b.delete()
+        outbox.relay_batch()
+        self.assertIsNone(self.db.parsed_resumes.find_one({"candidate_id": b.id}))
+
+    def test_failed_batch_stays_pending_and_replay_resends(self):
+        Candidate.objects.create(job=self.job, resume_text="python")
+        with mock.patch("core.mongo_storage.upsert_candidates", side_effect=RuntimeError("down")):
+            with self.assertRaises(RuntimeError):
+                outbox.relay_batch()
+        lag = outbox.lag()
+        self.assertEqual(lag["pending"], 2)
+        self.assertEqual(OutboxEvent.objects.filter(attempts=1).count(), 2)
+
+        call_command("run_outbox_relay", once=True, stdout=io.StringIO())
+        self.assertEqual(outbox.lag()["pending"], 0)
+        self.db.parsed_resumes.drop()
+        call_command("outbox_replay", aggregate="candidate", stdout=io.StringIO())
+        self.assertEqual(outbox.lag()["pending"], 1)
+        outbox.relay_batch()
+        self.assertEqual(self.db.parsed_resumes.count_documents({}), 1)
+
+
+class ListingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="l@example.com", email="l@example.com", password="pw")
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python developer " * 500)
+        Candidate.objects.bulk_create([
+            Candidate(job=self.job, name=f"C{i}", email=f"c{i}@example.com", resume_text="resume text " * 2000)
+            for i in range(25)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        return r, selects
+
+    def test_list_defers_resume_text_and_is_small(self):
+        full, _ = self.get("/api/candidates/?fields=id,name,resume_text&page_size=25")
+        r, selects = self.get("/api/candidates/?page_size=25")
+        self.assertEqual(len(r.json()["results"]), 25)
+        self.assertNotIn("resume_text", r.json()["results"][0])
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn("resume_text", selects[0])
+        self.assertLess(len(r.content) * 50, len(full.content))
+
+    def test_fields_projection_pushes_down_to_select(self):
+        r, selects = self.get("/api/candidates/?fields=id,name")
+        self.assertEqual(set(r.json()["results"][0]), {"id", "name"})
+        self.assertNotIn("email", selects[0])
+        self.assertEqual(self.client.get("/api/candidates/?fields=id,secret").status_code, 400)
+
+        r, selects = self.get("/api/jobs/")
+        self.assertNotIn("jd_text", r.json()["results"][0])
+        self.assertNotIn("jd_text", selects[0])
+        r = self.client.get(f"/api/jobs/{self.job.id}/")
+        self.assertIn("jd_text", r.json())
+
+    def test_cursor_walks_newest_first_without_gaps(self):
+        ids, url = [], "/api/candidates/?page_size=10"
+        while url:
+            r, selects = self.get(url)
+            self.assertEqual(len(selects), 1)
+            ids += [c["id"] for c in r.json()["results"]]
+            url = r.json()["next"]
+            if ids == [c["id"] for c in r.json()["results"]]:
+                Candidate.objects.create(job=self.job, resume_text="late")  # must not shift pages
+        self.assertEqual(ids, sorted(Candidate.objects.exclude(resume_text="late").values_list("id", flat=True), reverse=True))
+
+
+@mock.patch("core.views.log_ranking_results")
+@mock.patch("core.views.log_ranking_run")
+class IncrementalRankTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="i@example.com", email="i@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django rest api developer")
+        skills = ["python developer", "django developer", "rest api python", "java developer", "python django"]
+        for i in range(30):
+            Candidate.objects.create(job=self.job, name=f"C{i}", resume_text=f"{skills[i % 5]} project{i} " * (i % 3 + 1))
+
+    def rank(self, **body):
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", body, format="json")
+        self.assertEqual(r.status_code, 200)
+        return r
+
+    def cands(self):
+        return list(Candidate.objects.filter(job=self.job).values("id", "name", "email", "resume_text"))
+
+    def test_new_candidate_is_scored_alone_and_merged(self, *_):
+        before = self.rank(incremental=True)
+        self.assertEqual(before["X-Ranking-Update"], "full")  # no snapshot yet
+        new = Candidate.objects.create(job=self.job, name="New", resume_text="python django rest api developer")
+        with mock.patch("core.incremental.tfidf_row", wraps=__import__("core.scoring").scoring.tfidf_row) as row:
+            r = self.rank(incremental=True)
+        self.assertEqual(r["X-Ranking-Update"], "incremental")
+        self.assertEqual(row.call_count, 1)
+        rows = r.json()
+        self.assertEqual(rows[0]["id"], new.id)
+        self.assertEqual(rows[1:], before.json())  # old rows keep their frozen-IDF scores
+
+    def test_changed_and_removed_candidates_replace_their_rows(self, *_):
+        self.rank()
+        first = Candidate.objects.filter(job=self.job).first()
+        first.resume_text = "django rest api"
+        first.save()
+        Candidate.objects.filter(name="C5").delete()
+        rows = self.rank(incremental=True).json()
+        self.assertEqual(len(rows), 29)
+        self.assertNotIn("C5", [x["name"] for x in rows])
+        self.assertEqual(set(next(x for x in rows if x["id"] == first.id)["resumeTerms"]), {"django", "rest", "api"})
+
+    def test_drift_over_threshold_forces_full_rebuild(self, *_):
+        self.rank()
+        for i in range(30):
+            Candidate.objects.create(job=self.job, name=f"D{i}", resume_text="django rest api expert")
+        snap = Ranking.objects.get(job=self.job).idf_snapshot
+        rows = Ranking.objects.get(job=self.job).results_json
+        self.assertIsNone(rerank_incremental(self.job, snap, rows, self.cands(), threshold=0.05))
+        self.assertIsNotNone(rerank_incremental(self.job, snap, rows, self.cands(), threshold=10))
+
+        r = self.rank(incremental=True)
+        self.assertEqual(r["X-Ranking-Update"], "full")
+        self.assertEqual(r.json(), rank_tfidf(self.job.jd_text, self.cands()))
+        self.assertEqual(Ranking.objects.get(job=self.job).idf_snapshot["n0"], 61)
+
+    def test_jd_edit_and_other_modes_invalidate_snapshot(self, *_):
+        self.rank()
+        self.job.jd_text = "java developer"
+        self.job.save()
+        self.assertEqual(self.rank(incremental=True)["X-Ranking-Update"], "full")
+        self.rank(collapse_duplicates=True)
+        self.assertIsNone(Ranking.objects.get(job=self.job).idf_snapshot)
+
+
+@mock.patch("core.views.log_ranking_results")
+@mock.patch("core.views.log_ranking_run")
+@mock.patch("core.rank_runs.log_ranking_results")
+@mock.patch("core.rank_runs.log_ranking_run")
+class RankRunTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="a@example.com", email="a@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django developer")
+        Candidate.objects.create(job=self.job, name="Match", resume_text="python django developer")
+        Candidate.objects.create(job=self.job, name="Other", resume_text="chef")
+
+    def start(self, **body):
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"async": True, **body}, format="json")
+        self.assertEqual(r.status_code, 202)
+        return r.json()["id"]
+
+    def drain(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            while tasks.run_pending() != (0, 0):
+                pass
+
+    def test_async_run_is_queued_then_served_by_worker(self, *_):
+        run_id = self.start()
+        self.assertEqual(self.client.get(f"/api/rank-runs/{run_id}/").json()["status"], "queued")
+        self.assertEqual(self.client.get(f"/api/rank-runs/{run_id}/results/").status_code, 202)
+        self.assertFalse(Ranking.objects.filter(job=self.job).exists())
+
+        self.drain()
+        run = self.client.get(f"/api/rank-runs/{run_id}/").json()
+        self.assertEqual((run["status"], run["candidates"], run["results_count"]), ("done", 2, 2))
+        rows = self.client.get(f"/api/rank-runs/{run_id}/results/").json()
+        self.assertEqual([r["name"] for r in rows], ["Match", "Other"])
+        sync = self.client.post(f"/api/jobs/{self.job.id}/rank/", {}, format="json").json()
+        self.assertEqual(rows, sync)
+
+    def test_invalid_options_are_rejected_before_queueing(self, *_):
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {"async": True, "mode": "x"}, format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertFalse(RankRun.objects.exists())
+
+    def test_cancel_stops_the_run(self, *_):
+        run_id = self.start()
+        self.assertEqual(self.client.post(f"/api/rank-runs/{run_id}/cancel/").json()["status"], "cancelled")
+        self.drain()
+        self.assertFalse(Ranking.objects.filter(job=self.job).exists())
+        self.assertEqual(self.client.post(f"/api/rank-runs/{run_id}/cancel/").status_code, 409)
+        self.assertEqual(self.client.get(f"/api/rank-runs/{run_id}/results/").status_code, 409)
+
+    def test_change_during_run_supersedes_it(self, *_):
+        run_id = self.start()
+        compute = __import__("core.ranking").ranking.compute
+
+        def edit_midway(job, opts, client_id=None, on_stage=None):
+            def stage(name, n):
+                Candidate.objects.create(job=job, name="Late", resume_text="python django developer expert")
+                on_stage(name, n)
+            return compute(job, opts, client_id, stage)
+
+        with mock.patch("core.ranking.compute", side_effect=edit_midway) as m:
+            with self.captureOnCommitCallbacks(execute=True):
+                rank_runs.execute(run_id)
+        m.assert_called_once()
+        old = RankRun.objects.get(pk=run_id)
+        self.assertEqual(old.status, "superseded")
+        self.assertFalse(Ranking.objects.filter(job=self.job).exists())
+
+        self.drain()
+        new = RankRun.objects.get(pk=old.superseded_by_id)
+        self.assertEqual((new.status, new.results_count), ("done", 3))
+        self.assertEqual(self.client.get(f"/api/rank-runs/{run_id}/results/").json()["latest_run"], new.id)
+
+    def test_results_are_refused_once_another_rank_replaces_them(self, *_):
+        run_id = self.start()
+        self.drain()
+        self.assertEqual(self.client.get(f"/api/rank-runs/{run_id}/results/").status_code, 200)
+        self.client.post(f"/api/jobs/{self.job.id}/rank/", {"collapse_duplicates": True}, format="json")
+        r = self.client.get(f"/api/rank-runs/{run_id}/results/")
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(r.json()["latest_run"], run_id)
+
+    def test_embedding_outage_retries_then_fails(self, *_):
+        run_id = self.start(mode="sbert")
+        down = EmbeddingClient(base_url="http://127.0.0.1:9", max_retries=0, connect_timeout=0.2)
+        with self.settings(TASKS_MAX_ATTEMPTS=1), mock.patch("core.ranking.embedding_client", down):
+            self.assertEqual(tasks.run_pending(), (0, 1))
+        run = RankRun.objects.get(pk=run_id)
+        self.assertEqual(run.status, "failed")
+        self.assertIn("EmbeddingServiceError", run.error)
+        self.assertEqual(RankRun.objects.filter(job__owner=self.user).count(), 1)
+
+
+@mock.patch("core.views.log_ranking_results")
+@mock.patch("core.views.log_ranking_run")
+class SingleFlightTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="s@example.com", email="s@example.com", password="pw")
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django developer")
+        for i in range(3):
+            Candidate.objects.create(job=self.job, name=f"C{i}", resume_text=f"python developer {i}")
+
+    def post(self, out, body=None):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            out.append(client.post(f"/api/jobs/{self.job.id}/rank/", body or {}, format="json"))
+        finally:
+            connections.close_all()
+
+    def test_concurrent_identical_requests_share_one_computation(self, *_):
+        release, entered = threading.Event(), threading.Event()
+        compute, calls = ranking.compute, []
+
+        def slow(*args, **kwargs):
+            calls.append(1)
+            entered.set()
+            release.wait(5)
+            return compute(*args, **kwargs)
+
+        out = []
+        with mock.patch("core.ranking.compute", side_effect=slow), \
+                mock.patch("core.ranking.save", wraps=ranking.save) as save, \
+                self.settings(RANK_SINGLEFLIGHT_POLL=0.01):
+            threads = [threading.Thread(target=self.post, args=(out,))]
+            threads[0].start()
+            self.assertTrue(entered.wait(5))
+            threads += [threading.Thread(target=self.post, args=(out,)) for _ in range(3)]
+            for t in threads[1:]:
+                t.start()
+            time.sleep(0.2)
+            release.set()
+            for t in threads:
+                t.join(10)
+
+        self.assertEqual(len(calls), 1)
+        save.assert_called_once()
+        self.assertEqual(sorted(r["X-Single-Flight"] for r in out), ["follower"] * 3 + ["leader"])
+        self.assertEqual(len({r.content for r in out}), 1)
+        self.assertFalse(RankLock.objects.exists())
+
+    def test_different_inputs_do_not_share(self, *_):
+        cands = ranking.load_candidates(self.job)
+        tfidf = singleflight.input_key(self.job, ranking.parse_options({}, {}), cands)
+        self.assertNotEqual(tfidf, singleflight.input_key(
+            self.job, ranking.parse_options({"collapse_duplicates": True}, {}), cands))
+        cands[0]["resume_text"] += " django"
+        self.assertNotEqual(tfidf, singleflight.input_key(self.job, ranking.parse_options({}, {}), cands))
+
+    def test_repeat_after_the_leader_finished_reuses_the_stored_ranking(self, *_):
+        out = []
+        with mock.patch("core.ranking.save", wraps=ranking.save) as save:
+            self.post(out)
+            self.post(out)
+        save.assert_called_once()
+        self.assertEqual([r["X-Single-Flight"] for r in out], ["leader", "follower"])
+        self.assertEqual(out[0].content, out[1].content)
+
+    def test_follower_answers_202_once_the_wait_runs_out(self, *_):
+        key = singleflight.input_key(self.job, ranking.parse_options({}, {}), ranking.load_candidates(self.job))
+        RankLock.objects.create(key=key, job=self.job, expires_at=timezone.now() + timedelta(seconds=60))
+        out = []
+        with self.settings(RANK_SINGLEFLIGHT_WAIT=0.05, RANK_SINGLEFLIGHT_POLL=0.01):
+            self.post(out)
+        self.assertEqual((out[0].status_code, out[0]["Retry-After"]), (202, "1"))
+        self.assertFalse(Ranking.objects.filter(job=self.job).exists())
+
+    def test_expired_lock_of_dead_leader_is_taken_over(self, *_):
+        opts = ranking.parse_options({}, {})
+        key = singleflight.input_key(self.job, opts, ranking.load_candidates(self.job))
+        RankLock.objects.create(key=key, job=self.job, expires_at=timezone.now() - timedelta(seconds=1))
+        out = []
+        self.post(out)
+        self.assertEqual(out[0]["X-Single-Flight"], "leader")
+        self.assertEqual(Ranking.objects.get(job=self.job).input_key, key)
+
+
+class AsyncMongoMock:
+    """The slice of the pymongo async API the analytics code uses, over mongomock."""
+
+    class Cursor:
+        def __init__(self, cursor):
+            self.cursor = cursor
+
+        def sort(self, *args):
+            self.cursor = self.cursor.sort(*args)
+            return self
+
+        async def to_list(self, length=None):
+            return list(self.cursor)
+
+    class Collection:
+        def __init__(self, coll):
+            self.coll = coll
+
+        async def find_one(self, *args, **kwargs):
+            return self.coll.find_one(*args, **kwargs)
+
+        async def insert_one(self, doc):
+            return self.coll.insert_one(doc)
+
+        async def update_one(self, *args, **kwargs):
+            return self.coll.update_one(*args, **kwargs)
+
+        def find(self, *args, **kwargs):
+            return AsyncMongoMock.Cursor(self.coll.find(*args, **kwargs))
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, name):
+        return self.Collection(self.db[name])
+
+    __getattr__ = __getitem__
+
+
+@unittest.skipUnless(mongomock, "mongomock not installed")
+@override_settings(ANALYTICS_ASYNC=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient().predicta
+        for target, value in (("core.analytics.get_mongo_db", self.db),
+                              ("core.analytics.get_async_mongo_db", AsyncMongoMock(self.db))):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.rf = AsyncRequestFactory()
+
+    async def test_log_event_and_summary_match_sync_views(self):
+        for event in ("job", "ranking", "ranking", "export"):
+            r = await async_views.analytics_log_event(self.rf.post(
+                "/api/analytics/log-event/", {"event": event, "email": "as@example.com"},
+                content_type="application/json"))
+            self.assertEqual(r.status_code, 200)
+        analytics.log_analytics_event("ranking", "as@example.com")  # sync path, same store
+
+        r = await async_views.recruiter_analytics(self.rf.get("/api/analytics/overview/?email=as@example.com"))
+        self.assertEqual(json.loads(r.content), analytics.get_recruiter_summary("as@example.com"))
+        self.assertEqual(json.loads(r.content)["totals"]["matching_runs"], 3)
+
+        r = await async_views.analytics_log_event(self.rf.post(
+            "/api/analytics/log-event/", {}, content_type="application/json"))
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual((await async_views.recruiter_analytics(self.rf.post("/x"))).status_code, 405)
+        self.assertTrue(async_views.analytics_log_event.csrf_exempt)
+
+    async def test_linkedin_search_uses_pooled_async_client(self):
+        seen = []
+
+        def provider(request):
+            seen.append(request)
+            return httpx.Response(200, json={"results": [{"id": 7, "title": "Py Dev", "company": "Acme"}]})
+
+        client = LinkedInClient()
+        client.base_url, client.api_key = "http://provider.test", "k"
+        pool = httpx.AsyncClient(transport=httpx.MockTransport(provider), headers=client._headers())
+        with mock.patch.object(client, "_async_client", return_value=pool), \
+                mock.patch("core.async_views.linkedin_client", client):
+            r = await async_views.linkedin_job_search(self.rf.get("/x?q=python&limit=3"))
+            missing = await async_views.linkedin_job_search(self.rf.get("/x"))
+        await pool.aclose()
+        body = json.loads(r.content)
+        self.assertEqual((body["count"], body["results"][0]["company"]), (1, "Acme"))
+        self.assertEqual(seen[0].url.params["limit"], "3")
+        self.assertEqual(seen[0].headers["authorization"], "Bearer k")
+        self.assertEqual(missing.status_code, 400)
+
+
+# ---------- External job search client ----------
+
+class StubJobProvider:
+    """Local stand-in for the external jobs API (GET /jobs/search, HTTP/1.1 keep-alive)."""
+
+    def __init__(self, delay=0.0, fail_first=0, fail_status=503, feed=None):
+        self.requests = []        # (client port, query params)
+        self.feed = feed          # raw records paged through `cursor` / `next_cursor`
+        self.delay = delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                with stub.lock:
+                    stub.requests.append((self.client_address[1], params))
+                    fail = stub.fail_first > 0
+                    stub.fail_first -= fail
+                time.sleep(stub.delay)
+                if fail:
+                    self._send(stub.fail_status, {"detail": "busy"}, {"Retry-After": "0"})
+                    return
+                self._send(200, stub.page(params))
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def page(self, params):
+        if self.feed is not None:
+            start, limit = int(params.get("cursor", 0)), int(params["limit"])
+            more = start + limit < len(self.feed)
+            return {"results": self.feed[start:start + limit],
+                    "next_cursor": str(start + limit) if more else None}
+        loc = params.get("location", "")
+        return {"results": [
+            {"id": f"{loc or 'any'}-{i}", "title": f"{params['q']} dev {i}",
+             "company_name": "Acme", "location": loc or "Remote"}
+            for i in range(int(params.get("limit", 10)))
+        ] + [{"id": "shared", "title": "Everywhere", "company": "Acme"}]}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LinkedInClientTests(TestCase):
+    def client_for(self, srv, **kw):
+        kw.setdefault("backoff", 0.001)
+        return LinkedInClient(base_url=srv.url, api_key="k", **kw)
+
+    def test_cache_hits_and_keepalive_pool(self):
+        with StubJobProvider() as srv:
+            client = self.client_for(srv)
+            first = client.search_jobs("python", "Berlin", 2)
+            first[0]["title"] = "mutated"
+            again = client.search_jobs("python", "Berlin", 2)
+            client.search_jobs("python", "Berlin", 3)
+        self.assertEqual(len(srv.requests), 2)                       # (q, location, limit) keyed
+        self.assertEqual(again[0]["title"], "python dev 0")          # callers get copies
+        self.assertEqual(again[0]["company"], "Acme")
+        self.assertEqual(len({port for port, _ in srv.requests}), 1)
+
+    def test_cache_entries_expire(self):
+        with StubJobProvider() as srv:
+            client = self.client_for(srv, cache_ttl=0.05)
+            client.search_jobs("go")
+            time.sleep(0.1)
+            client.search_jobs("go")
+        self.assertEqual(len(srv.requests), 2)
+
+    def test_identical_inflight_searches_are_coalesced(self):
+        with StubJobProvider(delay=0.3) as srv:
+            client = self.client_for(srv)
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                results = list(pool.map(lambda _: client.search_jobs("rust", "", 1), range(6)))
+        self.assertEqual(len(srv.requests), 1)
+        self.assertTrue(all(r == results[0] for r in results))
+
+    def test_retries_with_backoff_then_gives_up(self):
+        with StubJobProvider(fail_first=2, fail_status=429) as srv:
+            self.assertEqual(len(self.client_for(srv, max_retries=3).search_jobs("a", limit=1)), 2)
+        self.assertEqual(len(srv.requests), 3)
+
+        with StubJobProvider(fail_first=10) as srv:
+            with self.assertRaises(JobProviderError):
+                self.client_for(srv, max_retries=1).search_jobs("a")
+        self.assertEqual(len(srv.requests), 2)
+
+        with StubJobProvider(fail_first=1, fail_status=401) as srv:
+            with self.assertRaises(JobProviderError):
+                self.client_for(srv).search_jobs("a")
+        self.assertEqual(len(srv.requests), 1)
+
+    def test_token_bucket_paces_requests(self):
+        with StubJobProvider() as srv:
+            client = self.client_for(srv, rate_limit=20, rate_burst=2)
+            t0 = time.perf_counter()
+            for i in range(6):
+                client.search_jobs(f"q{i}")
+            elapsed = time.perf_counter() - t0
+        self.assertGreaterEqual(elapsed, 0.18)   # 2 immediate, then 4 at 20/s
+
+    def test_multi_location_fans_out_concurrently(self):
+        with StubJobProvider(delay=0.3) as srv:
+            client = self.client_for(srv)
+            with mock.patch("core.views.linkedin_client", client):
+                t0 = time.perf_counter()
+                r = APIClient().get("/api/external/linkedin-search/",
+                                    {"q": "py", "limit": 1, "location": ["Berlin", "Paris", "Oslo"]})
+                elapsed = time.perf_counter() - t0
+        body = r.json()
+        self.assertEqual(len(srv.requests), 3)
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(body["locations"], ["Berlin", "Paris", "Oslo"])
+        self.assertEqual([j["external_id"] for j in body["results"]],
+                         ["Berlin-0", "shared", "Paris-0", "Oslo-0"])
+
+    def test_provider_outage_is_a_502(self):
+        with StubJobProvider(fail_first=10) as srv:
+            client = self.client_for(srv, max_retries=0)
+            with mock.patch("core.views.linkedin_client", client):
+                r = APIClient().get("/api/external/linkedin-search/", {"q": "py"})
+        self.assertEqual(r.status_code, 502)
+
+    async def test_async_path_shares_cache_and_coalesces(self):
+        with StubJobProvider(delay=0.2) as srv:
+            client = self.client_for(srv)
+            results = await asyncio.gather(*(client.asearch_jobs("js", "", 2) for _ in range(5)))
+            client.search_jobs("js", "", 2)          # sync path hits the same cache
+            merged = await client.asearch_jobs_multi("js", ["A", "B"], 1)
+            await client._async_client().aclose()
+        self.assertEqual(len(srv.requests), 3)
+        self.assertTrue(all(r == results[0] for r in results))
+        self.assertEqual([j["external_id"] for j in merged], ["A-0", "shared", "B-0"])
+
+
+# ---------- External job feed ingestion ----------
+
+def feed_record(i, text=None):
+    return {"id": f"ext-{i}", "title": f"Engineer {i}", "company": "Acme",
+            "description": text or f"python django engineer number {i}", "url": f"https://jobs.test/{i}"}
+
+
+def feed_jobs(raw):
+    normalize = LinkedInClient()._normalize_job
+    return [normalize(r) for r in raw]
+
+
+@override_settings(JOB_FEED_CHUNK_SIZE=50, PRECOMPUTE_EMBEDDINGS=False)
+class JobFeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="feed@example.com", email="feed@example.com", password="pw")
+
+    def test_command_pages_dedupes_and_indexes(self):
+        feed = [feed_record(i) for i in range(230)] + [feed_record(3, "python rust updated")]
+        out = io.StringIO()
+        with StubJobProvider(feed=feed) as srv, \
+                mock.patch("core.management.commands.ingest_job_feed.linkedin_client",
+                           LinkedInClient(base_url=srv.url, api_key="k")), \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command("ingest_job_feed", owner="feed@example.com", query="py", page_size=40, stdout=out)
+        self.assertEqual(len(srv.requests), 6)                       # 231 records / 40 per page
+        self.assertEqual(srv.requests[1][1]["cursor"], "40")
+        self.assertIn("231 seen, 230 created, 1 updated, 0 unchanged, 0 skipped", out.getvalue())
+        self.assertEqual(Job.objects.filter(owner=self.user, source="linkedin").count(), 230)
+        job = Job.objects.get(external_id="ext-3")
+        self.assertEqual((job.jd_text, job.url), ("python rust updated", "https://jobs.test/3"))
+        self.assertEqual(OutboxEvent.objects.filter(aggregate="job").count(), 231)
+
+        self.assertEqual(Task.objects.filter(name="precompute_job").count(), 230)
+        while tasks.run_pending() != (0, 0):
+            pass
+        self.assertEqual(JobArtifact.objects.get(job=job).tokens, ["python", "rust", "updated"])
+
+    def test_reingest_only_touches_changed_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_feed(self.user, feed_jobs(feed_record(i) for i in range(60)))
+        Task.objects.all().delete()
+        job = Job.objects.get(external_id="ext-7")
+        run = RankRun.objects.create(job=job, options={})
+        other = RankRun.objects.create(job=Job.objects.get(external_id="ext-8"), options={})
+
+        feed = [feed_record(i) for i in range(60)] + [{"id": None, "title": "no id"}]
+        feed[7] = feed_record(7, "golang kubernetes")
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = ingest_feed(self.user, feed_jobs(feed))
+        self.assertEqual(stats, {"seen": 61, "created": 0, "updated": 1, "unchanged": 59, "skipped": 1})
+        self.assertEqual(list(Task.objects.values_list("object_id", flat=True)), [job.pk])
+        self.assertEqual(Job.objects.get(pk=job.pk).jd_text, "golang kubernetes")
+        run.refresh_from_db(), other.refresh_from_db()
+        self.assertEqual((run.stale, other.stale), (True, False))
+
+    def test_feed_is_consumed_one_chunk_at_a_time(self):
+        lead = []
+
+        def feed():
+            for i in range(500):
+                lead.append(i - Job.objects.count())
+                yield feed_jobs([feed_record(i)])[0]
+
+        self.assertEqual(ingest_feed(self.user, feed())["created"], 500)
+        self.assertLessEqual(max(lead), 50)   # never more than one chunk ahead of the database
+
+    def test_manual_jobs_never_conflict(self):
+        Job.objects.create(owner=self.user, title="A", jd_text="a")
+        Job.objects.create(owner=self.user, title="B", jd_text="b")
+        ingest_feed(self.user, feed_jobs([feed_record(1)]), source="other")
+        ingest_feed(self.user, feed_jobs([feed_record(1)]))
+        self.assertEqual(Job.objects.filter(owner=self.user).count(), 4)
+
+
+# ---------- Stage timing / metrics ----------
+
+@mock.patch("core.analytics._write")
+class StageTimingTests(TestCase):
+    def setUp(self):
+        stage_timing.configure(True)
+        stage_timing.REGISTRY.reset()
+        self.user = User.objects.create_user(username="st@example.com", email="st@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django developer")
+        for i in range(3):
+            Candidate.objects.create(job=self.job, name=f"C{i}", resume_text=f"python developer {i} django")
+
+    def test_rank_reports_server_timing_and_histograms(self, _write):
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {}, format="json")
+        self.assertEqual(r.status_code, 200)
+        stages = dict(part.split(";dur=") for part in r["Server-Timing"].split(", "))
+        for name in ("tokenize", "tfidf.idf", "tfidf.score", "rows", "skills", "rank.load",
+                     "rank.compute", "rank.save", "analytics.ranking_run",
+                     "analytics.ranking_results", "total"):
+            self.assertIn(name, stages)
+        self.assertGreaterEqual(float(stages["total"]), float(stages["rank.compute"]))
+
+        text = self.client.get("/metrics").content.decode()
+        self.assertIn("# TYPE predicta_stage_seconds histogram", text)
+        self.assertRegex(text, r'predicta_stage_seconds_count\{worker="\d+",stage="tfidf.idf"\} 1')
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self, _write):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        r = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "text/plain; version=0.0.4")
+
+    def test_disabled_adds_nothing(self, _write):
+        stage_timing.configure(False)
+        self.addCleanup(stage_timing.configure, True)
+        r = self.client.post(f"/api/jobs/{self.job.id}/rank/", {}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn("Server-Timing", r)
+        self.assertEqual(stage_timing.REGISTRY.snapshot(), {})
+
+
+# ---------- On-demand request profiling ----------
+
+@mock.patch("core.analytics._write")
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        override = override_settings(PROFILE_DIR=self.dir, PROFILE_SECRET="k")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username="o@example.com", email="o@example.com", password="pw")
+        self.staff = User.objects.create_user(username="s@example.com", email="s@example.com",
+                                              password="pw", is_staff=True)
+        self.job = Job.objects.create(owner=self.staff, title="Py", jd_text="python django")
+        Candidate.objects.create(job=self.job, name="A", resume_text="python django developer")
+        self.url = f"/api/jobs/{self.job.id}/rank/"
+
+    def jwt_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def test_staff_query_flag_profiles_and_profile_is_downloadable(self, _write):
+        staff = self.jwt_client(self.staff)
+        r = staff.post(self.url + "?profile=1", {}, format="json")
+        self.assertEqual(r.status_code, 200)
+        pid = r["X-Profile-Id"]
+
+        meta = staff.get(f"/api/profiles/{pid}/").json()
+        self.assertEqual((meta["path"], meta["mode"], meta["format"]), (self.url, "cprofile", "pstats"))
+        self.assertGreater(meta["peak_memory_bytes"], 0)
+        self.assertTrue(meta["top"])
+
+        r = staff.get(meta["download"])
+        self.assertEqual(r.status_code, 200)
+        path = os.path.join(self.dir, "dl.pstats")
+        with open(path, "wb") as f:
+            f.write(b"".join(r.streaming_content))
+        self.assertTrue(any(fn[2] == "rank" for fn in pstats_mod.Stats(path).stats))
+
+        self.assertEqual(self.jwt_client(self.owner).get(f"/api/profiles/{pid}/").status_code, 403)
+        self.assertEqual(staff.get("/api/profiles/" + "0" * 32 + "/").status_code, 404)
+
+    def test_non_staff_flag_is_ignored(self, _write):
+        job = Job.objects.create(owner=self.owner, title="Py", jd_text="python")
+        r = self.jwt_client(self.owner).post(f"/api/jobs/{job.id}/rank/?profile=1", {}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn("X-Profile-Id", r)
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_signed_header_and_sample_mode(self, _write):
+        client = self.jwt_client(self.staff)
+        r = client.post(self.url, {}, format="json",
+                        HTTP_X_PROFILE=request_profiler.sign("k", self.url), HTTP_X_PROFILE_MODE="sample")
+        meta = client.get(f"/api/profiles/{r['X-Profile-Id']}/").json()
+        self.assertEqual((meta["mode"], meta["format"]), ("sample", "speedscope"))
+
+        r = client.post(self.url, {}, format="json",
+                        HTTP_X_PROFILE=request_profiler.sign("k", "/api/other/"))
+        self.assertNotIn("X-Profile-Id", r)
+        with override_settings(PROFILE_SECRET=""):
+            r = client.post(self.url, {}, format="json", HTTP_X_PROFILE=request_profiler.sign("k", self.url))
+        self.assertNotIn("X-Profile-Id", r)
+
+    def test_asgi_profiles_the_sync_view_thread(self, _write):
+        # Sync views run on asgiref's executor thread, not the event loop.
+        from django.core.handlers.asgi import ASGIHandler
+
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": "/metrics", "raw_path": b"/metrics", "query_string": b"",
+                 "root_path": "", "server": ("testserver", 80), "client": ("127.0.0.1", 1),
+                 "headers": [(b"host", b"testserver"),
+                             (b"x-profile", request_profiler.sign("k", "/metrics").encode())]}
+        with override_settings(METRICS_TOKEN=""):
+            asyncio.run(ASGIHandler()(scope, receive, send))
+        self.assertEqual(sent[0]["status"], 200)
+        pid = dict(sent[0]["headers"])[b"X-Profile-Id"].decode()
+        stats = pstats_mod.Stats(os.path.join(self.dir, f"{pid}.pstats")).stats
+        self.assertTrue(any(fn[0].endswith(os.path.join("core", "views.py")) and fn[2] == "metrics"
+                            for fn in stats))
+
+    def test_profile_token_command(self, _write):
+        out = io.StringIO()
+        call_command("profile_token", "/api/x/", ttl=60, stdout=out)
+        self.assertTrue(request_profiler.verify("k", out.getvalue().strip(), "/api/x/"))
+
+
+# ---------- Anonymization fairness ----------
+
+@mock.patch("core.analytics._write")
+class FairnessTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="f@example.com", email="f@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django developer 2024 hr@corp.com")
+        texts = ["python django developer", "python developer 20245 jo@mail.com jo@mail.com",
+                 "django rest api 2024", "java developer al@corp.com", "python django 123456 987654"]
+        for i in range(20):
+            Candidate.objects.create(job=self.job, name=f"C{i}", resume_text=f"{texts[i % 5]} project{i}")
+
+    def cands(self):
+        return list(Candidate.objects.filter(job=self.job).values("id", "name", "email", "resume_text"))
+
+    def test_matches_two_tfidf_rankings(self, _write):
+        cands = self.cands()
+        report = fairness.analyze(self.job.jd_text, cands, top=len(cands))
+        raw = scoring.rank(self.job.jd_text, cands, pii=False)
+        anon = scoring.rank(self.job.jd_text, cands, pii=True)
+        raw_pos = {r["id"]: (i + 1, r["score"]) for i, r in enumerate(raw)}
+        anon_pos = {r["id"]: (i + 1, r["score"]) for i, r in enumerate(anon)}
+        self.assertTrue(report["most_affected"])
+        for row in report["most_affected"]:
+            self.assertAlmostEqual(row["raw_score"], raw_pos[row["id"]][1], places=12)
+            self.assertAlmostEqual(row["anonymized_score"], anon_pos[row["id"]][1], places=12)
+            self.assertEqual(row["raw_rank"], raw_pos[row["id"]][0])
+            self.assertEqual(row["anonymized_rank"], anon_pos[row["id"]][0])
+        shifts = [abs(anon_pos[i][0] - raw_pos[i][0]) for i in raw_pos]
+        self.assertEqual(report["max_rank_shift"], max(shifts))
+        self.assertAlmostEqual(report["avg_rank_shift"], sum(shifts) / len(shifts))
+        # jo@mail.com, al@corp.com, hr@corp.com, 2024, 20245, 123456, 987654
+        self.assertEqual(report["pii_terms"], 7)
+
+    def test_placeholders_merge_within_a_document(self, _write):
+        index, doc, term, count = term_matrix([["a", "1234", "5678", "1234"], ["5678", "b"]])
+        vocab, doc, term, count, mapping = anonymized(list(index), doc, term, count)
+        got = sorted((int(d), vocab[t], int(c)) for d, t, c in zip(doc, term, count))
+        self.assertEqual(got, [(0, "<num>", 3), (0, "a", 1), (1, "<num>", 1), (1, "b", 1)])
+        self.assertEqual([vocab[t] for t in mapping], ["a", "<num>", "<num>", "b"])
+
+    def test_without_pii_nothing_moves(self, _write):
+        report = fairness.analyze("python django", [{"id": 1, "resume_text": "python"},
+                                                    {"id": 2, "resume_text": "django rest"}])
+        self.assertEqual((report["pii_terms"], report["changed"], report["most_affected"]), (0, 0, []))
+        self.assertEqual(fairness.analyze("python", [])["candidates"], 0)
+
+    def test_rank_action_returns_report_on_request(self, _write):
+        url = f"/api/jobs/{self.job.id}/rank/"
+        plain = self.client.post(url, {}, format="json").json()
+        self.assertIsInstance(plain, list)
+        r = self.client.post(url, {"fairness": True}, format="json")
+        self.assertEqual(r.status_code, 200)
+        body = r.json()
+        self.assertEqual(body["results"], plain)
+        self.assertEqual(body["fairness"]["candidates"], 20)
+        self.assertIn("note", body["fairness"])
+
+
+# ---------- Multi-job batch ranking ----------
+
+@mock.patch("core.analytics._write")
+class BatchRankTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="br@example.com", email="br@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.jobs = [
+            Job.objects.create(owner=self.user, title="Py", jd_text="python django rest api developer"),
+            Job.objects.create(owner=self.user, title="Java", jd_text="java spring developer with aws"),
+            Job.objects.create(owner=self.user, title="Raw", jd_text="python aws", remove_stopwords=False),
+        ]
+        texts = ["python developer 123456", "django rest api python a@b.com", "java spring 20245 java",
+                 "aws docker java developer", "python django with the aws team c@d.org 777777"]
+        for i in range(25):
+            Candidate.objects.create(job=self.jobs[i % 2], name=f"C{i}", resume_text=f"{texts[i % 5]} project{i % 7}")
+
+    def cands(self):
+        return list(Candidate.objects.order_by("id").values("id", "name", "email", "resume_text"))
+
+    def test_single_job_matches_rank(self, _write):
+        cands = self.cands()
+        rows = batch_ranking.rank_jobs([self.jobs[0]], cands, top_k=100)[self.jobs[0].id]
+        expected = scoring.rank(self.jobs[0].jd_text, cands)
+        self.assertEqual([r["id"] for r in rows], [r["id"] for r in expected])
+        for got, want in zip(rows, expected):
+            self.assertAlmostEqual(got["score"], want["score"], places=12)
+            self.assertCountEqual(got["resumeTerms"], want["resumeTerms"])
+            self.assertEqual({**got, "score": 0, "resumeTerms": 0}, {**want, "score": 0, "resumeTerms": 0})
+
+    def test_each_resume_is_tokenized_once(self, _write):
+        cands, jobs = self.cands(), self.jobs[:2]   # one tokenization setting
+        with mock.patch("core.batch_ranking.normalize", wraps=scoring.normalize) as normalize:
+            out = batch_ranking.rank_jobs(jobs, cands, top_k=len(cands))
+        self.assertEqual(normalize.call_count, len(jobs) + len(cands))
+        self.assertEqual(len(out[jobs[0].id]), len(cands))
+
+    def test_jobs_share_one_idf(self, _write):
+        cands = self.cands()
+        jobs = self.jobs[:2]
+        out = batch_ranking.rank_jobs(jobs, cands, top_k=5)
+        jd_tfs = [scoring.tf(scoring.tokens(j.jd_text)) for j in jobs]
+        res_tfs = [scoring.tf(scoring.tokens(c["resume_text"])) for c in cands]
+        idf = scoring.build_idf([*jd_tfs, *res_tfs])
+        for job, jd_tf in zip(jobs, jd_tfs):
+            v_jd = scoring.tfidf_vector(jd_tf, idf)
+            want = sorted(((scoring.sparse_cosine(v_jd, scoring.tfidf_vector(r, idf)), -i)
+                           for i, r in enumerate(res_tfs)), reverse=True)[:5]
+            self.assertEqual(len(out[job.id]), 5)
+            for row, (score, neg_i) in zip(out[job.id], want):
+                self.assertAlmostEqual(row["score"], score, places=12)
+
+    def test_endpoint_persists_a_ranking_per_job(self, _write):
+        ids = [j.id for j in self.jobs]
+        pool = list(Candidate.objects.filter(job=self.jobs[1]).values_list("id", flat=True))
+        with mock.patch("core.views.log_ranking_results") as log_results:
+            r = self.client.post("/api/jobs/batch-rank/", {"jobs": ids, "candidates": pool, "top_k": 3}, format="json")
+        self.assertEqual(r.status_code, 200)
+        body = r.json()
+        self.assertEqual([c.args[1].id for c in log_results.call_args_list], ids)
+        self.assertEqual((body["candidates"], body["top_k"]), (len(pool), 3))
+        self.assertEqual([j["job"] for j in body["jobs"]], ids)
+        for entry in body["jobs"]:
+            self.assertEqual(len(entry["results"]), 3)
+            self.assertTrue({row["id"] for row in entry["results"]} <= set(pool))
+            self.assertEqual(Ranking.objects.get(job_id=entry["job"]).results_json, entry["results"])
+        self.assertEqual(self.client.get(f"/api/jobs/{ids[2]}/export.csv/").status_code, 200)
+
+    def test_rejects_foreign_or_bad_input(self, _write):
+        other = User.objects.create_user(username="x@example.com", password="pw")
+        foreign = Job.objects.create(owner=other, title="X", jd_text="python")
+        url = "/api/jobs/batch-rank/"
+        self.assertEqual(self.client.post(url, {"jobs": [self.jobs[0].id, foreign.id]}, format="json").status_code, 404)
+        self.assertEqual(self.client.post(url, {"jobs": []}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"jobs": ["a"]}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"jobs": [self.jobs[0].id], "top_k": 0}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"jobs": [self.jobs[0].id], "candidates": [999999]},
+                                          format="json").status_code, 404)
+        self.assertFalse(Ranking.objects.exists())
+
+
+# ---------- Response rendering, compression, ?fields= ----------
+
+@mock.patch("core.analytics._write")
+class ResponseSizeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="rs@example.com", email="rs@example.com", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = Job.objects.create(owner=self.user, title="Py", jd_text="python django rest api developer")
+        for i in range(40):
+            Candidate.objects.create(job=self.job, name=f"C{i}",
+                                     resume_text=f"python django developer rest api project{i} team{i % 5}")
+        self.url = f"/api/jobs/{self.job.id}/rank/"
+
+    def test_renderer_matches_drf_json(self, _write):
+        data = {"rows": [{"id": 1, "score": 0.25, "name": "Zoë "}], 7: None,
+                "at": timezone.now(), "amount": Decimal("1.5"), "ok": True}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_fields_select_row_keys(self, _write):
+        full = self.client.post(self.url, {}, format="json").json()
+        r = self.client.post(self.url + "?fields=id,name,score", {}, format="json")
+        self.assertEqual(r.json(), [{k: row[k] for k in ("id", "name", "score")} for row in full])
+        self.assertEqual(Ranking.objects.get(job=self.job).results_json, full)  # stored whole
+        bad = self.client.post(self.url + "?fields=id,password", {}, format="json")
+        self.assertEqual(bad.status_code, 400)
+
+        run = self.client.post(self.url, {"async": True}, format="json").json()
+        self.client.post(f"/api/rank-runs/{run['id']}/cancel/")
+        self.assertEqual(self.client.get(f"/api/rank-runs/{run['id']}/results/?fields=nope").status_code, 400)
+
+        batch = self.client.post("/api/jobs/batch-rank/?fields=id,score", {"jobs": [self.job.id], "top_k": 2},
+                                 format="json").json()
+        self.assertEqual([set(row) for row in batch["jobs"][0]["results"]], [{"id", "score"}] * 2)
+
+    def test_large_responses_are_compressed(self, _write):
+        plain = self.client.post(self.url, {}, format="json")
+        self.assertNotIn("Content-Encoding", plain)
+        r = self.client.post(self.url, {}, format="json", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", r["Vary"])
+        self.assertLess(int(r["Content-Length"]), len(plain.content))
+        self.assertEqual(json.loads(gzip_mod.decompress(r.content)), plain.json())
+        r = self.client.post(self.url, {}, format="json", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(r["Content-Encoding"], "br")
+        self.assertEqual(json.loads(brotli.decompress(r.content)), plain.json())
+
+        small = self.client.post(self.url + "?fields=id", {}, format="json", HTTP_ACCEPT_ENCODING="gzip")
+        if len(small.content) < settings.COMPRESS_MIN_BYTES:
+            self.assertNotIn("Content-Encoding", small)
+        with override_settings(COMPRESS_MIN_BYTES=10):
+            tiny = self.client.get("/api/me", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", tiny)
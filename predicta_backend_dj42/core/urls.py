@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from . import async_views
 from .views import (
     JobViewSet,
     CandidateViewSet,
+    RankRunViewSet,
     signup,
     LoginView,
     me,
@@ -15,11 +18,16 @@ from .views import (
     linkedin_job_search,      
     recruiter_analytics,
     analytics_log_event, 
+    analytics_writer_stats,
+    outbox_stats,
+    profile_detail,
+    profile_download,
 )
 
 router = DefaultRouter()
 router.register(r"jobs", JobViewSet, basename="job")
 router.register(r"candidates", CandidateViewSet, basename="candidate")
+router.register(r"rank-runs", RankRunViewSet, basename="rank-run")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -41,4 +49,20 @@ urlpatterns = [
 
     path("analytics/overview/", recruiter_analytics),
     path("analytics/log-event/", analytics_log_event),
+    path("analytics/writer-stats/", analytics_writer_stats),
+    path("outbox/stats/", outbox_stats),
+    path("profiles/<str:profile_id>/", profile_detail),
+    path("profiles/<str:profile_id>/download/", profile_download),
 ]
+
+if settings.ASYNC_VIEWS:
+    # Same URLs served by native async views under ASGI (core/async_views.py).
+    ASYNC_ROUTES = {
+        "external/linkedin-search/": async_views.linkedin_job_search,
+        "analytics/overview/": async_views.recruiter_analytics,
+        "analytics/log-event/": async_views.analytics_log_event,
+    }
+    urlpatterns = [
+        path(str(p.pattern), ASYNC_ROUTES[str(p.pattern)]) if str(p.pattern) in ASYNC_ROUTES else p
+        for p in urlpatterns
+    ]
@@ -1,28 +1,43 @@
+import hmac
+import os
+
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.views.decorators.http import require_GET
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .mongo_storage import save_job_description, save_parsed_resume
-from .linkedin_client import linkedin_client
+
+import stage_timing
+from .linkedin_client import JobProviderError, linkedin_client
 from .analytics import get_recruiter_summary
+from .analytics_writer import get_writer
+from . import outbox
 
-from .models import Job, Candidate, Ranking
+from .models import Job, Candidate, Ranking, RankRun
 from .serializers import (
     JobSerializer, CandidateSerializer, RankingSerializer,
-    SignupSerializer, UserSerializer
+    SignupSerializer, UserSerializer, JobListSerializer, CandidateListSerializer,
+    RankRunSerializer,
 )
+from .listing import ProjectedListMixin
 from .permissions import IsOwner
-from .scoring import rank as rank_fn
+from .embedding_client import EmbeddingServiceError
+from .middleware import profile_store
 from .utils import read_text_from_upload
+from .ingest import collect_files, ingest_files
+from .dedup import index_candidates, duplicate_clusters, similarity
+from . import batch_ranking, fairness, ranking, rank_runs, singleflight
 from .analytics import (
     log_recruiter_login,
     log_job_created,
@@ -135,8 +150,8 @@ def linkedin_job_search(request):
 
     Query params:
       - q: keyword (required)
-      - location: optional
-      - limit: optional (default 10)
+      - location: optional; repeat it to search several locations at once
+      - limit: optional (default 10), per location
 
     Returns a list of simplified jobs from linkedin_client.
     """
@@ -144,18 +159,26 @@ def linkedin_job_search(request):
     if not query.strip():
         return Response({"error": "Missing 'q' query parameter"}, status=400)
 
-    location = request.query_params.get("location", "")
+    locations = request.query_params.getlist("location") or [""]
+    location = locations[0]
     try:
         limit = int(request.query_params.get("limit", 10))
     except ValueError:
         limit = 10
 
-    jobs = linkedin_client.search_jobs(query=query, location=location, limit=limit)
+    try:
+        if len(locations) > 1:
+            jobs = linkedin_client.search_jobs_multi(query=query, locations=locations, limit=limit)
+        else:
+            jobs = linkedin_client.search_jobs(query=query, location=location, limit=limit)
+    except JobProviderError as e:
+        return Response({"error": str(e)}, status=502)
 
     return Response(
         {
             "query": query,
             "location": location,
+            "locations": locations,
             "count": len(jobs),
             "provider_configured": linkedin_client.is_configured(),
             "results": jobs,
@@ -165,31 +188,88 @@ def linkedin_job_search(request):
 
 # ---------- ViewSets ----------
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = JobSerializer
+    list_serializer_class = JobListSerializer
+    heavy_fields = ("jd_text",)
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # ✅ Only show jobs that belong to the logged-in user
-        return Job.objects.filter(owner=self.request.user).order_by("-id")
+        return self.project(Job.objects.filter(owner=self.request.user).order_by("-id"))
 
     def perform_create(self, serializer):
         # ✅ Automatically attach job.owner = current user
-        job = serializer.save(owner=self.request.user)
+        # Atomic so the outbox event (Mongo copy, FR7.1) commits with the job.
+        with transaction.atomic():
+            job = serializer.save(owner=self.request.user)
         log_job_created(self.request.user, job)
-        save_job_description(job)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
 
 
     @action(detail=True, methods=["post"])
     def rank(self, request, pk=None):
+        """
+        Rank the job's candidates.
+
+        mode (body or query): "tfidf" (default), "sbert" (semantic scores
+        from the embedding service) or "cascade" (TF-IDF prefilter to the
+        top_m candidates, then SBERT + ranking-model rerank; optional
+        "top_m" and "weights": {"lexical", "semantic", "model"}).
+
+        collapse_duplicates (body or query): score only one representative
+        per near-duplicate cluster; its row lists the others in "duplicates".
+
+        incremental (body or query, tfidf only): score just the candidates
+        added or changed since the last tfidf run against its frozen IDF and
+        merge them into the stored ranking; falls back to a full rebuild when
+        IDF drift exceeds RANK_IDF_DRIFT_THRESHOLD. The X-Ranking-Update
+        header says which happened ("shared" when another request computed
+        the same input; X-Single-Flight is then "follower"). A follower
+        whose leader is still running after RANK_SINGLEFLIGHT_WAIT gets
+        202 with Retry-After.
+
+        async (body or query): queue a background run and answer 202 with
+        it; poll /api/rank-runs/{id}/ and fetch its results/ when done.
+
+        ?fields=id,name,score returns only those keys of each row (the
+        stored ranking keeps them all).
+
+        fairness (body or query, synchronous only): also compare the TF-IDF
+        rankings with and without PII anonymization (core/fairness.py); the
+        answer is then {"results": [...rows], "fairness": {...}}.
+        """
         job = self.get_object()
-        cands = list(
-            Candidate.objects.filter(job=job).values("id", "name", "email", "resume_text")
-        )
-
-        rows = rank_fn(job.jd_text, cands, job.remove_stopwords, job.anonymize_pii)
-
-        Ranking.objects.update_or_create(job=job, defaults={"results_json": rows})
+        try:
+            opts = ranking.parse_options(request.data, request.query_params)
+            fields = ranking.parse_fields(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if str(request.data.get("async") or request.query_params.get("async") or "").lower() in ("1", "true", "yes"):
+            run = rank_runs.start(job, opts)
+            return Response(RankRunSerializer(run).data, status=202,
+                            headers={"Location": f"/api/rank-runs/{run.id}/"})
+
+        # Overlapping identical requests (double clicks, several workers)
+        # share one computation and one Ranking write.
+        cands = ranking.load_candidates(job)
+        with stage_timing.stage("rank.input_key"):
+            key = singleflight.input_key(job, opts, cands)
+        try:
+            rows, strategy, role = singleflight.run(
+                job, key,
+                lambda: ranking.compute(job, opts, client_id=request.user.id, cands=cands),
+                lambda rows, snapshot: ranking.save(job, rows, snapshot, input_key=key),
+            )
+        except EmbeddingServiceError as e:
+            return Response({"error": str(e)}, status=503)
+        except singleflight.Pending:
+            return Response({"status": "running", "detail": "An identical ranking is in progress; retry shortly."},
+                            status=202, headers={"Retry-After": "1", "X-Single-Flight": singleflight.FOLLOWER})
 
         # 🔹 Existing: high-level event
         log_ranking_run(request.user, job, len(rows))
@@ -197,7 +277,93 @@ class JobViewSet(viewsets.ModelViewSet):
         # 🔹 NEW: detailed top-N analytics snapshot
         log_ranking_results(request.user, job, rows, top_n=10)
 
-        return Response(rows)
+        headers = {"X-Ranking-Update": strategy, "X-Single-Flight": role}
+        if str(request.data.get("fairness") or request.query_params.get("fairness") or "").lower() in ("1", "true", "yes"):
+            report = fairness.analyze(job.jd_text, cands, job.remove_stopwords, job.anonymize_pii)
+            return Response({"results": ranking.project(rows, fields), "fairness": report}, headers=headers)
+        return Response(ranking.project(rows, fields), headers=headers)
+
+
+    @action(detail=False, methods=["post"], url_path="batch-rank")
+    def batch_rank(self, request):
+        """
+        TF-IDF rank one candidate pool against several jobs in one pass
+        (core/batch_ranking.py). Body: "jobs" (ids), optional "candidates"
+        (ids from any of the recruiter's jobs; default: all candidates of
+        the listed jobs) and "top_k". Stores the top_k rows as each job's
+        Ranking and returns them per job (?fields= as for rank).
+        """
+        job_ids = request.data.get("jobs")
+        if not isinstance(job_ids, list) or not job_ids:
+            return Response({"error": "jobs must be a non-empty list of ids"}, status=400)
+        if len(job_ids) > settings.RANK_BATCH_MAX_JOBS:
+            return Response({"error": f"At most {settings.RANK_BATCH_MAX_JOBS} jobs per batch"}, status=400)
+        try:
+            fields = ranking.parse_fields(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        try:
+            top_k = request.data.get("top_k")
+            top_k = settings.RANK_BATCH_TOP_K if top_k is None else int(top_k)
+            jobs = list(Job.objects.filter(owner=request.user, pk__in=job_ids).order_by("id"))
+            pool = Candidate.objects.filter(job__owner=request.user)
+            cand_ids = request.data.get("candidates")
+            if cand_ids is not None:
+                if not isinstance(cand_ids, list):
+                    raise ValueError
+                pool = pool.filter(pk__in=cand_ids)
+            else:
+                pool = pool.filter(job__in=jobs)
+            cands = list(pool.order_by("id").values("id", "name", "email", "resume_text"))
+        except (TypeError, ValueError):
+            return Response({"error": "jobs, candidates and top_k must be integers"}, status=400)
+        if top_k < 1:
+            return Response({"error": "top_k must be positive"}, status=400)
+        if len(jobs) != len(set(map(str, job_ids))):
+            return Response({"error": "Unknown job in jobs"}, status=404)
+        if cand_ids is not None and len(cands) != len(set(map(str, cand_ids))):
+            return Response({"error": "Unknown candidate in candidates"}, status=404)
+
+        results = batch_ranking.rank_jobs(jobs, cands, top_k)
+        batch_ranking.save_all(jobs, results)
+        for job in jobs:
+            log_ranking_run(request.user, job, len(results[job.id]))
+            log_ranking_results(request.user, job, results[job.id], top_n=10)
+        return Response({
+            "candidates": len(cands),
+            "top_k": top_k,
+            "jobs": [{"job": job.id, "title": job.title, "results": ranking.project(results[job.id], fields)}
+                     for job in jobs],
+        })
+
+    @action(detail=True, methods=["get"])
+    def duplicates(self, request, pk=None):
+        """
+        Near-duplicate clusters among the job's candidates. The last member
+        of each cluster (most recent upload) is the representative that
+        rank(collapse_duplicates=true) keeps.
+        """
+        job = self.get_object()
+        clusters = duplicate_clusters(job)
+        ids = [i for cluster in clusters for i in cluster]
+        info = {
+            c["id"]: c for c in
+            Candidate.objects.filter(pk__in=ids).values("id", "name", "email", "minhash", "created_at")
+        }
+        out = []
+        for cluster in clusters:
+            rep = info[cluster[-1]]
+            out.append({
+                "representative": rep["id"],
+                "candidates": [{
+                    "id": i,
+                    "name": info[i]["name"],
+                    "email": info[i]["email"],
+                    "created_at": info[i]["created_at"],
+                    "similarity": round(similarity(info[i]["minhash"], rep["minhash"]), 4),
+                } for i in cluster],
+            })
+        return Response({"job": job.id, "count": len(out), "clusters": out})
 
 
     @action(detail=True, methods=["get"], url_path="export\.csv")
@@ -240,8 +406,10 @@ class JobViewSet(viewsets.ModelViewSet):
         return resp
 
 
-class CandidateViewSet(viewsets.ModelViewSet):
+class CandidateViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = CandidateSerializer
+    list_serializer_class = CandidateListSerializer
+    heavy_fields = ("resume_text", "minhash")
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -250,7 +418,7 @@ class CandidateViewSet(viewsets.ModelViewSet):
         qs = Candidate.objects.filter(job__owner=self.request.user)
         if job_id:
             qs = qs.filter(job_id=job_id)
-        return qs.order_by("-id")
+        return self.project(qs.order_by("-id"))
 
     def create(self, request, *args, **kwargs):
         file = request.FILES.get("file")
@@ -275,16 +443,16 @@ class CandidateViewSet(viewsets.ModelViewSet):
                 # you could also log parsed_ok=False here if you want
                 return Response({"error": str(e)}, status=400)
 
-            cand = Candidate.objects.create(
-                job=job,
-                name=data.get("name", ""),
-                email=data.get("email", ""),
-                resume_text=text,
-                uploaded_file=file,
-            )
-
-            # FR7.1 – store parsed resume text in MongoDB
-            save_parsed_resume(cand)
+            # FR7.1 – the outbox event for the Mongo copy commits with the row
+            with transaction.atomic():
+                cand = Candidate.objects.create(
+                    job=job,
+                    name=data.get("name", ""),
+                    email=data.get("email", ""),
+                    resume_text=text,
+                    uploaded_file=file,
+                )
+            index_candidates([cand])
 
             # FR7.4 – log resume upload to Mongo analytics
             log_resume_uploaded(
@@ -305,11 +473,10 @@ class CandidateViewSet(viewsets.ModelViewSet):
         # validate job owner (keeps current behaviour)
         job = Job.objects.get(pk=ser.validated_data["job"].id, owner=request.user)
 
-        self.perform_create(ser)
+        with transaction.atomic():
+            self.perform_create(ser)
         cand = ser.instance  # Candidate created by serializer
-
-        # FR7.1 – store parsed resume text in MongoDB
-        save_parsed_resume(cand)
+        index_candidates([cand])
 
         # FR7.4 – log JSON-based resume creation
         log_resume_uploaded(
@@ -323,6 +490,89 @@ class CandidateViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(ser.data)
         return Response(ser.data, status=201, headers=headers)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            cand = serializer.save()
+        if "resume_text" in serializer.validated_data:
+            index_candidates([cand], replace=True)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Bulk upload: multipart with `job` plus a zip in `archive` and/or
+        several `files`. Returns a per-file report.
+        """
+        job_id = request.data.get("job")
+        if not job_id:
+            return Response({"error": "job is required"}, status=400)
+        try:
+            job = Job.objects.get(pk=job_id, owner=request.user)
+        except (Job.DoesNotExist, ValueError):
+            return Response({"error": "Invalid job"}, status=404)
+
+        files, errors = collect_files(request)
+        if not files and not errors:
+            return Response({"error": "Send a zip as 'archive' or files as 'files'"}, status=400)
+
+        report = ingest_files(request.user, job, files, report=errors)
+        created = sum(1 for r in report if r["ok"])
+        return Response({
+            "job": job.id,
+            "created": created,
+            "failed": len(report) - created,
+            "results": report,
+        }, status=201 if created else 400)
+
+
+    
+
+class RankRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """Background rank runs (core/rank_runs.py) of the recruiter's jobs."""
+    serializer_class = RankRunSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = RankRun.objects.filter(job__owner=self.request.user)
+        job_id = self.request.query_params.get("job")
+        if job_id:
+            qs = qs.filter(job_id=job_id)
+        return qs.order_by("-id")
+
+    @action(detail=True, methods=["get"])
+    def results(self, request, pk=None):
+        """
+        Rows of a finished run (same shape as a synchronous rank, ?fields=
+        too). 202 while queued or running; 409 for runs that will never
+        produce rows or whose stored ranking has since been replaced (by a
+        newer run, a synchronous rank or a batch rank).
+        """
+        run = self.get_object()
+        try:
+            fields = ranking.parse_fields(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if run.status in RankRun.ACTIVE:
+            return Response(RankRunSerializer(run).data, status=202)
+        rows = (
+            Ranking.objects.filter(job_id=run.job_id, input_key=rank_runs.result_key(run.id))
+            .values_list("results_json", flat=True).first()
+        )
+        if run.status != RankRun.DONE or rows is None:
+            latest = (
+                RankRun.objects.filter(job_id=run.job_id, status=RankRun.DONE)
+                .order_by("-finished_at", "-id").values_list("id", flat=True).first()
+            )
+            return Response({**RankRunSerializer(run).data, "latest_run": latest}, status=409)
+        return Response(ranking.project(rows, fields))
+
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        run = self.get_object()
+        if not rank_runs.cancel(run):
+            return Response({"error": f"Run is already {run.status}"}, status=409)
+        run.refresh_from_db()
+        return Response(RankRunSerializer(run).data)
+
 
     
 
@@ -383,6 +633,44 @@ def recruiter_analytics(request):
     return Response(data, status=200)
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def analytics_writer_stats(request):
+    """Counters of the background analytics writer in this process."""
+    return Response(get_writer().snapshot(), status=200)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def outbox_stats(request):
+    """Replication lag of the Mongo outbox (pending events, oldest age)."""
+    return Response(outbox.lag(), status=200)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    """Summary of a stored request profile (id from X-Profile-Id)."""
+    meta = profile_store().meta(profile_id)
+    if meta is None:
+        return Response({"error": "Profile not found"}, status=404)
+    return Response({**meta, "download": f"/api/profiles/{profile_id}/download/"})
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def profile_download(request, profile_id):
+    """The profile itself: pstats (cprofile mode) or speedscope JSON (sample mode)."""
+    found = profile_store().data_path(profile_id)
+    if found is None:
+        return Response({"error": "Profile not found"}, status=404)
+    path, fmt = found
+    return FileResponse(
+        open(path, "rb"), as_attachment=True, filename=os.path.basename(path),
+        content_type="application/json" if fmt == "speedscope" else "application/octet-stream",
+    )
+
+
 # ------------------------------------------------------
 # Frontend-driven analytics logging
 # ------------------------------------------------------
@@ -403,3 +691,18 @@ def analytics_log_event(request):
 
 
 
+
+
+# ------------------------------------------------------
+# Stage timing histograms (stage_timing.py) for Prometheus
+# ------------------------------------------------------
+@require_GET
+def metrics(request):
+    """This worker's per-stage histograms; scrape every worker (label "worker")."""
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    body = stage_timing.REGISTRY.render("predicta_stage_seconds", worker=os.getpid())
+    return HttpResponse(body, content_type="text/plain; version=0.0.4")
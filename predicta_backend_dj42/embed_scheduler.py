@@ -0,0 +1,238 @@
+# embed_scheduler.py
+"""
+Admission control and fair scheduling for the /embed endpoint.
+
+Every request is split into micro-batches and queued per caller. Dispatchers
+take micro-batches round-robin across callers, so one recruiter ranking
+thousands of resumes cannot starve everyone else. Work is bounded:
+
+- more than `max_queued_per_client` waiting texts for one caller -> 429
+- more than `max_queued_texts` waiting texts in total             -> 503
+- deadline (client timeout) passes before the vectors are ready  -> 503
+
+Nothing is ever answered with degraded vectors; callers get an explicit
+status and can back off (Retry-After) or retry elsewhere.
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class Rejected(Exception):
+    """Raised by `submit` when a request is refused or misses its deadline."""
+
+    def __init__(self, status_code, reason, detail, retry_after=None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Job:
+    __slots__ = ("client", "texts", "deadline", "future", "parts",
+                 "next_start", "remaining", "queued", "done")
+
+    def __init__(self, client, texts, deadline, future, micro_batch):
+        self.client = client
+        self.texts = texts
+        self.deadline = deadline
+        self.future = future
+        n_chunks = (len(texts) + micro_batch - 1) // micro_batch
+        self.parts = [None] * n_chunks
+        self.next_start = 0        # first text not yet handed to a dispatcher
+        self.remaining = n_chunks  # chunks not yet finished
+        self.queued = len(texts)   # texts still waiting in the queue
+        self.done = False
+
+
+class FairScheduler:
+    def __init__(self, encode, max_queued_texts=4096, max_queued_per_client=1024,
+                 micro_batch=32, concurrency=1):
+        self._encode = encode
+        self.max_queued_texts = max_queued_texts
+        self.max_queued_per_client = max_queued_per_client
+        self.micro_batch = max(1, micro_batch)
+        self.concurrency = max(1, concurrency)
+
+        self._queues = {}      # client -> deque[_Job]
+        self._rr = deque()     # clients with queued work, in service order
+        self._queued_by_client = {}
+        self._queued_texts = 0
+        self._inflight = 0
+        self._wakeup = None
+        self._executor = None
+        self._dispatchers = []
+
+        self.counters = {
+            "accepted": 0,
+            "completed": 0,
+            "rejected_client_limit": 0,
+            "rejected_queue_full": 0,
+            "deadline_missed": 0,
+            "errors": 0,
+        }
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="embed"
+        )
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        for q in self._queues.values():
+            for job in q:
+                self._finish(job, error=Rejected(503, "shutdown", "Server shutting down"))
+        self._queues.clear()
+        self._rr.clear()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    # ---------- public API ----------
+
+    async def submit(self, client, texts, timeout):
+        """Queue `texts` for `client`; returns an (n, dim) float32 array."""
+        n = len(texts)
+        client_queued = self._queued_by_client.get(client, 0)
+        if client_queued + n > self.max_queued_per_client:
+            self.counters["rejected_client_limit"] += 1
+            raise Rejected(429, "client_limit",
+                           "Too many queued texts for this caller", retry_after=1)
+        if self._queued_texts + n > self.max_queued_texts:
+            self.counters["rejected_queue_full"] += 1
+            raise Rejected(503, "queue_full", "Embedding queue is full", retry_after=2)
+
+        loop = asyncio.get_running_loop()
+        job = _Job(client, texts, time.monotonic() + timeout,
+                   loop.create_future(), self.micro_batch)
+        self._queues.setdefault(client, deque()).append(job)
+        if client not in self._rr:
+            self._rr.append(client)
+        self._queued_by_client[client] = client_queued + n
+        self._queued_texts += n
+        self.counters["accepted"] += 1
+        self._wakeup.set()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout)
+        except asyncio.TimeoutError:
+            self._drop(job)
+            job.done = True
+            job.future.cancel()
+            self.counters["deadline_missed"] += 1
+            raise Rejected(503, "deadline", "Deadline exceeded before embeddings were ready")
+
+    def snapshot(self):
+        return {
+            "queue_depth_texts": self._queued_texts,
+            "queue_depth_requests": sum(len(q) for q in self._queues.values()),
+            "queued_clients": len(self._rr),
+            "inflight_batches": self._inflight,
+            **self.counters,
+        }
+
+    # ---------- internals ----------
+
+    def _take_chunk(self):
+        """Pop the next (job, start, end) in round-robin order, or None."""
+        while self._rr:
+            client = self._rr.popleft()
+            q = self._queues.get(client)
+            if not q:
+                self._queues.pop(client, None)
+                continue
+            job = q[0]
+            start = job.next_start
+            end = min(start + self.micro_batch, len(job.texts))
+            job.next_start = end
+            if end >= len(job.texts):
+                q.popleft()
+            if q:
+                self._rr.append(client)
+            else:
+                self._queues.pop(client, None)
+            self._account(job, end - start)
+            return job, start, end
+        return None
+
+    def _account(self, job, n):
+        job.queued -= n
+        self._queued_texts -= n
+        left = self._queued_by_client.get(job.client, 0) - n
+        if left > 0:
+            self._queued_by_client[job.client] = left
+        else:
+            self._queued_by_client.pop(job.client, None)
+
+    def _drop(self, job):
+        """Remove a job's un-dispatched chunks from the queue."""
+        q = self._queues.get(job.client)
+        if q and job in q:
+            q.remove(job)
+            if not q:
+                self._queues.pop(job.client, None)
+                if job.client in self._rr:
+                    self._rr.remove(job.client)
+        if job.queued:
+            self._account(job, job.queued)
+        job.next_start = len(job.texts)
+
+    def _finish(self, job, result=None, error=None):
+        if job.done:
+            return
+        job.done = True
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = self._take_chunk()
+            if item is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            job, start, end = item
+            if job.done:
+                continue
+            if time.monotonic() >= job.deadline:
+                # Don't burn CPU on an answer nobody is waiting for.
+                self._drop(job)
+                continue
+
+            self._inflight += 1
+            try:
+                vecs = await loop.run_in_executor(
+                    self._executor, self._encode, job.texts[start:end]
+                )
+            except Exception as e:
+                self.counters["errors"] += 1
+                self._drop(job)
+                self._finish(job, error=e)
+                continue
+            finally:
+                self._inflight -= 1
+
+            job.parts[start // self.micro_batch] = np.asarray(vecs, dtype=np.float32)
+            job.remaining -= 1
+            if job.remaining == 0 and not job.done:
+                self.counters["completed"] += 1
+                self._finish(job, result=np.vstack(job.parts))
@@ -0,0 +1,249 @@
+# embedding_backends.py
+"""
+Inference backends for the SBERT embedding service.
+
+Both backends return L2-normalized sentence embeddings for all-MiniLM-L6-v2,
+so callers can keep using a plain dot product as cosine similarity.
+
+- "torch"     : SentenceTransformer on PyTorch (original behaviour)
+- "onnx"      : the same model exported to ONNX, served by ONNX Runtime
+- "onnx-int8" : the ONNX export with dynamic int8 weight quantization
+
+Select one with EMBED_BACKEND. The ONNX files are exported once from the
+locally cached SentenceTransformer weights:
+
+    python embedding_backends.py export            # fp32 + int8
+    python embedding_backends.py export --no-quantize
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+BASE_DIR = Path(__file__).resolve().parent
+ONNX_DIR = Path(os.getenv("EMBED_ONNX_DIR", BASE_DIR / "onnx_models" / MODEL_NAME))
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+EXPORT_CONFIG_FILE = "export_config.json"
+
+
+def _env_int(name, default=None):
+    value = os.getenv(name, "")
+    try:
+        return int(value) if value.strip() else default
+    except ValueError:
+        return default
+
+
+class TorchBackend:
+    """SentenceTransformer on PyTorch (CPU)."""
+
+    name = "torch"
+
+    def __init__(self, model_name=MODEL_NAME, num_threads=None):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def set_num_threads(self, n):
+        import torch
+        torch.set_num_threads(n)
+
+    def encode(self, texts, batch_size=32):
+        embs = self.model.encode(
+            list(texts), batch_size=batch_size, normalize_embeddings=True
+        )
+        return np.asarray(embs, dtype=np.float32)
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime session over the exported transformer.
+
+    Pooling (attention-masked mean) and L2 normalization are done in numpy,
+    matching the SentenceTransformer pipeline for all-MiniLM-L6-v2.
+    """
+
+    def __init__(self, model_dir=ONNX_DIR, quantized=False,
+                 intra_op_threads=None, inter_op_threads=1):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.model_name = MODEL_NAME
+
+        cfg_path = model_dir / EXPORT_CONFIG_FILE
+        cfg = json.loads(cfg_path.read_text()) if cfg_path.exists() else {}
+        self.max_seq_length = int(cfg.get("max_seq_length", 256))
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # 0 lets ORT size the pool to the physical cores.
+        opts.intra_op_num_threads = intra_op_threads or 0
+        opts.inter_op_num_threads = inter_op_threads or 1
+
+        model_file = model_dir / (ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        self.session = ort.InferenceSession(
+            str(model_file), sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=32):
+        texts = list(texts)
+        out = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            enc = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {
+                k: v.astype(np.int64) for k, v in enc.items() if k in self._input_names
+            }
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            summed = (hidden * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled = summed / counts
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            out.append(pooled / np.clip(norms, 1e-12, None))
+
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(out).astype(np.float32)
+
+
+def export_onnx(model_name=MODEL_NAME, out_dir=ONNX_DIR, quantize=True,
+                local_files_only=True, opset=14):
+    """
+    Export the cached SentenceTransformer weights to ONNX (and optionally int8).
+
+    Only the transformer runs in ONNX; pooling/normalization stay in numpy.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    st = SentenceTransformer(
+        model_name, device="cpu", local_files_only=local_files_only
+    )
+    hf_model = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+
+    sample = tokenizer(
+        ["export sample sentence"], padding=True, return_tensors="pt"
+    )
+    input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids")
+                   if k in sample]
+    dynamic = {name: {0: "batch", 1: "seq"} for name in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    fp32_path = out_dir / ONNX_FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            tuple(sample[k] for k in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    tokenizer.save_pretrained(str(out_dir))
+    (out_dir / EXPORT_CONFIG_FILE).write_text(json.dumps({
+        "model_name": model_name,
+        "max_seq_length": int(st.max_seq_length),
+        "pooling": "mean",
+        "normalize": True,
+    }, indent=2))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            str(fp32_path),
+            str(out_dir / ONNX_INT8_FILE),
+            weight_type=QuantType.QInt8,
+        )
+    return out_dir
+
+
+def backend_name(name=None):
+    return (name or os.getenv("EMBED_BACKEND", "torch")).strip().lower()
+
+
+def backend_is_fork_safe(name=None):
+    """
+    Torch weights are plain tensors: safe to load before fork() and share
+    copy-on-write, as long as no inference ran in the parent. ORT owns native
+    thread pools from session creation, so ONNX sessions are built per process.
+    """
+    return backend_name(name) == "torch"
+
+
+def load_backend(name=None):
+    """
+    Build the backend selected by `name` or EMBED_BACKEND (default "torch").
+
+    Thread counts come from EMBED_INTRA_OP_THREADS / EMBED_INTER_OP_THREADS.
+    A pre-fork launcher should check `backend_is_fork_safe(name)` first.
+    Missing ONNX files are exported on first use.
+    """
+    name = backend_name(name)
+    intra = _env_int("EMBED_INTRA_OP_THREADS")
+
+    if name == "torch":
+        return TorchBackend(MODEL_NAME, num_threads=intra)
+
+    if name in ("onnx", "onnx-int8"):
+        quantized = name == "onnx-int8"
+        wanted = ONNX_DIR / (ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        if not wanted.exists():
+            export_onnx(MODEL_NAME, ONNX_DIR, quantize=quantized)
+        return OnnxBackend(
+            ONNX_DIR,
+            quantized=quantized,
+            intra_op_threads=intra,
+            inter_op_threads=_env_int("EMBED_INTER_OP_THREADS", 1),
+        )
+
+    raise ValueError(f"Unknown EMBED_BACKEND: {name!r}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedding backend utilities")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="Export the cached model to ONNX")
+    exp.add_argument("--out", default=str(ONNX_DIR))
+    exp.add_argument("--no-quantize", action="store_true")
+    exp.add_argument("--allow-download", action="store_true",
+                     help="Fetch weights from the hub if they are not cached")
+    args = parser.parse_args()
+
+    path = export_onnx(
+        MODEL_NAME,
+        args.out,
+        quantize=not args.no_quantize,
+        local_files_only=not args.allow_download,
+    )
+    print(f"Exported {MODEL_NAME} to {path}")
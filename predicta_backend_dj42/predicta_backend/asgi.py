@@ -1,4 +1,6 @@
 import os
 from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'predicta_backend.settings')
+# Route the I/O-bound endpoints to the async views (see settings.ASYNC_VIEWS).
+os.environ.setdefault('ASYNC_VIEWS', '1')
 application = get_asgi_application()
@@ -1,9 +1,12 @@
 import os
+import sys
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent
+TESTING = sys.argv[1:2] == ["test"]
 load_dotenv(BASE_DIR / ".env")
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
@@ -24,15 +27,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.StageTimingMiddleware",  # Server-Timing + /metrics (stage_timing.py)
+    "core.middleware.CompressionMiddleware",  # brotli/gzip for large text/JSON responses
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.middleware.AsyncWhiteNoiseMiddleware",  # whitenoise, async-capable for ASGI
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.ProfilingMiddleware",  # opt-in per request (request_profiler.py)
 ]
 
 ROOT_URLCONF = "predicta_backend.urls"
@@ -59,7 +65,10 @@ WSGI_APPLICATION = "predicta_backend.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.getenv("SQLITE_PATH", str(BASE_DIR / "db.sqlite3")),
+        # File-backed test database: in-memory SQLite shares one cache across
+        # threads and fails concurrent tests with "table is locked".
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -90,7 +99,7 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
-MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", str(BASE_DIR / "media"))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -101,8 +110,17 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",  # orjson; same JSON as DRF's renderer
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
+# Response compression (core.middleware.CompressionMiddleware)
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
 from corsheaders.defaults import default_headers
 CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS",
     "http://127.0.0.1:5500,http://localhost:5500,http://localhost:5173,http://127.0.0.1:5173"
@@ -111,6 +129,111 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
     "authorization",
 ]
 
+# Cascade ranking (POST /api/jobs/{id}/rank/ with mode=cascade)
+RANK_CASCADE_TOP_M = int(os.getenv("RANK_CASCADE_TOP_M", "100"))
+RANK_CASCADE_WEIGHTS = {
+    "lexical": float(os.getenv("RANK_CASCADE_W_LEXICAL", "0.2")),
+    "semantic": float(os.getenv("RANK_CASCADE_W_SEMANTIC", "0.4")),
+    "model": float(os.getenv("RANK_CASCADE_W_MODEL", "0.4")),
+}
+
+# rank(incremental=true): rebuild once the JD's TF-IDF vector drifts this much
+# (relative L1) from the IDF frozen at the last full run (core/incremental.py)
+RANK_IDF_DRIFT_THRESHOLD = float(os.getenv("RANK_IDF_DRIFT_THRESHOLD", "0.05"))
+
+# Identical concurrent rank requests share one computation (core/singleflight.py)
+RANK_SINGLEFLIGHT_LEASE = int(os.getenv("RANK_SINGLEFLIGHT_LEASE", "300"))  # seconds before a dead leader's lock is taken over
+RANK_SINGLEFLIGHT_POLL = float(os.getenv("RANK_SINGLEFLIGHT_POLL", "0.1"))
+RANK_SINGLEFLIGHT_WAIT = float(os.getenv("RANK_SINGLEFLIGHT_WAIT", "15"))  # longest a follower waits before answering 202
+
+# One candidate pool against many jobs (POST /api/jobs/batch-rank/, core/batch_ranking.py)
+RANK_BATCH_TOP_K = int(os.getenv("RANK_BATCH_TOP_K", "50"))
+RANK_BATCH_MAX_JOBS = int(os.getenv("RANK_BATCH_MAX_JOBS", "50"))
+
+# Bulk resume ingestion (POST /api/candidates/bulk/)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 = parse inline
+INGEST_FILE_TIMEOUT = float(os.getenv("INGEST_FILE_TIMEOUT", "20"))
+INGEST_MAX_FILES = int(os.getenv("INGEST_MAX_FILES", "2500"))
+INGEST_MAX_FILE_BYTES = int(os.getenv("INGEST_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+DATA_UPLOAD_MAX_NUMBER_FILES = INGEST_MAX_FILES
+
+# External job feed ingestion (core/job_feed.py, `manage.py ingest_job_feed`)
+JOB_FEED_CHUNK_SIZE = int(os.getenv("JOB_FEED_CHUNK_SIZE", "500"))
+JOB_FEED_PAGE_SIZE = int(os.getenv("JOB_FEED_PAGE_SIZE", "100"))
+
+# Resume parsing (core/parsers.py)
+PARSER_MAX_PAGES = int(os.getenv("PARSER_MAX_PAGES", "30"))
+PARSER_MAX_SECONDS = float(os.getenv("PARSER_MAX_SECONDS", "10"))
+PARSER_CACHE_ALIAS = "parsed_text"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Extracted text keyed by content hash, shared by all processes on the host.
+    "parsed_text": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("PARSER_CACHE_DIR", str(BASE_DIR / "cache" / "parsed_text")),
+        "TIMEOUT": int(os.getenv("PARSER_CACHE_TTL", str(30 * 24 * 3600))),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("PARSER_CACHE_MAX_ENTRIES", "10000"))},
+    },
+}
+
+# Near-duplicate detection (core/dedup.py). 128 permutations in 16 bands of 8
+# rows puts the LSH collision threshold around Jaccard 0.7.
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "3"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+# Background task queue (core/tasks.py, `manage.py run_tasks`)
+TASKS_BATCH_SIZE = int(os.getenv("TASKS_BATCH_SIZE", "64"))
+TASKS_MAX_ATTEMPTS = int(os.getenv("TASKS_MAX_ATTEMPTS", "5"))
+TASKS_RETRY_BACKOFF = float(os.getenv("TASKS_RETRY_BACKOFF", "5"))  # seconds, doubles per attempt
+TASKS_LEASE_SECONDS = int(os.getenv("TASKS_LEASE_SECONDS", "600"))
+PRECOMPUTE_EMBEDDINGS = os.getenv("PRECOMPUTE_EMBEDDINGS", "1") == "1"
+
+# Analytics events are written to Mongo by a background thread (core/analytics_writer.py)
+ANALYTICS_ASYNC = os.getenv("ANALYTICS_ASYNC", "1") == "1"
+ANALYTICS_QUEUE_SIZE = int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000"))
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))
+ANALYTICS_ENQUEUE_TIMEOUT = float(os.getenv("ANALYTICS_ENQUEUE_TIMEOUT", "0"))  # 0 = drop when full
+ANALYTICS_RETRY_INTERVAL = float(os.getenv("ANALYTICS_RETRY_INTERVAL", "30"))
+ANALYTICS_SPOOL_DIR = os.getenv("ANALYTICS_SPOOL_DIR", str(BASE_DIR / "spool" / "analytics"))
+# `manage.py test` never starts the writer thread or spools into the tree;
+# tests mock core.analytics._write (or the log_* helpers) instead.
+if TESTING:
+    ANALYTICS_ASYNC = False
+    ANALYTICS_SPOOL_DIR = tempfile.mkdtemp(prefix="predicta-test-spool-")
+
+# Outbox replication of jobs/candidates to Mongo (`manage.py run_outbox_relay`)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+# GET /api/jobs/ and /api/candidates/ (core/listing.py): cursor pages on -id
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "50"))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "500"))
+
+# Serve the I/O-bound endpoints from native async views (core/async_views.py).
+# asgi.py turns this on; keep it off under WSGI, where each async view would
+# run in a throwaway event loop.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "0") == "1"
+
+# Per-stage timing (stage_timing.py): Server-Timing headers and GET /metrics
+# (Prometheus text). With METRICS_TOKEN set, /metrics needs "Authorization: Bearer <token>".
+STAGE_TIMING = os.getenv("STAGE_TIMING", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# On-demand request profiling (request_profiler.py). Requests are profiled
+# only with an X-Profile token signed with PROFILE_SECRET (`manage.py
+# profile_token`) or ?profile=1 from a staff user; an empty secret disables
+# the header trigger.
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(BASE_DIR / "profiles"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "100"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
 # Email (console for dev)
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@example.com")
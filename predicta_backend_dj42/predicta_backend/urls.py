@@ -5,11 +5,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     # 🔹 All API endpoints (jobs, candidates, auth, ML, LinkedIn, etc.)
     #     are defined in core/urls.py and exposed under /api/
     path("api/", include("core.urls")),
+    path("metrics", metrics),   # Prometheus scrape target (stage_timing.py)
 ]
 
 if settings.DEBUG:
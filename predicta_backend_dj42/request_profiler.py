@@ -0,0 +1,330 @@
+# request_profiler.py
+"""
+Opt-in profiling of single requests, shared by the Django app
+(core.middleware.ProfilingMiddleware) and the embedding servers
+(ProfilingMiddleware below, ASGI). No Django or FastAPI imports.
+
+A request is profiled only when it asks to be:
+- `X-Profile: <token>` signed with PROFILE_SECRET for that path (sign(),
+  `manage.py profile_token`), or
+- `?profile=1` from a staff user (Django only).
+`X-Profile-Mode` / `?profile=<mode>` picks the profiler:
+- "cprofile" (default): deterministic cProfile, stored as a pstats file
+  (`python -m pstats`, snakeviz);
+- "sample": stacks of the request thread every PROFILE_SAMPLE_INTERVAL
+  seconds, stored as speedscope JSON (https://www.speedscope.app).
+Both record the tracemalloc peak for the request. The profile is stored
+under PROFILE_DIR with a JSON summary and its id is returned in the
+X-Profile-Id response header.
+
+One request per process is profiled at a time (cProfile and tracemalloc
+are process-wide); a second trigger meanwhile is served unprofiled with
+`X-Profile-Id: busy`. Requests that do not ask pay one header/query check.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+MODES = ("cprofile", "sample")
+FORMATS = {"cprofile": "pstats", "sample": "speedscope"}
+ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_busy = threading.Lock()
+
+
+# ---------- Signed trigger ----------
+
+def sign(secret, path, ttl=300, now=None):
+    """X-Profile token allowing one path to be profiled for `ttl` seconds."""
+    expires = int((now or time.time()) + ttl)
+    mac = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{mac}"
+
+
+def verify(secret, token, path, now=None):
+    if not secret or not token or "." not in token:
+        return False
+    expires, mac = token.split(".", 1)
+    try:
+        if int(expires) < (now or time.time()):
+            return False
+    except ValueError:
+        return False
+    good = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(mac, good)
+
+
+def parse_mode(value):
+    value = (value or "").lower()
+    return value if value in MODES else "cprofile"
+
+
+# ---------- Capture ----------
+
+class _Sampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name="request-profiler-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames, self.index = [], {}
+        self.samples, self.weights = [], []
+        self._done = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                i = self.index.get(key)
+                if i is None:
+                    i = self.index[key] = len(self.frames)
+                    self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                stack.append(i)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Capture:
+    """Profile the code between start() and stop() on the calling thread."""
+
+    def __init__(self, mode="cprofile", interval=0.005):
+        self.mode = mode
+        self.interval = interval
+        self.peak_memory = 0
+        self.duration = 0.0
+
+    def start(self):
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._t0 = time.perf_counter()
+        if self.mode == "sample":
+            self._profiler = _Sampler(threading.get_ident(), self.interval)
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        if self.mode == "sample":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        self.duration = time.perf_counter() - self._t0
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+
+    def data(self, name):
+        """(bytes to store, summary of the hottest functions)."""
+        if self.mode == "sample":
+            return self._speedscope(name), self._sample_top()
+        self._profiler.create_stats()
+        return marshal.dumps(self._profiler.stats), self._pstats_top()
+
+    def _speedscope(self, name):
+        s = self._profiler
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "predicta request_profiler",
+            "name": name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": s.frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": sum(s.weights),
+                "samples": s.samples, "weights": s.weights,
+            }],
+        }).encode()
+
+    def _sample_top(self, n=15):
+        s = self._profiler
+        self_time = {}
+        for stack, w in zip(s.samples, s.weights):
+            if stack:
+                self_time[stack[-1]] = self_time.get(stack[-1], 0.0) + w
+        top = sorted(self_time.items(), key=lambda kv: -kv[1])[:n]
+        return [
+            {"function": f"{s.frames[i]['file']}:{s.frames[i]['line']}({s.frames[i]['name']})",
+             "self_seconds": round(t, 6)}
+            for i, t in top
+        ]
+
+    def _pstats_top(self, n=15):
+        stats = pstats.Stats(self._profiler, stream=io.StringIO()).sort_stats("cumulative")
+        top = []
+        for func in stats.fcn_list[:n]:
+            cc, nc, tt, ct, _ = stats.stats[func]
+            top.append({"function": pstats.func_std_string(func), "calls": nc,
+                        "tottime": round(tt, 6), "cumtime": round(ct, 6)})
+        return top
+
+
+def try_start(mode, interval):
+    """A started Capture, or None when another request is being profiled."""
+    if not _busy.acquire(blocking=False):
+        return None
+    capture = Capture(mode, interval)
+    try:
+        capture.start()
+    except Exception:
+        _busy.release()
+        raise
+    return capture
+
+
+def finish(capture):
+    try:
+        capture.stop()
+    finally:
+        _busy.release()
+
+
+# ---------- Storage ----------
+
+class ProfileStore:
+    """Profiles on disk: <id>.<pstats|speedscope.json> plus <id>.json summary."""
+
+    def __init__(self, directory, max_stored=100):
+        self.directory = str(directory)
+        self.max_stored = max_stored
+
+    def save(self, capture, method, path, status):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = uuid.uuid4().hex
+        data, top = capture.data(f"{method} {path}")
+        fmt = FORMATS[capture.mode]
+        with open(self._file(profile_id, fmt), "wb") as f:
+            f.write(data)
+        meta = {
+            "id": profile_id, "created_at": time.time(), "method": method, "path": path,
+            "status": status, "mode": capture.mode, "format": fmt,
+            "duration_ms": round(capture.duration * 1000, 3),
+            "peak_memory_bytes": capture.peak_memory, "pid": os.getpid(), "top": top,
+        }
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+            json.dump(meta, f)
+        self._prune()
+        return profile_id
+
+    def meta(self, profile_id):
+        if not ID_RE.match(profile_id or ""):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def data_path(self, profile_id):
+        """(path, format) of the stored profile, or None."""
+        meta = self.meta(profile_id)
+        if meta is None:
+            return None
+        return self._file(profile_id, meta["format"]), meta["format"]
+
+    def _file(self, profile_id, fmt):
+        ext = "speedscope.json" if fmt == "speedscope" else "pstats"
+        return os.path.join(self.directory, f"{profile_id}.{ext}")
+
+    def _prune(self):
+        metas = sorted(
+            (e for e in os.scandir(self.directory) if e.name.endswith(".json")
+             and ID_RE.match(e.name[:32]) and e.name[32:] == ".json"),
+            key=lambda e: e.stat().st_mtime,
+        )
+        for entry in metas[:max(0, len(metas) - self.max_stored)]:
+            pid = entry.name[:32]
+            for name in os.listdir(self.directory):
+                if name.startswith(pid):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+
+
+# ---------- ASGI (embedding servers) ----------
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware for the FastAPI apps: profiles requests carrying a
+    valid signed X-Profile header. Configured from PROFILE_SECRET,
+    PROFILE_DIR, PROFILE_SAMPLE_INTERVAL and PROFILE_MAX_STORED.
+    """
+
+    def __init__(self, app, secret=None, store=None, interval=None):
+        self.app = app
+        self.secret = secret if secret is not None else os.getenv("PROFILE_SECRET", "")
+        self.store = store or ProfileStore(
+            os.getenv("PROFILE_DIR", "profiles"), int(os.getenv("PROFILE_MAX_STORED", "100"))
+        )
+        self.interval = interval or float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.secret:
+            return await self.app(scope, receive, send)
+        token = mode = None
+        for k, v in scope.get("headers", ()):
+            if k == b"x-profile":
+                token = v.decode("latin-1")
+            elif k == b"x-profile-mode":
+                mode = v.decode("latin-1")
+        if token is None or not verify(self.secret, token, scope["path"]):
+            return await self.app(scope, receive, send)
+
+        capture = try_start(parse_mode(mode), self.interval)
+        if capture is None:
+            return await self.app(scope, receive, _with_header(send, b"busy"))
+
+        status, held = [500], []
+
+        async def hold(message):
+            # Keep the response until the profile is stored so X-Profile-Id can be set.
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            held.append(message)
+
+        try:
+            await self.app(scope, receive, hold)
+        finally:
+            finish(capture)
+        profile_id = self.store.save(capture, scope["method"], scope["path"], status[0])
+        forward = _with_header(send, profile_id.encode())
+        for message in held:
+            await forward(message)
+
+
+def _with_header(send, profile_id):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id)]}
+        await send(message)
+    return wrapped
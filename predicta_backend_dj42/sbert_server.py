@@ -1,10 +1,25 @@
 # sbert_server.py
+import os
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sentence_transformers import SentenceTransformer
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+
+import request_profiler
+import stage_timing
+from embed_scheduler import FairScheduler, Rejected
+from embedding_backends import MODEL_NAME, load_backend
 
 app = FastAPI()
 
+# Server-Timing header per request, histograms on /metrics (STAGE_TIMING=0 to disable)
+app.add_middleware(stage_timing.ServerTimingMiddleware)
+# Opt-in profiling of single requests signed with PROFILE_SECRET (request_profiler.py)
+profile_store = request_profiler.ProfileStore(
+    os.getenv("PROFILE_DIR", "profiles"), int(os.getenv("PROFILE_MAX_STORED", "100"))
+)
+app.add_middleware(request_profiler.ProfilingMiddleware, store=profile_store)
+
 # Allow your frontend
 app.add_middleware(
     CORSMiddleware,
@@ -17,39 +32,198 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-MODEL_NAME = "all-MiniLM-L6-v2"
-model = SentenceTransformer(MODEL_NAME)
+# EMBED_BACKEND = torch | onnx | onnx-int8 (see embedding_backends.py)
+backend = None
+scheduler = None
+_ready = False
+
+# Admission control (see embed_scheduler.py)
+MAX_QUEUED_TEXTS = int(os.getenv("EMBED_MAX_QUEUED_TEXTS", "4096"))
+MAX_QUEUED_PER_CLIENT = int(os.getenv("EMBED_MAX_QUEUED_PER_CLIENT", "1024"))
+MAX_TEXTS_PER_REQUEST = int(os.getenv("EMBED_MAX_TEXTS_PER_REQUEST", "1024"))
+MICRO_BATCH = int(os.getenv("EMBED_MICRO_BATCH", "32"))
+CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "1"))
+DEFAULT_TIMEOUT = float(os.getenv("EMBED_DEFAULT_TIMEOUT", "30"))
+MAX_TIMEOUT = float(os.getenv("EMBED_MAX_TIMEOUT", "120"))
+
+
+def init_backend():
+    """
+    Load the inference backend once per process.
+
+    serve_embeddings.py calls this in the master before forking workers so
+    the torch weights are shared copy-on-write; plain `uvicorn sbert_server:app`
+    loads it in the startup hook below.
+    """
+    global backend
+    if backend is None:
+        backend = load_backend()
+    return backend
+
+
+@app.on_event("startup")
+async def _startup():
+    global scheduler, _ready
+    init_backend()
+    # Warm up in the serving process (never in a pre-fork master: thread
+    # pools started before fork() don't survive in the children).
+    backend.encode(["warm-up"])
+    scheduler = FairScheduler(
+        stage_timing.timed("embed.encode")(backend.encode),
+        max_queued_texts=MAX_QUEUED_TEXTS,
+        max_queued_per_client=MAX_QUEUED_PER_CLIENT,
+        micro_batch=MICRO_BATCH,
+        concurrency=CONCURRENCY,
+    )
+    await scheduler.start()
+    _ready = True
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    global _ready
+    _ready = False
+    if scheduler is not None:
+        await scheduler.stop()
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the worker process is up and serving its event loop."""
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: the model is loaded and warmed up in this worker."""
+    if not _ready:
+        return JSONResponse({"status": "loading", "pid": os.getpid()}, status_code=503)
+    return {"status": "ready", "pid": os.getpid(), "backend": backend.name}
+
+
+def _client_key(request):
+    """Fairness key: explicit X-Client-Id (e.g. one per recruiter), else peer IP."""
+    return request.headers.get("x-client-id") or (
+        request.client.host if request.client else "anonymous"
+    )
+
+
+def _request_timeout(request):
+    """Seconds from the X-Request-Timeout header, capped at EMBED_MAX_TIMEOUT."""
+    raw = request.headers.get("x-request-timeout")
+    try:
+        timeout = float(raw) if raw else DEFAULT_TIMEOUT
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be seconds")
+    return min(max(timeout, 0.0), MAX_TIMEOUT)
 
 
 @app.post("/embed")
 async def embed(request: Request):
     """
     Expected JSON body: { "texts": ["...", "..."] }
-    Returns: { "embeddings": [[...], [...]], "dim": int, "model": str }
+    Optional headers: X-Client-Id (fair-share key), X-Request-Timeout (seconds)
+    Returns: { "embeddings": [[...], [...]], "dim": int, "model": str, "backend": str }
+
+    429 = this caller already has too much queued, 503 = server queue full or
+    the deadline passed before the vectors were ready. Both carry Retry-After
+    where a retry makes sense.
     """
-    body = await request.json()
+    if scheduler is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
+
+    with stage_timing.stage("embed.parse"):
+        body = await request.json()
 
     texts = body.get("texts")
     if not isinstance(texts, list):
         raise HTTPException(status_code=400, detail="Field 'texts' must be a list")
 
     if not texts:
-        return {"embeddings": [], "dim": 0, "model": MODEL_NAME}
+        return {"embeddings": [], "dim": 0, "model": MODEL_NAME, "backend": backend.name}
+
+    if len(texts) > MAX_TEXTS_PER_REQUEST:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_TEXTS_PER_REQUEST} texts per request",
+        )
 
     # Coerce everything to string
     texts = [str(t) for t in texts]
 
+    timeout = _request_timeout(request)
+    if timeout <= 0:
+        scheduler.counters["deadline_missed"] += 1
+        raise HTTPException(status_code=503, detail="Deadline already expired")
+
     try:
-        embs = model.encode(texts, normalize_embeddings=True)
-        embs_list = embs.tolist()
-        dim = len(embs_list[0])
-        return {"embeddings": embs_list, "dim": dim, "model": MODEL_NAME}
+        with stage_timing.stage("embed.wait"):
+            embs = await scheduler.submit(_client_key(request), texts, timeout)
+    except Rejected as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        return JSONResponse(
+            {"detail": e.detail, "reason": e.reason},
+            status_code=e.status_code,
+            headers=headers,
+        )
     except Exception as e:
-        # 🔁 Safe fallback so frontend doesn't break in demo:
-        # use simple 1D "length" embeddings if SBERT crashes.
-        dummy = [[float(len(t))] for t in texts]
-        return {
-            "embeddings": dummy,
-            "dim": 1,
-            "model": f"{MODEL_NAME}-fallback",
-        }
+        # No silent fallback vectors: a failed encode is a server error.
+        raise HTTPException(status_code=500, detail=f"Embedding failed: {e}")
+
+    with stage_timing.stage("embed.serialize"):
+        vectors = embs.tolist()
+    return {
+        "embeddings": vectors,
+        "dim": int(embs.shape[1]),
+        "model": MODEL_NAME,
+        "backend": backend.name,
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """Per-worker admission metrics and stage histograms in Prometheus text format."""
+    snap = scheduler.snapshot() if scheduler else {}
+    pid = os.getpid()
+    lines = []
+    gauges = ("queue_depth_texts", "queue_depth_requests",
+              "queued_clients", "inflight_batches")
+    for name in gauges:
+        lines += [f"# TYPE embed_{name} gauge",
+                  f'embed_{name}{{worker="{pid}"}} {snap.get(name, 0)}']
+    lines += ["# TYPE embed_requests_total counter"]
+    for outcome in ("accepted", "completed", "errors"):
+        lines.append(
+            f'embed_requests_total{{worker="{pid}",outcome="{outcome}"}} '
+            f"{snap.get(outcome, 0)}"
+        )
+    lines += ["# TYPE embed_rejections_total counter"]
+    for reason in ("client_limit", "queue_full"):
+        lines.append(
+            f'embed_rejections_total{{worker="{pid}",reason="{reason}"}} '
+            f'{snap.get("rejected_" + reason, 0)}'
+        )
+    lines += ["# TYPE embed_deadline_misses_total counter",
+              f'embed_deadline_misses_total{{worker="{pid}"}} {snap.get("deadline_missed", 0)}']
+    body = "\n".join(lines) + "\n" + stage_timing.REGISTRY.render("embed_stage_seconds", worker=pid)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/profiles/{profile_id}")
+def profile(profile_id: str, request: Request, download: bool = False):
+    """
+    A profile stored by this server (id from X-Profile-Id). Needs a token
+    signed for this path (`manage.py profile_token /profiles/<id>`) in
+    X-Profile-Auth; X-Profile would profile the download itself.
+    """
+    secret = os.getenv("PROFILE_SECRET", "")
+    if not request_profiler.verify(secret, request.headers.get("x-profile-auth"), request.url.path):
+        raise HTTPException(status_code=403, detail="Signed X-Profile-Auth header required")
+    meta = profile_store.meta(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not download:
+        return meta
+    path, fmt = profile_store.data_path(profile_id)
+    return FileResponse(path, filename=os.path.basename(path),
+                        media_type="application/json" if fmt == "speedscope" else "application/octet-stream")
@@ -0,0 +1,175 @@
+# serve_embeddings.py
+"""
+Production launcher for the SBERT embedding service (sbert_server.py).
+
+    python serve_embeddings.py --workers 8 --threads 4 --port 8001
+
+- binds the listening socket once and pre-forks N uvicorn workers on it
+- loads the torch weights in the master before fork(), so every worker
+  shares one copy-on-write copy (ONNX sessions are created per worker)
+- pins torch / OpenMP / BLAS threads per worker, and optionally each
+  worker's CPU affinity to its own slice of cores (--pin-cpus)
+- restarts workers that die; SIGTERM/SIGINT drain and stop all of them
+
+Defaults: EMBED_THREADS_PER_WORKER (1) and EMBED_WORKERS (cores // threads).
+Probe /healthz (liveness) and /readyz (readiness) on the shared port.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def _available_cpus():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:  # non-Linux
+        return list(range(os.cpu_count() or 1))
+
+
+def parse_args(argv=None):
+    cpus = len(_available_cpus())
+    threads = int(os.getenv("EMBED_THREADS_PER_WORKER", "1"))
+    parser = argparse.ArgumentParser(description="Pre-fork SBERT embedding server")
+    parser.add_argument("--host", default=os.getenv("EMBED_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("EMBED_PORT", "8001")))
+    parser.add_argument("--threads", type=int, default=threads,
+                        help="torch/BLAS threads per worker")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("EMBED_WORKERS", "0")) or None,
+                        help="worker processes (default: cores // threads)")
+    parser.add_argument("--pin-cpus", action="store_true",
+                        help="give each worker its own contiguous block of cores")
+    parser.add_argument("--backlog", type=int, default=2048)
+    args = parser.parse_args(argv)
+    args.threads = max(1, args.threads)
+    args.workers = max(1, args.workers or cpus // args.threads)
+    return args
+
+
+def pin_threads(threads):
+    """Must run before torch / numpy are imported to cap their pools."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ["EMBED_INTRA_OP_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+
+def bind_socket(host, port, backlog):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index, sock, args):
+    """Child process body: never returns."""
+    import uvicorn
+    import sbert_server
+
+    if args.pin_cpus:
+        cpus = _available_cpus()
+        start = (index * args.threads) % len(cpus)
+        block = {cpus[(start + i) % len(cpus)] for i in range(args.threads)}
+        os.sched_setaffinity(0, block)
+
+    if sbert_server.backend is not None and hasattr(sbert_server.backend, "set_num_threads"):
+        sbert_server.backend.set_num_threads(args.threads)
+
+    config = uvicorn.Config(
+        sbert_server.app,
+        lifespan="on",
+        log_level=os.getenv("EMBED_LOG_LEVEL", "info"),
+        timeout_keep_alive=30,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    os._exit(0)
+
+
+class Master:
+    def __init__(self, args, sock):
+        self.args = args
+        self.sock = sock
+        self.children = {}  # pid -> worker index
+        self.stopping = False
+
+    def spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, self.sock, self.args)
+            finally:
+                os._exit(1)
+        self.children[pid] = index
+        return pid
+
+    def stop(self, *_):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for i in range(self.args.workers):
+            self.spawn(i)
+        print(
+            f"[serve_embeddings] master {os.getpid()} serving "
+            f"{self.args.host}:{self.args.port} with {self.args.workers} workers "
+            f"x {self.args.threads} threads",
+            flush=True,
+        )
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            print(f"[serve_embeddings] worker {pid} exited ({status}); restarting",
+                  flush=True)
+            time.sleep(1.0)  # avoid a tight crash loop
+            self.spawn(index)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pin_threads(args.threads)
+
+    import embedding_backends
+    import sbert_server
+
+    if embedding_backends.backend_is_fork_safe():
+        sbert_server.init_backend()
+        # Move everything allocated so far out of the GC's reach so the
+        # collector in each worker doesn't touch (and un-share) those pages.
+        gc.collect()
+        gc.freeze()
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    Master(args, sock).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# stage_timing.py
+"""
+Lightweight per-stage timing, shared by the Django app (core/) and the
+embedding servers (sbert_server.py). No Django or FastAPI imports.
+
+    with stage("tfidf.idf"):          # or @timed("rank.save") on a function
+        ...
+
+Inside a request (begin()/finish(), done by core.middleware.StageTimingMiddleware
+and ServerTimingMiddleware below) durations are summed per stage name and
+reported twice when the request ends: as a Server-Timing response header and
+as one observation per stage in the process histograms. Outside a request
+(task workers, executor threads) each stage is observed directly. Stages may
+nest; each one reports its own wall time.
+
+render() writes the histograms in Prometheus text format for /metrics.
+
+STAGE_TIMING=0 (or configure(False)) turns it all off: stage() returns a
+shared no-op context manager and timed() wrappers call straight through,
+so the instrumented code pays one flag check per call.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.getenv("STAGE_TIMING", "1").lower() in ("1", "true", "yes")
+_current = contextvars.ContextVar("stage_timings", default=None)
+
+
+def configure(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def enabled():
+    return _enabled
+
+
+class Histograms:
+    """Per-stage latency histograms (seconds) for this process."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._data = {}   # stage -> [per-bucket counts (+ overflow), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            h = self._data.get(name)
+            if h is None:
+                h = self._data[name] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            h[0][bisect_left(self.buckets, seconds)] += 1
+            h[1] += seconds
+            h[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: (list(h[0]), h[1], h[2]) for name, h in self._data.items()}
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+    def render(self, metric, **labels):
+        """Prometheus text exposition of every stage as `metric`{stage=...}."""
+        base = "".join(f'{k}="{v}",' for k, v in labels.items())
+        lines = [f"# HELP {metric} Wall time spent per stage.", f"# TYPE {metric} histogram"]
+        for name, (counts, total, n) in sorted(self.snapshot().items()):
+            cum = 0
+            for le, c in zip(self.buckets, counts):
+                cum += c
+                lines.append(f'{metric}_bucket{{{base}stage="{name}",le="{le:g}"}} {cum}')
+            lines.append(f'{metric}_bucket{{{base}stage="{name}",le="+Inf"}} {n}')
+            lines.append(f'{metric}_sum{{{base}stage="{name}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{{base}stage="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Histograms()
+
+
+def record(name, seconds):
+    timings = _current.get()
+    if timings is None:
+        REGISTRY.observe(name, seconds)
+    else:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, perf_counter() - self.t0)
+        return False
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+def stage(name):
+    """Context manager timing the enclosed block as `name`."""
+    return _Stage(name) if _enabled else _NOOP
+
+
+def timed(name):
+    """Decorator: time every call of a function (or coroutine function) as `name`."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                t0 = perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    record(name, perf_counter() - t0)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+# ---------- Request scope ----------
+
+def begin():
+    """Start collecting for the current request; None when timing is off."""
+    if not _enabled:
+        return None
+    return _current.set({})
+
+
+def current():
+    """Stage totals collected so far in this request (empty outside one)."""
+    return dict(_current.get() or {})
+
+
+def finish(token, total):
+    """End the request: observe its stages plus "total"; returns them."""
+    timings = _current.get() or {}
+    _current.reset(token)
+    timings["total"] = total
+    for name, seconds in timings.items():
+        REGISTRY.observe(name, seconds)
+    return timings
+
+
+def server_timing(timings):
+    """Server-Timing header value, milliseconds per stage."""
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware (for the FastAPI embedding apps): request scope + header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            return await self.app(scope, receive, send)
+        token = begin()
+        t0 = perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timings = {**current(), "total": perf_counter() - t0}
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            finish(token, perf_counter() - t0)
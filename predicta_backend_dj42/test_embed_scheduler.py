@@ -0,0 +1,93 @@
+# test_embed_scheduler.py
+"""Admission control / fairness tests for embed_scheduler (no model needed)."""
+import asyncio
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from embed_scheduler import FairScheduler, Rejected
+
+
+class FakeEncoder:
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+        if self.fail_on and self.fail_on in texts:
+            raise RuntimeError("boom")
+        time.sleep(self.delay)
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+class FairSchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def _make(self, encoder, **kw):
+        sched = FairScheduler(encoder, **kw)
+        await sched.start()
+        self.addAsyncCleanup(sched.stop)
+        return sched
+
+    async def test_results_are_reassembled_in_order(self):
+        sched = await self._make(FakeEncoder(), micro_batch=2)
+        texts = ["a" * i for i in range(1, 8)]
+        out = await sched.submit("c1", texts, timeout=5)
+        self.assertEqual(out[:, 0].tolist(), [float(i) for i in range(1, 8)])
+        self.assertEqual(sched.snapshot()["completed"], 1)
+        self.assertEqual(sched.snapshot()["queue_depth_texts"], 0)
+
+    async def test_small_caller_is_not_starved_by_big_batch(self):
+        enc = FakeEncoder(delay=0.01)
+        sched = await self._make(enc, micro_batch=4)
+        big = asyncio.create_task(sched.submit("bulk", ["x"] * 80, timeout=10))
+        await asyncio.sleep(0)  # let the bulk job get queued first
+        await sched.submit("interactive", ["y"], timeout=10)
+        # The interactive text was served within the first couple of batches,
+        # not after all 20 bulk micro-batches.
+        first_y = next(i for i, c in enumerate(enc.calls) if "y" in c)
+        self.assertLessEqual(first_y, 2)
+        await big
+
+    async def test_per_client_limit_returns_429(self):
+        sched = await self._make(FakeEncoder(delay=0.05), max_queued_per_client=10)
+        first = asyncio.create_task(sched.submit("c1", ["a"] * 10, timeout=5))
+        await asyncio.sleep(0)
+        with self.assertRaises(Rejected) as ctx:
+            await sched.submit("c1", ["a"] * 5, timeout=5)
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertEqual(sched.snapshot()["rejected_client_limit"], 1)
+        await first
+
+    async def test_global_limit_returns_503(self):
+        sched = await self._make(FakeEncoder(delay=0.05), max_queued_texts=10)
+        first = asyncio.create_task(sched.submit("c1", ["a"] * 10, timeout=5))
+        await asyncio.sleep(0)
+        with self.assertRaises(Rejected) as ctx:
+            await sched.submit("c2", ["b"] * 5, timeout=5)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(ctx.exception.reason, "queue_full")
+        await first
+
+    async def test_deadline_miss_frees_queue(self):
+        sched = await self._make(FakeEncoder(delay=0.05), micro_batch=1)
+        with self.assertRaises(Rejected) as ctx:
+            await sched.submit("c1", ["a"] * 20, timeout=0.06)
+        self.assertEqual(ctx.exception.reason, "deadline")
+        snap = sched.snapshot()
+        self.assertEqual(snap["deadline_missed"], 1)
+        self.assertEqual(snap["queue_depth_texts"], 0)
+
+    async def test_encoder_failure_is_an_error_not_fake_vectors(self):
+        sched = await self._make(FakeEncoder(fail_on="bad"))
+        with self.assertRaises(RuntimeError):
+            await sched.submit("c1", ["ok", "bad"], timeout=5)
+        self.assertEqual(sched.snapshot()["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# test_embedding_backends.py
+"""
+Parity checks between the PyTorch and ONNX Runtime embedding backends.
+
+Needs torch, sentence-transformers, onnxruntime and the cached
+all-MiniLM-L6-v2 weights; skipped otherwise. The ONNX export is written to a
+temporary directory so the test never touches onnx_models/.
+"""
+import importlib.util
+import tempfile
+import unittest
+
+import numpy as np
+
+import embedding_backends as eb
+
+HAS_DEPS = all(
+    importlib.util.find_spec(m) is not None
+    for m in ("torch", "sentence_transformers", "onnxruntime", "onnx", "transformers")
+)
+
+SAMPLES = [
+    "Senior Python developer with Django, REST APIs and AWS experience.",
+    "Data scientist: NLP, sentence-bert, xgboost, pandas and numpy.",
+    "Frontend engineer skilled in React and JavaScript.",
+    "short",
+    "Managed a team of 12 engineers delivering microservices on Docker " * 20,
+]
+
+FP32_MIN_COSINE = 0.999
+INT8_MIN_COSINE = 0.98
+
+
+@unittest.skipUnless(HAS_DEPS, "torch / onnxruntime stack not installed")
+class OnnxParityTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.torch_backend = eb.TorchBackend()
+        except Exception as e:  # weights not cached and no network
+            raise unittest.SkipTest(f"model weights unavailable: {e}")
+        cls.tmp = tempfile.TemporaryDirectory()
+        eb.export_onnx(out_dir=cls.tmp.name, quantize=True)
+        cls.reference = cls.torch_backend.encode(SAMPLES)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def _assert_parity(self, backend, threshold):
+        got = backend.encode(SAMPLES)
+        self.assertEqual(got.shape, self.reference.shape)
+        np.testing.assert_allclose(np.linalg.norm(got, axis=1), 1.0, atol=1e-4)
+        cos = (got * self.reference).sum(axis=1)
+        self.assertGreaterEqual(float(cos.min()), threshold, cos)
+
+    def test_fp32_matches_torch(self):
+        self._assert_parity(eb.OnnxBackend(self.tmp.name), FP32_MIN_COSINE)
+
+    def test_int8_close_to_torch(self):
+        self._assert_parity(eb.OnnxBackend(self.tmp.name, quantized=True), INT8_MIN_COSINE)
+
+    def test_batching_does_not_change_vectors(self):
+        backend = eb.OnnxBackend(self.tmp.name)
+        one_by_one = np.vstack([backend.encode([t]) for t in SAMPLES])
+        batched = backend.encode(SAMPLES, batch_size=len(SAMPLES))
+        np.testing.assert_allclose(one_by_one, batched, atol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+# test_request_profiler.py
+"""Request profiler: signed trigger, capture formats, store, ASGI middleware."""
+import json
+import os
+import pstats
+import tempfile
+import time
+import unittest
+
+import request_profiler
+from request_profiler import Capture, ProfileStore, ProfilingMiddleware, sign, verify
+
+
+def busy_work():
+    blob = [bytearray(1024) for _ in range(2000)]   # ~2 MB, shows up in the peak
+    deadline = time.perf_counter() + 0.05
+    n = 0
+    while time.perf_counter() < deadline:
+        n += sum(range(100))
+    return len(blob), n
+
+
+class SigningTests(unittest.TestCase):
+    def test_token_is_bound_to_path_secret_and_expiry(self):
+        token = sign("k", "/api/jobs/1/rank/", ttl=60, now=1000)
+        self.assertTrue(verify("k", token, "/api/jobs/1/rank/", now=1059))
+        self.assertFalse(verify("k", token, "/api/jobs/1/rank/", now=1061))
+        self.assertFalse(verify("k", token, "/api/jobs/2/rank/", now=1000))
+        self.assertFalse(verify("other", token, "/api/jobs/1/rank/", now=1000))
+        self.assertFalse(verify("", token, "/api/jobs/1/rank/", now=1000))
+        self.assertFalse(verify("k", "garbage", "/x"))
+
+
+class CaptureTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = ProfileStore(self.dir, max_stored=2)
+
+    def test_cprofile_is_stored_as_pstats_with_peak_memory(self):
+        cap = Capture("cprofile")
+        cap.start()
+        busy_work()
+        cap.stop()
+        pid = self.store.save(cap, "POST", "/api/jobs/1/rank/", 200)
+        meta = self.store.meta(pid)
+        self.assertGreater(meta["peak_memory_bytes"], 1_500_000)
+        self.assertEqual((meta["format"], meta["status"]), ("pstats", 200))
+        self.assertTrue(any("busy_work" in t["function"] for t in meta["top"]))
+        path, fmt = self.store.data_path(pid)
+        stats = pstats.Stats(path)
+        self.assertTrue(any(f[2] == "busy_work" for f in stats.stats))
+
+    def test_sample_mode_writes_speedscope(self):
+        cap = Capture("sample", interval=0.002)
+        cap.start()
+        busy_work()
+        cap.stop()
+        path, fmt = self.store.data_path(self.store.save(cap, "GET", "/x", 200))
+        with open(path) as f:
+            doc = json.load(f)
+        self.assertEqual(fmt, "speedscope")
+        prof = doc["profiles"][0]
+        self.assertEqual(prof["type"], "sampled")
+        self.assertGreater(len(prof["samples"]), 5)
+        self.assertEqual(len(prof["samples"]), len(prof["weights"]))
+        names = {doc["shared"]["frames"][i]["name"] for s in prof["samples"] for i in s}
+        self.assertIn("busy_work", names)
+
+    def test_store_prunes_and_rejects_bad_ids(self):
+        ids = []
+        for _ in range(3):
+            cap = Capture()
+            cap.start()
+            cap.stop()
+            ids.append(self.store.save(cap, "GET", "/x", 200))
+            time.sleep(0.01)
+        self.assertIsNone(self.store.meta(ids[0]))
+        self.assertIsNotNone(self.store.meta(ids[2]))
+        self.assertEqual(len(os.listdir(self.dir)), 4)
+        self.assertIsNone(self.store.meta("../../etc/passwd"))
+
+    def test_one_capture_at_a_time(self):
+        cap = request_profiler.try_start("cprofile", 0.005)
+        try:
+            self.assertIsNone(request_profiler.try_start("cprofile", 0.005))
+        finally:
+            request_profiler.finish(cap)
+        request_profiler.finish(request_profiler.try_start("cprofile", 0.005))
+
+
+class ProfilingMiddlewareTests(unittest.IsolatedAsyncioTestCase):
+    async def call(self, middleware, headers):
+        async def app(scope, receive, send):
+            busy_work()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/embed", "headers": headers}
+        await middleware(app)(scope, None, send)
+        return dict(sent[0]["headers"]), sent
+
+    async def test_signed_requests_only(self):
+        store = ProfileStore(tempfile.mkdtemp())
+        mw = lambda app: ProfilingMiddleware(app, secret="k", store=store)
+
+        headers, sent = await self.call(mw, [])
+        self.assertNotIn(b"x-profile-id", headers)
+
+        headers, _ = await self.call(mw, [(b"x-profile", sign("k", "/other").encode())])
+        self.assertNotIn(b"x-profile-id", headers)
+
+        headers, sent = await self.call(mw, [(b"x-profile", sign("k", "/embed").encode()),
+                                             (b"x-profile-mode", b"sample")])
+        meta = store.meta(headers[b"x-profile-id"].decode())
+        self.assertEqual((meta["mode"], meta["path"]), ("sample", "/embed"))
+        self.assertEqual(sent[1]["body"], b"{}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# test_stage_timing.py
+"""Stage timing: histograms, request scope, ASGI Server-Timing middleware."""
+import asyncio
+import time
+import unittest
+
+import stage_timing
+from stage_timing import stage, timed
+
+
+class StageTimingTests(unittest.TestCase):
+    def setUp(self):
+        stage_timing.configure(True)
+        stage_timing.REGISTRY.reset()
+        self.addCleanup(stage_timing.REGISTRY.reset)
+
+    def test_outside_a_request_each_stage_is_observed(self):
+        for _ in range(3):
+            with stage("work"):
+                time.sleep(0.002)
+        counts, total, n = stage_timing.REGISTRY.snapshot()["work"]
+        self.assertEqual(n, 3)
+        self.assertGreaterEqual(total, 0.006)
+        self.assertEqual(sum(counts), 3)
+
+    def test_request_sums_stages_and_observes_once(self):
+        token = stage_timing.begin()
+        for _ in range(4):
+            with stage("skills"):
+                pass
+        timings = stage_timing.finish(token, 0.5)
+        self.assertEqual(set(timings), {"skills", "total"})
+        snap = stage_timing.REGISTRY.snapshot()
+        self.assertEqual((snap["skills"][2], snap["total"][2]), (1, 1))
+        self.assertRegex(stage_timing.server_timing(timings), r"^skills;dur=\d+\.\d{3}, total;dur=500\.000$")
+
+    def test_render_is_cumulative_prometheus_text(self):
+        for v in (0.0004, 0.003, 0.003, 20.0):
+            stage_timing.REGISTRY.observe("idf", v)
+        text = stage_timing.REGISTRY.render("x_seconds", worker=1)
+        self.assertIn("# TYPE x_seconds histogram", text)
+        self.assertIn('x_seconds_bucket{worker="1",stage="idf",le="0.0005"} 1', text)
+        self.assertIn('x_seconds_bucket{worker="1",stage="idf",le="0.005"} 3', text)
+        self.assertIn('x_seconds_bucket{worker="1",stage="idf",le="10"} 3', text)
+        self.assertIn('x_seconds_bucket{worker="1",stage="idf",le="+Inf"} 4', text)
+        self.assertIn('x_seconds_count{worker="1",stage="idf"} 4', text)
+
+    def test_timed_wraps_sync_and_async(self):
+        @timed("f")
+        def f(x):
+            return x + 1
+
+        @timed("g")
+        async def g(x):
+            return x * 2
+
+        self.assertEqual(f(1), 2)
+        self.assertEqual(asyncio.run(g(3)), 6)
+        self.assertEqual(set(stage_timing.REGISTRY.snapshot()), {"f", "g"})
+
+    def test_disabled_is_a_shared_noop(self):
+        stage_timing.configure(False)
+        self.addCleanup(stage_timing.configure, True)
+        self.assertIs(stage("a"), stage("b"))
+        self.assertIsNone(stage_timing.begin())
+        with stage("a"):
+            pass
+        self.assertEqual(timed("f")(lambda: 5)(), 5)
+        self.assertEqual(stage_timing.REGISTRY.snapshot(), {})
+
+
+class ServerTimingMiddlewareTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        stage_timing.configure(True)
+        stage_timing.REGISTRY.reset()
+
+    async def test_header_lists_stages_of_the_request(self):
+        async def app(scope, receive, send):
+            with stage("embed.wait"):
+                await asyncio.sleep(0.01)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await stage_timing.ServerTimingMiddleware(app)({"type": "http"}, None, send)
+        headers = dict(sent[0]["headers"])
+        self.assertRegex(headers[b"server-timing"].decode(), r"^embed\.wait;dur=\d+\.\d+, total;dur=")
+        self.assertEqual(stage_timing.REGISTRY.snapshot()["embed.wait"][2], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()